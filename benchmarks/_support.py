@@ -0,0 +1,110 @@
+"""Shared helpers for the benchmark scripts."""
+
+import contextlib
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+from redis.exceptions import RedisError
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def redis_url(url: str | None = None):
+    """
+    Yield a Redis URL to benchmark against.
+
+    When no URL is given a local stand-in (fakeredis speaking RESP over
+    TCP) is started on a free port, so every benchmark is reproducible
+    without an external Redis server. Pass a real URL to measure a
+    production-like deployment.
+    """
+    if url:
+        yield url
+        return
+
+    from fakeredis import TcpFakeServer
+
+    class NoDelayServer(TcpFakeServer):
+        # Replies are written in pieces; without TCP_NODELAY, Nagle's
+        # algorithm adds ~40 ms to every multi-bulk reply
+        def get_request(self):
+            sock, address = super().get_request()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock, address
+
+    port = _free_port()
+    server = NoDelayServer(("127.0.0.1", port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"redis://127.0.0.1:{port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+async def memory_usage(client, pattern: str) -> int | None:
+    """
+    Sum MEMORY USAGE over the keys matching pattern.
+
+    Returns None when the server does not implement MEMORY USAGE (the
+    fakeredis stand-in does not), in which case only real Redis numbers
+    are meaningful.
+    """
+    total = 0
+    try:
+        async for key in client.scan_iter(match=pattern, count=1000):
+            total += await client.memory_usage(key, samples=0) or 0
+    except (RedisError, OSError):
+        return None
+    return total
+
+
+async def used_memory(client) -> int | None:
+    """
+    Return the server's used_memory from INFO, or None if unsupported.
+
+    The stand-in does not implement INFO (and closes the connection on
+    it), so only call this against a real Redis.
+    """
+    try:
+        return (await client.info("memory"))["used_memory"]
+    except (RedisError, OSError):
+        return None
+
+
+async def string_key_footprint(client, pattern: str) -> tuple[int, int]:
+    """
+    Count string keys matching pattern and their key + value bytes.
+
+    Works on any server, including the stand-in, and is a lower bound
+    on memory use: Redis adds roughly 50-70 bytes of per-key overhead
+    (dict entry, robj, expire entry) on top of these bytes.
+    """
+    keys = 0
+    total = 0
+    async for key in client.scan_iter(match=pattern, count=1000):
+        keys += 1
+        total += len(key) + await client.strlen(key)
+    return keys, total
+
+
+def timed_per_call(total_seconds: float, calls: int) -> float:
+    """Return the mean duration of one call in microseconds."""
+    return total_seconds / calls * 1_000_000
+
+
+def now() -> float:
+    return time.perf_counter()
@@ -0,0 +1,102 @@
+"""
+Compare rate limiting algorithms by latency and Redis memory per key.
+
+For every algorithm and limit size, a set of identifiers each send
+limit + 10% requests (so rejections are included) and the benchmark
+reports the mean and p99 latency of check_and_increment and the Redis
+memory used per identifier.
+
+Memory comes from MEMORY USAGE and is only reported against a real
+Redis (--redis-url); the default fakeredis stand-in does not implement
+it, so only latency is measured there.
+
+Usage:
+    uv run python benchmarks/bench_algorithms.py [--redis-url URL]
+        [--limits 10,100,1000] [--identifiers N]
+"""
+
+import argparse
+import asyncio
+import os
+
+from _support import memory_usage, now, redis_url
+
+from domain import (
+    FixedWindowRateLimiter,
+    GcraRateLimiter,
+    RateLimitConfig,
+    SlidingWindowCounterRateLimiter,
+    SlidingWindowLogRateLimiter,
+    TimeUnit,
+    TimeWindow,
+    TokenBucketRateLimiter,
+)
+from infrastructure.redis_client import RedisClient
+
+ALGORITHMS = {
+    "fixed_window": FixedWindowRateLimiter,
+    "sliding_window_log": SlidingWindowLogRateLimiter,
+    "sliding_window_counter": SlidingWindowCounterRateLimiter,
+    "token_bucket": TokenBucketRateLimiter,
+    "gcra": GcraRateLimiter,
+}
+
+
+async def measure(client, name, limit, identifiers, run_id):
+    config = RateLimitConfig(
+        limit=limit, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+    )
+    limiter = ALGORITHMS[name](config, client)
+    prefix = f"bench-{run_id}-{name}-{limit}"
+    requests = limit + max(1, limit // 10)
+
+    latencies = []
+    for i in range(identifiers):
+        identifier = f"{prefix}-{i}"
+        for _ in range(requests):
+            start = now()
+            await limiter.check_and_increment(identifier)
+            latencies.append(now() - start)
+
+    latencies.sort()
+    mean_us = sum(latencies) / len(latencies) * 1_000_000
+    p99_us = latencies[int(len(latencies) * 0.99)] * 1_000_000
+    memory = await memory_usage(client._client, f"*{prefix}-*")
+    per_key = "n/a" if memory is None else f"{memory / identifiers:.0f}"
+    return mean_us, p99_us, per_key
+
+
+async def run(url, limits, identifiers):
+    client = RedisClient(url)
+    await client.load_scripts()
+    run_id = os.urandom(3).hex()
+
+    print(
+        f"{'algorithm':<22}{'limit':>7}{'mean us':>10}{'p99 us':>10}"
+        f"{'bytes/id':>10}"
+    )
+    for limit in limits:
+        for name in ALGORITHMS:
+            mean_us, p99_us, per_key = await measure(
+                client, name, limit, identifiers, run_id
+            )
+            print(
+                f"{name:<22}{limit:>7}{mean_us:>10.1f}{p99_us:>10.1f}"
+                f"{per_key:>10}"
+            )
+    await client._client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--limits", default="10,100,1000")
+    parser.add_argument("--identifiers", type=int, default=5)
+    args = parser.parse_args()
+    limits = [int(limit) for limit in args.limits.split(",")]
+    with redis_url(args.redis_url) as url:
+        asyncio.run(run(url, limits, args.identifiers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare per-request EVALSHA with micro-batched pipelined increments.
+
+Drives many concurrent increments over a set of keys and reports
+increments/sec, Redis round-trips and script calls for the direct
+RedisClient and for BatchingStorage.
+
+Usage:
+    uv run python benchmarks/bench_batching.py [--redis-url URL]
+        [--concurrency N] [--requests N] [--keys N]
+"""
+
+import argparse
+import asyncio
+
+from _support import now, redis_url
+
+from infrastructure.batching import BatchingStorage
+from infrastructure.redis_client import RedisClient
+
+
+class CountingClient(RedisClient):
+    """RedisClient that counts round-trips and script calls."""
+
+    def __init__(self, url: str) -> None:
+        super().__init__(url)
+        self.round_trips = 0
+        self.script_calls = 0
+
+    async def increment(self, key: str, ttl: int) -> int:
+        self.round_trips += 1
+        self.script_calls += 1
+        return await super().increment(key, ttl)
+
+    async def increment_many(self, items):
+        self.round_trips += 1
+        self.script_calls += len(items)
+        return await super().increment_many(items)
+
+
+async def drive(storage, concurrency: int, requests: int, keys: int):
+    per_worker = requests // concurrency
+
+    async def worker(offset: int) -> None:
+        for i in range(per_worker):
+            await storage.increment(f"bench:batch:{(offset + i) % keys}", 60)
+
+    start = now()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return per_worker * concurrency / (now() - start)
+
+
+async def run(url: str, concurrency: int, requests: int, keys: int):
+    print(
+        f"concurrency={concurrency} requests={requests} keys={keys}\n"
+        f"{'mode':<10}{'incr/s':>12}{'round-trips':>14}{'scripts':>10}"
+    )
+    for mode in ("direct", "batched"):
+        client = CountingClient(url)
+        await client.load_scripts()
+        storage = client if mode == "direct" else BatchingStorage(client)
+        rate = await drive(storage, concurrency, requests, keys)
+        print(
+            f"{mode:<10}{rate:>12.0f}{client.round_trips:>14}"
+            f"{client.script_calls:>10}"
+        )
+        await client._client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--keys", type=int, default=50)
+    args = parser.parse_args()
+    with redis_url(args.redis_url) as url:
+        asyncio.run(run(url, args.concurrency, args.requests, args.keys))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare GET /rate-limit with the binary check protocol.
+
+The app built by create_app serves both on loopback: HTTP on a TCP port
+and the binary protocol on a Unix domain socket. For each concurrency,
+the same sequence of checks is sent over HTTP (one aiohttp client
+session, one request per check) and over the binary protocol (one
+BinaryCheckClient connection, concurrent checks pipelined), and the
+benchmark reports checks/sec and p50/p99 latency. Counters are kept by
+the "memory" backend by default, so the numbers show the per-check cost
+of each protocol rather than of Redis; pass --storage redis for the
+stand-in or --redis-url.
+
+The client shares the event loop with the server, so compare the two
+protocols with each other rather than with production numbers.
+
+Usage:
+    uv run python benchmarks/bench_binary_protocol.py [--redis-url URL]
+        [--storage memory] [--concurrency 1,16,64] [--requests N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from ipaddress import IPv4Address
+
+from _support import now, redis_url
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.test_utils import TestServer
+from bench_load import BASE_ADDRESS, percentile
+
+from config import Config
+from domain import TimeUnit
+from interface.binary_client import BinaryCheckClient
+from interface.binary_protocol import unix_socket
+from interface.web_app import create_app
+
+KEYS = 1000
+
+
+async def drive(check, sequence, concurrency):
+    """Run check over sequence from concurrency tasks; return latencies."""
+    latencies: list[float] = []
+
+    async def send(identifiers):
+        for identifier in identifiers:
+            start = now()
+            await check(identifier)
+            latencies.append(now() - start)
+
+    await asyncio.gather(
+        *(send(sequence[task::concurrency]) for task in range(concurrency))
+    )
+    return latencies
+
+
+async def run(url, storage, concurrencies, requests):
+    config = Config(
+        redis_url=url,
+        port=0,
+        rate_limit_count=1_000_000,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend=storage,
+        circuit_breaker=False,
+        heavy_hitters=False,
+    )
+    path = os.path.join(tempfile.mkdtemp(), "check.sock")
+    server = TestServer(create_app(config, [unix_socket(path)]))
+    await server.start_server()
+    http_url = server.make_url("/rate-limit")
+    rng = random.Random(1)
+    sequence = [
+        str(IPv4Address(BASE_ADDRESS + rng.randrange(KEYS)))
+        for _ in range(requests)
+    ]
+
+    print(
+        f"{'protocol':<10}{'conc':>6}{'checks/s':>10}"
+        f"{'p50 us':>10}{'p99 us':>10}"
+    )
+    for concurrency in concurrencies:
+        async with ClientSession(
+            connector=TCPConnector(limit=concurrency)
+        ) as session:
+
+            async def http_check(identifier):
+                async with session.get(
+                    http_url, headers={"X-Forwarded-For": identifier}
+                ) as response:
+                    await response.read()
+
+            client = await BinaryCheckClient.connect(path)
+            checks = (("http", http_check), ("binary", client.check))
+            for name, check in checks:
+                # Warm up the connections first
+                await drive(check, sequence[:200], concurrency)
+                start = now()
+                latencies = await drive(check, sequence, concurrency)
+                elapsed = now() - start
+                latencies.sort()
+                print(
+                    f"{name:<10}{concurrency:>6}{requests / elapsed:>10.0f}"
+                    f"{percentile(latencies, 0.50) * 1e6:>10.0f}"
+                    f"{percentile(latencies, 0.99) * 1e6:>10.0f}"
+                )
+            await client.close()
+    await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--storage", default="memory")
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--requests", type=int, default=10_000)
+    args = parser.parse_args()
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    with redis_url(args.redis_url) as url:
+        asyncio.run(run(url, args.storage, concurrencies, args.requests))
+
+
+if __name__ == "__main__":
+    main()
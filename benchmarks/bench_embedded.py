@@ -0,0 +1,187 @@
+"""
+Compare a rate limiting sidecar with the embedded aiohttp middleware.
+
+A protected application serves GET /resource. In the "sidecar" setup
+its handler asks the rate limiting service (create_app, on its own
+loopback port) through GET /rate-limit before answering, as a separate
+deployment would. In the "embedded" setup rate_limit_middleware runs
+RateLimitUseCase in the application's process. Both count against the
+same kind of storage: "memory" (in-process counters) or "redis" (the
+fakeredis stand-in, or --redis-url).
+
+For each setup, storage and concurrency the benchmark reports
+requests/sec and p50/p99 latency of /resource. The load generator,
+the application and the sidecar share one event loop, so the numbers
+are for comparing the setups rather than absolute.
+
+Usage:
+    uv run python benchmarks/bench_embedded.py [--redis-url URL]
+        [--storages memory,redis] [--concurrency 1,16,64] [--requests N]
+"""
+
+import argparse
+import asyncio
+import random
+from ipaddress import IPv4Address
+
+from _support import now, redis_url
+from aiohttp import ClientSession, TCPConnector, web
+from aiohttp.test_utils import TestServer
+from bench_load import BASE_ADDRESS, percentile
+
+from application.rate_limit import RateLimitUseCase
+from config import Config
+from domain import TimeUnit
+from infrastructure import MemoryStorage, RedisClient
+from interface.middleware import rate_limit_middleware
+from interface.web_app import create_app
+
+SETUPS = ("sidecar", "embedded")
+KEYS = 1000
+
+
+async def resource(request):
+    return web.Response(text="ok")
+
+
+async def sidecar_app(url, storage, limit):
+    """Return the app checking each request with the service's API."""
+    config = Config(
+        redis_url=url,
+        port=0,
+        rate_limit_count=limit,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend=storage,
+        circuit_breaker=False,
+        heavy_hitters=False,
+    )
+    service = TestServer(create_app(config))
+    await service.start_server()
+    check_url = service.make_url("/rate-limit")
+    session = ClientSession()
+
+    async def protected(request):
+        client_ip = request.headers.get("X-Forwarded-For", request.remote)
+        async with session.get(
+            check_url, headers={"X-Forwarded-For": client_ip}
+        ) as check:
+            headers = {
+                name: value
+                for name, value in check.headers.items()
+                if name.startswith("X-RateLimit-")
+            }
+            if check.status == 429:
+                return web.Response(status=429, headers=headers)
+        return web.Response(text="ok", headers=headers)
+
+    async def close(app):
+        await session.close()
+        await service.close()
+
+    app = web.Application()
+    app.router.add_get("/resource", protected)
+    app.on_cleanup.append(close)
+    return app
+
+
+async def embedded_app(url, storage, limit):
+    """Return the app checking each request with the middleware."""
+    if storage == "memory":
+        client = MemoryStorage()
+    else:
+        client = RedisClient(url)
+        await client.load_scripts()
+    use_case = RateLimitUseCase(client, limit=limit)
+    app = web.Application(middlewares=[rate_limit_middleware(use_case)])
+    app.router.add_get("/resource", resource)
+    return app
+
+
+async def run_setup(url, setup, storage, concurrency, requests, limit):
+    build = sidecar_app if setup == "sidecar" else embedded_app
+    server = TestServer(await build(url, storage, limit))
+    await server.start_server()
+    rng = random.Random(1)
+    warmup = min(requests // 10, 1000)
+    sequence = [
+        str(IPv4Address(BASE_ADDRESS + rng.randrange(KEYS)))
+        for _ in range(warmup + requests)
+    ]
+    target = server.make_url("/resource")
+    latencies: list[float] = []
+
+    async with ClientSession(
+        connector=TCPConnector(limit=concurrency)
+    ) as session:
+
+        async def send(identifiers, record: bool) -> None:
+            for identifier in identifiers:
+                start = now()
+                async with session.get(
+                    target, headers={"X-Forwarded-For": identifier}
+                ) as response:
+                    await response.read()
+                if record:
+                    latencies.append(now() - start)
+
+        async def drive(identifiers, record: bool) -> None:
+            await asyncio.gather(
+                *(
+                    send(identifiers[task::concurrency], record)
+                    for task in range(concurrency)
+                )
+            )
+
+        await drive(sequence[:warmup], record=False)
+        start = now()
+        await drive(sequence[warmup:], record=True)
+        elapsed = now() - start
+    await server.close()
+
+    latencies.sort()
+    return (
+        requests / elapsed,
+        percentile(latencies, 0.50) * 1e6,
+        percentile(latencies, 0.99) * 1e6,
+    )
+
+
+async def run(url, storages, concurrencies, requests, limit):
+    print(
+        f"{'storage':<8}{'setup':<10}{'conc':>6}{'req/s':>10}"
+        f"{'p50 us':>10}{'p99 us':>10}"
+    )
+    for storage in storages:
+        for concurrency in concurrencies:
+            for setup in SETUPS:
+                rps, p50, p99 = await run_setup(
+                    url, setup, storage, concurrency, requests, limit
+                )
+                print(
+                    f"{storage:<8}{setup:<10}{concurrency:>6}{rps:>10.0f}"
+                    f"{p50:>10.0f}{p99:>10.0f}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--storages", default="memory,redis")
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=1_000_000)
+    args = parser.parse_args()
+    storages = args.storages.split(",")
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    with redis_url(args.redis_url) as url:
+        asyncio.run(
+            run(url, storages, concurrencies, args.requests, args.limit)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare EVAL with the full Lua source against EVALSHA by digest.
+
+Reports the request size on the wire and the mean latency per call for
+the fixed window increment script.
+
+Usage:
+    uv run python benchmarks/bench_evalsha.py [--redis-url URL] [-n N]
+"""
+
+import argparse
+import asyncio
+
+from _support import now, redis_url, timed_per_call
+from redis import asyncio as aioredis
+from redis.connection import Connection
+
+from infrastructure.scripts import INCREMENT, LIMITER_SCRIPTS
+
+
+def wire_bytes(*args) -> int:
+    packed = Connection().pack_command(*args)
+    return sum(len(chunk) for chunk in packed)
+
+
+async def run(url: str, calls: int) -> None:
+    client = aioredis.from_url(url)
+    await LIMITER_SCRIPTS.load_all(client)
+    key = "bench:evalsha"
+
+    eval_size = wire_bytes("EVAL", INCREMENT.source, 1, key, 60)
+    evalsha_size = wire_bytes("EVALSHA", INCREMENT.sha, 1, key, 60)
+
+    # Warm up the connection pool before timing
+    for _ in range(100):
+        await client.eval(INCREMENT.source, 1, key, 60)
+
+    start = now()
+    for _ in range(calls):
+        await client.eval(INCREMENT.source, 1, key, 60)
+    eval_us = timed_per_call(now() - start, calls)
+
+    start = now()
+    for _ in range(calls):
+        await LIMITER_SCRIPTS.execute(client, "increment", [key], [60])
+    evalsha_us = timed_per_call(now() - start, calls)
+
+    await client.aclose()
+
+    print(f"calls per variant: {calls}")
+    print(f"EVAL     {eval_size:>5} bytes/request  {eval_us:8.1f} us/call")
+    print(
+        f"EVALSHA  {evalsha_size:>5} bytes/request  {evalsha_us:8.1f} us/call"
+    )
+    saved = eval_size - evalsha_size
+    print(
+        f"saving   {saved:>5} bytes/request  "
+        f"{eval_us - evalsha_us:8.1f} us/call "
+        f"({(1 - evalsha_us / eval_us) * 100:.1f}%)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("-n", "--calls", type=int, default=5000)
+    args = parser.parse_args()
+    with redis_url(args.redis_url) as url:
+        asyncio.run(run(url, args.calls))
+
+
+if __name__ == "__main__":
+    main()
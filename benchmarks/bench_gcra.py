@@ -0,0 +1,98 @@
+"""
+Compare GCRA with fixed window counters for many distinct identifiers.
+
+Each identifier sends a few requests, as with large numbers of distinct
+client IPs. Reports checks/sec, keys per identifier, key + value bytes
+per identifier (works on the stand-in) and MEMORY USAGE per identifier
+(real Redis only).
+
+Usage:
+    uv run python benchmarks/bench_gcra.py [--redis-url URL]
+        [--identifiers N] [--requests N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import os
+
+from _support import memory_usage, now, redis_url, string_key_footprint
+
+from domain import (
+    FixedWindowRateLimiter,
+    GcraRateLimiter,
+    RateLimitConfig,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure.redis_client import RedisClient
+
+ALGORITHMS = {
+    "fixed_window": FixedWindowRateLimiter,
+    "gcra": GcraRateLimiter,
+}
+
+
+async def measure(client, name, identifiers, requests, concurrency, run_id):
+    config = RateLimitConfig(
+        limit=100, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+    )
+    limiter = ALGORITHMS[name](config, client)
+    # IPv4-looking identifiers, unique per run so reruns do not collide
+    prefix = f"10.{run_id}"
+    ips = [
+        f"{prefix}.{i // 256 % 256}.{i % 256}-{i // 65536}"
+        for i in range(identifiers)
+    ]
+    queue = [ip for ip in ips for _ in range(requests)]
+
+    async def worker(offset: int) -> None:
+        for ip in queue[offset::concurrency]:
+            await limiter.check_and_increment(ip)
+
+    start = now()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    rate = len(queue) / (now() - start)
+
+    pattern = f"*{{{prefix}.*"
+    keys, payload = await string_key_footprint(client._client, pattern)
+    memory = await memory_usage(client._client, pattern)
+    per_id = "n/a" if memory is None else f"{memory / identifiers:.0f}"
+    return rate, keys / identifiers, payload / identifiers, per_id
+
+
+async def run(url, identifiers, requests, concurrency):
+    client = RedisClient(url)
+    await client.load_scripts()
+    run_id = int.from_bytes(os.urandom(1)) % 200 + 1
+
+    print(
+        f"identifiers={identifiers} requests/id={requests} "
+        f"concurrency={concurrency}\n"
+        f"{'algorithm':<14}{'checks/s':>10}{'keys/id':>9}"
+        f"{'bytes/id':>10}{'MEMORY/id':>11}"
+    )
+    for name in ALGORITHMS:
+        rate, keys, payload, per_id = await measure(
+            client, name, identifiers, requests, concurrency, run_id
+        )
+        print(
+            f"{name:<14}{rate:>10.0f}{keys:>9.2f}{payload:>10.1f}{per_id:>11}"
+        )
+    await client._client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--identifiers", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    with redis_url(args.redis_url) as url:
+        asyncio.run(
+            run(url, args.identifiers, args.requests, args.concurrency)
+        )
+
+
+if __name__ == "__main__":
+    main()
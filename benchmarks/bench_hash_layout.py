@@ -0,0 +1,138 @@
+"""
+Compare the Redis memory of one key per counter with bucket hashes.
+
+For each identifier count, fixed window counters for that many distinct
+identifiers are written once with the default layout (one key per
+identifier and window) and once with HashBucketStorage (fields of a few
+HASHes per window, HINCRBY). Reports write throughput, top-level keys
+per identifier and used_memory growth per identifier.
+
+Memory comes from INFO used_memory and is only reported against a real
+Redis (--redis-url), which should be a scratch instance: the benchmark
+writes up to 10M counters and deletes them afterwards. The default
+fakeredis stand-in reports throughput and key counts only and is too
+slow for 10M identifiers; pass a smaller --identifiers there.
+
+By default buckets hold about 100 fields each, below Redis's default
+hash-max-listpack-entries of 128, so every bucket stays in the compact
+listpack encoding; --buckets fixes the bucket count instead.
+
+Usage:
+    uv run python benchmarks/bench_hash_layout.py [--redis-url URL]
+        [--identifiers 1000000,10000000] [--buckets N]
+"""
+
+import argparse
+import asyncio
+import os
+
+from _support import now, redis_url, used_memory
+
+from domain import (
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure import HashBucketStorage
+from infrastructure.redis_client import RedisClient
+
+# Identifiers checked per pipeline
+CHUNK = 10_000
+FIELDS_PER_BUCKET = 100
+
+
+async def populate(limiter, prefix: str, identifiers: int) -> float:
+    """Check every identifier once and return checks per second."""
+    start = now()
+    for first in range(0, identifiers, CHUNK):
+        await limiter.check_and_increment_many(
+            [
+                (f"{prefix}-{i}", 1)
+                for i in range(first, min(first + CHUNK, identifiers))
+            ]
+        )
+    return identifiers / (now() - start)
+
+
+async def delete_matching(client, pattern: str) -> None:
+    batch = []
+    async for key in client.scan_iter(match=pattern, count=10_000):
+        batch.append(key)
+        if len(batch) >= 10_000:
+            await client.unlink(*batch)
+            batch = []
+    if batch:
+        await client.unlink(*batch)
+
+
+async def measure(client, layout, identifiers, buckets, run_id, memory):
+    # An hour-long window, so no counter expires while the run lasts
+    config = RateLimitConfig(
+        limit=100, window=TimeWindow(duration=1, unit=TimeUnit.HOURS)
+    )
+    if layout == "hash":
+        storage = HashBucketStorage(client, buckets=buckets)
+        pattern = "rate_limit_hash:*"
+    else:
+        storage = client
+        pattern = f"rate_limit:{{bench-{run_id}-*"
+    limiter = FixedWindowRateLimiter(config, storage)
+    redis = client._client
+
+    keys_before = await redis.dbsize()
+    memory_before = await used_memory(redis) if memory else None
+    rate = await populate(limiter, f"bench-{run_id}", identifiers)
+    keys = await redis.dbsize() - keys_before
+    memory_after = await used_memory(redis) if memory else None
+    await delete_matching(redis, pattern)
+
+    per_id = (
+        "n/a"
+        if memory_before is None or memory_after is None
+        else f"{(memory_after - memory_before) / identifiers:.1f}"
+    )
+    return rate, keys / identifiers, per_id
+
+
+async def run(url, counts, buckets, memory):
+    client = RedisClient(url)
+    await client.load_scripts()
+    run_id = os.urandom(3).hex()
+
+    print(
+        f"{'identifiers':>12}  {'layout':<8}{'buckets':>9}{'checks/s':>10}"
+        f"{'keys/id':>10}{'bytes/id':>10}"
+    )
+    for identifiers in counts:
+        bucket_count = buckets or max(1, identifiers // FIELDS_PER_BUCKET)
+        for layout in ("keys", "hash"):
+            rate, keys, per_id = await measure(
+                client, layout, identifiers, bucket_count, run_id, memory
+            )
+            shown = bucket_count if layout == "hash" else "-"
+            print(
+                f"{identifiers:>12}  {layout:<8}{shown:>9}{rate:>10.0f}"
+                f"{keys:>10.4f}{per_id:>10}"
+            )
+    await client._client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--identifiers", default="1000000,10000000")
+    parser.add_argument("--buckets", type=int, default=None)
+    args = parser.parse_args()
+    counts = [int(count) for count in args.identifiers.split(",")]
+    with redis_url(args.redis_url) as url:
+        # The stand-in drops the connection on INFO, which it lacks
+        memory = args.redis_url is not None
+        asyncio.run(run(url, counts, args.buckets, memory))
+
+
+if __name__ == "__main__":
+    main()
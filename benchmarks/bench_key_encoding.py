@@ -0,0 +1,137 @@
+"""
+Compare text fixed window counter keys with BinaryKeyEncoder keys.
+
+For IPv4 and IPv6 identifiers, reports the mean key length and the CPU
+time of building one key through FixedWindowRateLimiter._get_key, then
+writes --keys counters of each encoding to Redis and reports the key
+and value bytes stored per counter and, against a real Redis
+(--redis-url), the MEMORY USAGE per counter. The fakeredis stand-in does
+not implement MEMORY USAGE, so it shows n/a there.
+
+Usage:
+    uv run python benchmarks/bench_key_encoding.py [--redis-url URL]
+        [--keys N] [--calls N]
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import random
+import timeit
+
+from _support import (
+    memory_usage,
+    redis_url,
+    string_key_footprint,
+    timed_per_call,
+)
+
+from domain import (
+    BinaryKeyEncoder,
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure.redis_client import RedisClient
+
+WINDOW_START = 1_700_000_040
+CHUNK = 10_000
+ENCODINGS = {
+    "text": (None, "rate_limit:*"),
+    "binary": (BinaryKeyEncoder(), b"rl\x02{*"),
+}
+
+
+def addresses(family: str, count: int, seed: int = 1) -> list[str]:
+    """Return count random addresses, IPv6 ones fully written out."""
+    rng = random.Random(seed)
+    if family == "ipv4":
+        return [
+            str(ipaddress.IPv4Address(rng.getrandbits(32)))
+            for _ in range(count)
+        ]
+    return [
+        ipaddress.IPv6Address(rng.getrandbits(128)).exploded
+        for _ in range(count)
+    ]
+
+
+def make_limiter(storage, encoder) -> FixedWindowRateLimiter:
+    config = RateLimitConfig(
+        limit=100, window=TimeWindow(duration=1, unit=TimeUnit.HOURS)
+    )
+    return FixedWindowRateLimiter(config, storage, encoder)
+
+
+def encode_cost(limiter, identifiers: list[str], calls: int) -> float:
+    """Return the mean microseconds to build one key."""
+    get_key = limiter._get_key
+    count = len(identifiers)
+
+    def build():
+        for i in range(calls):
+            get_key(identifiers[i % count], WINDOW_START)
+
+    return timed_per_call(min(timeit.repeat(build, number=1, repeat=5)), calls)
+
+
+async def stored(client, limiter, identifiers, pattern, real):
+    """Write one counter per identifier and measure what Redis keeps."""
+    keys = [limiter._get_key(i, WINDOW_START) for i in identifiers]
+    for first in range(0, len(keys), CHUNK):
+        await client.increment_many(
+            [(key, 3600, 1) for key in keys[first : first + CHUNK]]
+        )
+    redis = client._client
+    _, total = await string_key_footprint(redis, pattern)
+    # The stand-in drops the connection on MEMORY USAGE, which it lacks
+    usage = await memory_usage(redis, pattern) if real else None
+    await redis.delete(*keys)
+    return total / len(keys), usage and usage / len(keys)
+
+
+async def run(url, real, keys, calls):
+    client = RedisClient(url)
+    await client.load_scripts()
+
+    print(
+        f"{'family':<7}{'encoding':<9}{'key bytes':>10}{'us/key':>8}"
+        f"{'stored/key':>12}{'MEMORY USAGE/key':>18}"
+    )
+    for family in ("ipv4", "ipv6"):
+        identifiers = addresses(family, keys)
+        for name, (encoder, pattern) in ENCODINGS.items():
+            limiter = make_limiter(client, encoder)
+            length = sum(
+                len(limiter._get_key(i, WINDOW_START)) for i in identifiers
+            ) / len(identifiers)
+            cost = encode_cost(limiter, identifiers, calls)
+            footprint, usage = await stored(
+                client, limiter, identifiers, pattern, real
+            )
+            shown = "n/a" if usage is None else f"{usage:.1f}"
+            print(
+                f"{family:<7}{name:<9}{length:>10.1f}{cost:>8.3f}"
+                f"{footprint:>12.1f}{shown:>18}"
+            )
+    await client._client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+    with redis_url(args.redis_url) as url:
+        asyncio.run(
+            run(url, args.redis_url is not None, args.keys, args.calls)
+        )
+
+
+if __name__ == "__main__":
+    main()
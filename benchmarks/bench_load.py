@@ -0,0 +1,298 @@
+"""
+Load-test the service end to end and record throughput and tail latency.
+
+Each scenario builds the app with create_app, serves it on a loopback
+port and drives GET /rate-limit from concurrent client tasks, spreading
+the requests over a fixed number of client IPs. A scenario is one
+combination of storage backend, algorithm, key cardinality and
+concurrency; for each the benchmark reports requests/sec, p50/p99/p999
+latency, the share of allowed requests and the storage errors counted
+by /metrics.
+
+Two storages are measured: "memory", the in-process backend, and
+"redis", a local Redis stand-in (fakeredis over TCP) or --redis-url.
+The load generator shares the event loop with the server, so absolute
+numbers are lower than a dedicated client would see; they are meant
+for comparing commits on the same machine. Identifiers are drawn from a
+seeded generator, so every run sends the same request sequence.
+
+Results are written as JSON with --output; --compare prints the change
+in throughput and p99 against an earlier results file.
+
+Usage:
+    uv run python benchmarks/bench_load.py [--redis-url URL]
+        [--storages memory,redis] [--algorithms fixed_window,gcra]
+        [--keys 1,1000,100000] [--concurrency 1,16,64] [--requests N]
+        [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from ipaddress import IPv4Address
+
+from _support import now, redis_url
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.test_utils import TestServer
+
+from config import Config
+from domain import RateLimitAlgorithm, TimeUnit
+from interface.web_app import LOCAL_BACKEND_ALGORITHMS, create_app
+
+STORAGES = ("memory", "redis")
+# Shaping answers after its configured delay, so its latency is a setting
+DEFAULT_ALGORITHMS = [
+    algorithm
+    for algorithm in RateLimitAlgorithm
+    if algorithm != RateLimitAlgorithm.SHAPING
+]
+# First client address; identifiers are consecutive addresses after it
+BASE_ADDRESS = int(IPv4Address("10.0.0.0"))
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def supported(storage: str, algorithm: RateLimitAlgorithm) -> bool:
+    """Whether create_app accepts the algorithm on the storage."""
+    allowed = LOCAL_BACKEND_ALGORITHMS.get(storage)
+    return allowed is None or algorithm in allowed
+
+
+def storage_errors(text: str) -> int:
+    """Sum rate_limiter_storage_errors_total from a /metrics page."""
+    return sum(
+        int(float(line.rsplit(" ", 1)[1]))
+        for line in text.splitlines()
+        if line.startswith("rate_limiter_storage_errors_total{")
+    )
+
+
+async def run_scenario(
+    url: str,
+    storage: str,
+    algorithm: RateLimitAlgorithm,
+    keys: int,
+    concurrency: int,
+    requests: int,
+    limit: int,
+    seed: int,
+    offset: int,
+) -> dict:
+    config = Config(
+        redis_url=url,
+        port=0,
+        rate_limit_count=limit,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend=storage,
+        rate_limit_algorithm=algorithm,
+        # Measure Redis itself rather than the local fallback
+        circuit_breaker=False,
+    )
+    server = TestServer(create_app(config))
+    await server.start_server()
+    rng = random.Random(seed)
+    # Warm-up requests go first and are not measured
+    warmup = min(requests // 10, 1000)
+    sequence = [
+        str(IPv4Address(BASE_ADDRESS + offset + rng.randrange(keys)))
+        for _ in range(warmup + requests)
+    ]
+    target = server.make_url("/rate-limit")
+    latencies: list[float] = []
+    allowed = 0
+
+    async with ClientSession(
+        connector=TCPConnector(limit=concurrency)
+    ) as session:
+
+        async def send(identifiers, record: bool) -> None:
+            nonlocal allowed
+            for identifier in identifiers:
+                start = now()
+                async with session.get(
+                    target, headers={"X-Forwarded-For": identifier}
+                ) as response:
+                    await response.read()
+                if record:
+                    latencies.append(now() - start)
+                    allowed += response.status == 200
+
+        async def drive(identifiers: list[str], record: bool) -> None:
+            # Each task takes every concurrency-th request of the sequence
+            await asyncio.gather(
+                *(
+                    send(identifiers[task::concurrency], record)
+                    for task in range(concurrency)
+                )
+            )
+
+        await drive(sequence[:warmup], record=False)
+        start = now()
+        await drive(sequence[warmup:], record=True)
+        elapsed = now() - start
+
+        async with session.get(server.make_url("/metrics")) as response:
+            errors = storage_errors(await response.text())
+    await server.close()
+
+    latencies.sort()
+    return {
+        "storage": storage,
+        "algorithm": algorithm.value,
+        "keys": keys,
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "p999_us": percentile(latencies, 0.999) * 1e6,
+        "allowed_ratio": allowed / requests,
+        "storage_errors": errors,
+    }
+
+
+def scenario_key(result: dict) -> tuple:
+    return (
+        result["storage"],
+        result["algorithm"],
+        result["keys"],
+        result["concurrency"],
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result: dict, baseline: dict | None) -> None:
+    line = (
+        f"{result['storage']:<8}{result['algorithm']:<24}"
+        f"{result['keys']:>8}{result['concurrency']:>6}"
+        f"{result['rps']:>10.0f}{result['p50_us']:>10.0f}"
+        f"{result['p99_us']:>10.0f}{result['p999_us']:>10.0f}"
+        f"{result['allowed_ratio']:>9.1%}{result['storage_errors']:>6}"
+    )
+    if baseline is not None:
+        rps = result["rps"] / baseline["rps"] - 1
+        p99 = result["p99_us"] / baseline["p99_us"] - 1
+        line += f"   rps {rps:+.1%} p99 {p99:+.1%}"
+    print(line)
+
+
+def load_baseline(path: str | None) -> dict:
+    """Return the results of an earlier --output file by scenario."""
+    if not path:
+        return {}
+    with open(path) as file:
+        return {
+            scenario_key(result): result
+            for result in json.load(file)["results"]
+        }
+
+
+async def run(args, url: str, baseline: dict) -> dict:
+
+    print(
+        f"{'storage':<8}{'algorithm':<24}{'keys':>8}{'conc':>6}"
+        f"{'req/s':>10}{'p50 us':>10}{'p99 us':>10}{'p999 us':>10}"
+        f"{'allowed':>9}{'errs':>6}"
+    )
+    results = []
+    # Scenarios use disjoint address ranges so counters never carry over
+    offset = 0
+    for storage in args.storages:
+        for algorithm in args.algorithms:
+            if not supported(storage, algorithm):
+                continue
+            for keys in args.keys:
+                for concurrency in args.concurrency:
+                    result = await run_scenario(
+                        url,
+                        storage,
+                        algorithm,
+                        keys,
+                        concurrency,
+                        args.requests,
+                        args.limit,
+                        args.seed,
+                        offset,
+                    )
+                    offset += keys
+                    results.append(result)
+                    print_result(result, baseline.get(scenario_key(result)))
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "redis": "stand-in" if args.redis_url is None else "external",
+            "requests": args.requests,
+            "limit": args.limit,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--storages", default=",".join(STORAGES))
+    parser.add_argument(
+        "--algorithms",
+        default=",".join(algorithm.value for algorithm in DEFAULT_ALGORITHMS),
+    )
+    parser.add_argument("--keys", default="1,1000,100000")
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    args.storages = args.storages.split(",")
+    args.algorithms = [
+        RateLimitAlgorithm(name) for name in args.algorithms.split(",")
+    ]
+    args.keys = [int(keys) for keys in args.keys.split(",")]
+    args.concurrency = [int(tasks) for tasks in args.concurrency.split(",")]
+
+    baseline = load_baseline(args.compare)
+    if "redis" in args.storages:
+        with redis_url(args.redis_url) as url:
+            report = asyncio.run(run(args, url, baseline))
+    else:
+        report = asyncio.run(run(args, "", baseline))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure the in-process memory storage backend.
+
+Increments --keys distinct counters through the fixed window limiter,
+then keeps counting on them, and reports increments/sec for new and
+existing keys, traced memory per key (counter entry, key string, dict
+and timing wheel slots) and the cost of expiring every key once their
+windows end. Expiry is driven by a simulated clock, so the benchmark
+does not wait for the windows.
+
+Usage:
+    uv run python benchmarks/bench_memory.py [--keys N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import gc
+import tracemalloc
+
+from _support import now
+
+from domain import (
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure.memory_storage import MemoryStorage
+
+
+class SimulatedClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(storage: MemoryStorage) -> FixedWindowRateLimiter:
+    config = RateLimitConfig(
+        limit=1_000_000, window=TimeWindow(duration=1, unit=TimeUnit.HOURS)
+    )
+    return FixedWindowRateLimiter(config, storage)
+
+
+async def run(keys: int, requests: int) -> None:
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(keys)]
+
+    # Memory is traced on its own pass, tracing slows allocation down
+    storage = MemoryStorage(clock=SimulatedClock())
+    limiter = make_limiter(storage)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for ip in ips:
+        await limiter.check_and_increment(ip)
+    per_key = (tracemalloc.get_traced_memory()[0] - baseline) / keys
+    tracemalloc.stop()
+    del storage, limiter
+    gc.collect()
+
+    clock = SimulatedClock()
+    storage = MemoryStorage(clock=clock)
+    limiter = make_limiter(storage)
+    start = now()
+    for ip in ips:
+        await limiter.check_and_increment(ip)
+    new_rate = keys / (now() - start)
+
+    start = now()
+    for _ in range(requests):
+        for ip in ips:
+            await limiter.check_and_increment(ip)
+    hit_rate = keys * requests / (now() - start)
+
+    # Windows end within the hour; one call then expires every key
+    clock.now += 2 * 3600
+    start = now()
+    await storage.increment("after", 60)
+    expiry = now() - start
+    assert len(storage) == 1
+
+    print(
+        f"keys={keys} requests/key={requests + 1}\n"
+        f"new keys/s:        {new_rate:.0f}\n"
+        f"increments/s:      {hit_rate:.0f}\n"
+        f"bytes/key:         {per_key:.0f}\n"
+        f"expire all keys:   {expiry * 1000:.1f} ms "
+        f"({expiry / keys * 1e9:.0f} ns/key)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run(args.keys, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measure the overhead of metrics recording on the /rate-limit handler.
+
+Times the /rate-limit handler end to end (against the Redis stand-in or
+--redis-url), then times exactly the recording work one request does:
+two clock reads and a histogram observation around the Redis call, two
+around the handler, and one decision counter increment. Reports both per
+request and the recording share of handler time, which must stay below
+2%.
+
+Usage:
+    uv run python benchmarks/bench_metrics.py [--redis-url URL]
+        [--requests N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from _support import now, redis_url
+from aiohttp.test_utils import make_mocked_request
+
+from config import Config
+from domain import TimeUnit
+from infrastructure.metrics import Metrics
+from interface.web_app import DEFAULT_RULE, create_app
+
+MAX_OVERHEAD = 0.02
+
+
+def recording_cost(iterations: int) -> float:
+    """Seconds of metrics work per request, minus the loop itself."""
+    metrics = Metrics()
+    decisions = metrics.record_decision
+    handler_latency = metrics.handler_latency["/rate-limit"]
+    redis_latency = metrics.redis_latency
+    perf_counter = time.perf_counter
+
+    start = now()
+    for _ in range(iterations):
+        pass
+    empty = now() - start
+
+    start = now()
+    for _ in range(iterations):
+        handler_start = perf_counter()
+        redis_start = perf_counter()
+        redis_latency.observe(perf_counter() - redis_start)
+        decisions(DEFAULT_RULE, True)
+        handler_latency.observe(perf_counter() - handler_start)
+    return (now() - start - empty) / iterations
+
+
+async def handler_time(url: str, requests: int) -> float:
+    """Seconds per call of the /rate-limit handler."""
+    config = Config(
+        redis_url=url,
+        port=8000,
+        rate_limit_count=1_000_000,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.HOURS,
+        near_cache_max_size=0,
+    )
+    app = create_app(config)
+    # Load the Lua scripts as the server does on startup
+    app.freeze()
+    await app.startup()
+    route = next(
+        route
+        for route in app.router.routes()
+        if route.method == "GET" and route.resource.canonical == "/rate-limit"
+    )
+    request = make_mocked_request(
+        "GET", "/rate-limit", headers={"X-Forwarded-For": "10.0.0.1"}, app=app
+    )
+
+    for _ in range(100):
+        await route.handler(request)
+    start = now()
+    for _ in range(requests):
+        response = await route.handler(request)
+    elapsed = (now() - start) / requests
+    assert response.status == 200
+    await app.cleanup()
+    return elapsed
+
+
+async def run(url: str | None, requests: int) -> None:
+    with redis_url(url) as resolved:
+        handler = await handler_time(resolved, requests)
+    recording = recording_cost(requests * 100)
+    share = recording / handler
+
+    print(
+        f"requests={requests}\n"
+        f"handler time:       {handler * 1e6:.1f} us/request\n"
+        f"metrics recording:  {recording * 1e9:.0f} ns/request\n"
+        f"overhead:           {share:.3%} (limit {MAX_OVERHEAD:.0%})"
+    )
+    assert share < MAX_OVERHEAD, "metrics overhead above the limit"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.redis_url, args.requests))
+
+
+if __name__ == "__main__":
+    main()
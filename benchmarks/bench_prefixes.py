@@ -0,0 +1,140 @@
+"""
+Measure key cardinality under an IPv6 address-rotation flood.
+
+An attacker holding a few /64 networks sends --requests requests, each
+from a fresh random address inside one of them. Three setups limit
+the flood in Redis with the fixed window algorithm (limit --limit per
+address per hour):
+
+- "host": one counter per address, as without aggregation
+- "prefix": IPV6_PREFIX_LENGTH=64, one counter per /64
+- "host+prefix": PREFIX_RATE_LIMIT_COUNT as well, a counter per address
+  and per /64 checked in one atomic call
+
+For each, the benchmark reports the flood requests allowed, the counter
+keys left in Redis with their key + value bytes (a lower bound on
+memory; add 50-70 bytes of per-key overhead), MEMORY USAGE against a
+real Redis (--redis-url), and the mean time per check.
+
+Usage:
+    uv run python benchmarks/bench_prefixes.py [--redis-url URL]
+        [--requests N] [--networks N] [--limit N] [--prefix-limit N]
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import random
+
+from _support import (
+    memory_usage,
+    now,
+    redis_url,
+    string_key_footprint,
+    timed_per_call,
+)
+
+from application.rate_limit import RateLimitUseCase
+from domain import PrefixAggregator, RateLimitStatus, TimeUnit
+from infrastructure.redis_client import RedisClient
+
+BATCH = 500
+
+
+def flood(requests: int, networks: int, seed: int = 1) -> list[str]:
+    """Return random addresses, each from one of a few /64 networks."""
+    rng = random.Random(seed)
+    bases = [
+        int(ipaddress.IPv6Address("2001:db8::")) + (index << 64)
+        for index in range(networks)
+    ]
+    return [
+        str(ipaddress.IPv6Address(rng.choice(bases) + rng.getrandbits(64)))
+        for _ in range(requests)
+    ]
+
+
+async def clear(redis) -> None:
+    """Delete the counters of earlier runs."""
+    keys = [key async for key in redis.scan_iter("rate_limit:*", count=1000)]
+    for first in range(0, len(keys), BATCH):
+        await redis.delete(*keys[first : first + BATCH])
+
+
+async def run_setup(client, name, addresses, limit, prefix_limit, real):
+    aggregator = None if name == "host" else PrefixAggregator()
+    use_case = RateLimitUseCase(
+        client,
+        limit=limit,
+        window_unit=TimeUnit.HOURS,
+        near_cache_size=0,
+        prefix_aggregator=aggregator,
+        prefix_limit=prefix_limit if name == "host+prefix" else None,
+    )
+    allowed = 0
+    start = now()
+    for first in range(0, len(addresses), BATCH):
+        batch = addresses[first : first + BATCH]
+        results = await use_case.check_and_increment_many(
+            [(address, 1, None) for address in batch]
+        )
+        allowed += sum(r.status == RateLimitStatus.ALLOWED for r in results)
+    per_check = timed_per_call(now() - start, len(addresses))
+
+    redis = client._client
+    keys, total = await string_key_footprint(redis, "rate_limit:*")
+    # The stand-in drops the connection on MEMORY USAGE, which it lacks
+    usage = await memory_usage(redis, "rate_limit:*") if real else None
+    await clear(redis)
+    return allowed, keys, total, usage, per_check
+
+
+async def run(url, real, requests, networks, limit, prefix_limit):
+    client = RedisClient(url)
+    await client.load_scripts()
+    await clear(client._client)
+    addresses = flood(requests, networks)
+
+    print(f"{requests} requests from {networks} /64 networks")
+    print(
+        f"{'setup':<13}{'allowed':>9}{'keys':>9}{'bytes':>11}"
+        f"{'MEMORY USAGE':>14}{'us/check':>10}"
+    )
+    for name in ("host", "prefix", "host+prefix"):
+        allowed, keys, total, usage, per_check = await run_setup(
+            client, name, addresses, limit, prefix_limit, real
+        )
+        shown = "n/a" if usage is None else str(usage)
+        print(
+            f"{name:<13}{allowed:>9}{keys:>9}{total:>11}"
+            f"{shown:>14}{per_check:>10.1f}"
+        )
+    await client._client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--networks", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--prefix-limit", type=int, default=1000)
+    args = parser.parse_args()
+    with redis_url(args.redis_url) as url:
+        asyncio.run(
+            run(
+                url,
+                args.redis_url is not None,
+                args.requests,
+                args.networks,
+                args.limit,
+                args.prefix_limit,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Measure the memory cost of queued waiters in the shaping limiter.
+
+Schedules --waiters requests spread over --identifiers and keeps them all
+waiting for their slots, the way the /rate-limit handler sleeps before
+answering. Reports traced memory per waiter for the limiter's own
+bookkeeping and for the whole waiting request (task, sleep and timer),
+and checks that requests beyond --max-waiters are rejected without a
+storage call.
+
+Slots come from an in-process GCRA stand-in implementing the same
+arithmetic as the Redis script, so the numbers isolate the limiter from
+Redis and the network.
+
+Usage:
+    uv run python benchmarks/bench_shaping.py [--waiters N]
+        [--identifiers N] [--max-waiters N]
+"""
+
+import argparse
+import asyncio
+import gc
+import math
+import time
+import tracemalloc
+
+from _support import now
+
+from domain import (
+    RateLimitConfig,
+    RateLimitStatus,
+    ShapingRateLimiter,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+class LocalSchedule:
+    """In-process stand-in for RedisClient.schedule."""
+
+    def __init__(self) -> None:
+        self.tats: dict[str, int] = {}
+        self.calls = 0
+
+    async def schedule(
+        self, key, emission_interval_us, tolerance_us, max_delay_us
+    ):
+        self.calls += 1
+        now = int(time.time() * 1_000_000)
+        tat = max(self.tats.get(key, now), now)
+        new_tat = tat + emission_interval_us
+        delay = new_tat - tolerance_us - now
+        if delay > max_delay_us:
+            retry_after_ms = math.ceil((delay - max_delay_us) / 1000)
+            return False, 0, retry_after_ms, math.ceil(tat / 1000), 0
+        self.tats[key] = new_tat
+        delay_ms = math.ceil(max(delay, 0) / 1000)
+        return True, 0, 0, math.ceil(new_tat / 1000), delay_ms
+
+
+async def run(waiters: int, identifiers: int, max_waiters: int):
+    per_identifier = math.ceil(waiters / identifiers)
+    # One request per minute per identifier, so no slot comes due while
+    # the benchmark runs
+    config = RateLimitConfig(
+        limit=1,
+        window=TimeWindow(duration=1, unit=TimeUnit.MINUTES),
+        burst=1,
+    )
+
+    def make_limiter(storage: LocalSchedule) -> ShapingRateLimiter:
+        return ShapingRateLimiter(
+            config,
+            storage,
+            max_wait_ms=(per_identifier + 1) * 60_000,
+            max_queue=per_identifier,
+            max_waiters=max_waiters,
+        )
+
+    storage = LocalSchedule()
+    limiter = make_limiter(storage)
+    ips = [f"10.0.{i // 256 % 256}.{i % 256}" for i in range(identifiers)]
+
+    async def request(ip: str) -> None:
+        result = await limiter.check_and_increment(ip)
+        if result.delay_ms > 0:
+            await asyncio.sleep(result.delay_ms / 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    start = now()
+    for i in range(waiters):
+        await limiter.check_and_increment(ips[i % identifiers])
+    rate = waiters / (now() - start)
+    bookkeeping = tracemalloc.get_traced_memory()[0] - baseline
+    queued = limiter.waiters
+
+    # Repeat with whole requests on a fresh limiter and slot table
+    tracemalloc.stop()
+    storage = LocalSchedule()
+    limiter = make_limiter(storage)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    tasks = [
+        asyncio.create_task(request(ips[i % identifiers]))
+        for i in range(waiters)
+    ]
+    await asyncio.sleep(0)
+    total = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    sleeping = limiter.waiters
+
+    calls = storage.calls
+    overflow = await limiter.check_and_increment(ips[0])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(
+        f"waiters={waiters} identifiers={identifiers} "
+        f"max_waiters={max_waiters}\n"
+        f"queued:                 {queued}\n"
+        f"schedules/s:            {rate:.0f}\n"
+        f"limiter bytes/waiter:   {bookkeeping / max(queued, 1):.0f}\n"
+        f"request bytes/waiter:   {total / max(sleeping, 1):.0f}\n"
+        f"total request memory:   {total / 2**20:.1f} MiB\n"
+        f"overflow status:        {overflow.status.value} "
+        f"(storage called: {storage.calls > calls})"
+    )
+    if sleeping >= max_waiters:
+        assert overflow.status == RateLimitStatus.REJECTED
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--waiters", type=int, default=100_000)
+    parser.add_argument("--identifiers", type=int, default=1000)
+    parser.add_argument("--max-waiters", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.waiters, args.identifiers, args.max_waiters))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Measure how throughput scales with the number of worker processes.
+
+For each worker count the service is started as a separate process
+(src/main.py with WORKERS=n, counters in the shared-memory table so all
+workers enforce one limit) and driven for a fixed time by several
+client processes, each running concurrent requests like bench_load.py.
+Reports requests/sec, p50/p99 latency and the speedup over one worker.
+
+Client processes compete with the workers for CPU, so run this on a
+machine with at least as many cores as workers plus clients; on fewer
+cores the extra workers only add context switches.
+
+Usage:
+    uv run python benchmarks/bench_workers.py [--workers 1,2,4]
+        [--clients N] [--concurrency N] [--duration SECONDS]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from ipaddress import IPv4Address
+
+from _support import SRC_DIR, now
+from aiohttp import ClientSession, TCPConnector
+from bench_load import BASE_ADDRESS, percentile
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health")
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def drive(port: int, client: int, concurrency: int, duration: float):
+    target = f"http://127.0.0.1:{port}/rate-limit"
+    latencies: list[float] = []
+    stop = now() + duration
+
+    async with ClientSession(
+        connector=TCPConnector(limit=concurrency)
+    ) as session:
+
+        async def send(task: int) -> None:
+            identifier = str(
+                IPv4Address(BASE_ADDRESS + client * concurrency + task)
+            )
+            while now() < stop:
+                start = now()
+                async with session.get(
+                    target, headers={"X-Forwarded-For": identifier}
+                ) as response:
+                    await response.read()
+                latencies.append(now() - start)
+
+        await asyncio.gather(*(send(task) for task in range(concurrency)))
+    return latencies
+
+
+def client_process(args: tuple[int, int, int, float]) -> list[float]:
+    return asyncio.run(drive(*args))
+
+
+def measure(workers: int, clients: int, concurrency: int, duration: float):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            WORKERS=str(workers),
+            STORAGE_BACKEND="shared",
+            SHARED_MEMORY_PATH=os.path.join(directory, "counters"),
+            SHARED_MEMORY_SLOTS="65536",
+            RATE_LIMIT_COUNT="1000000",
+            RATE_LIMIT_WINDOW_UNIT="hours",
+        )
+        server = subprocess.Popen(
+            [sys.executable, str(SRC_DIR / "main.py")],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port)
+            with multiprocessing.Pool(clients) as pool:
+                results = pool.map(
+                    client_process,
+                    [
+                        (port, client, concurrency, duration)
+                        for client in range(clients)
+                    ],
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(latency for result in results for latency in result)
+    return (
+        len(latencies) / duration,
+        percentile(latencies, 0.50) * 1e6,
+        percentile(latencies, 0.99) * 1e6,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=os.cpu_count())
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(
+        f"cpus={os.cpu_count()} clients={args.clients} "
+        f"concurrency={args.concurrency} duration={args.duration}s"
+    )
+    print(
+        f"{'workers':>8}{'req/s':>10}{'p50 us':>10}{'p99 us':>10}"
+        f"{'speedup':>9}"
+    )
+    single = None
+    for workers in (int(count) for count in args.workers.split(",")):
+        rps, p50_us, p99_us = measure(
+            workers, args.clients, args.concurrency, args.duration
+        )
+        single = single or rps
+        print(
+            f"{workers:>8}{rps:>10.0f}{p50_us:>10.0f}{p99_us:>10.0f}"
+            f"{rps / single:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from domain import (
     CheckResult,
     CheckStatus,
+    CircuitBreaker,
+    CircuitState,
     HealthCheckResult,
     HealthStatus,
 )
@@ -8,8 +10,13 @@ from infrastructure.redis_client import RedisClient
 
 
 class HealthCheckUseCase:
-    def __init__(self, redis_client: RedisClient) -> None:
+    def __init__(
+        self,
+        redis_client: RedisClient,
+        circuit_breaker: CircuitBreaker | None = None,
+    ) -> None:
         self.redis_client = redis_client
+        self.circuit_breaker = circuit_breaker
 
     async def execute(self) -> HealthCheckResult:
         ping_ok = await self.redis_client.ping()
@@ -18,4 +25,15 @@ class HealthCheckUseCase:
         overall_status = (
             HealthStatus.HEALTHY if ping_ok else HealthStatus.UNHEALTHY
         )
+
+        if self.circuit_breaker is not None:
+            state = self.circuit_breaker.state
+            closed = state == CircuitState.CLOSED
+            checks["circuit_breaker"] = CheckResult(
+                status=CheckStatus.OK if closed else CheckStatus.ERROR,
+                message=state.value,
+            )
+            # Requests are limited locally until the breaker closes
+            if not closed and overall_status == HealthStatus.HEALTHY:
+                overall_status = HealthStatus.DEGRADED
         return HealthCheckResult(status=overall_status, checks=checks)
@@ -1,11 +1,38 @@
+import math
+import time
+from collections.abc import Mapping
+from dataclasses import replace
+
 from domain import (
+    BinaryKeyEncoder,
+    CircuitBreaker,
+    CircuitBreakerRateLimiter,
+    CompositeRateLimiter,
     FixedWindowRateLimiter,
+    GcraRateLimiter,
+    HeavyHitterTracker,
+    LeasingRateLimiter,
+    PrefixAggregator,
+    PrefixRateLimiter,
+    RateLimitAlgorithm,
     RateLimitConfig,
+    RateLimiter,
     RateLimitResult,
+    RateLimitStatus,
+    RejectionCache,
+    RuleSet,
+    ShapingRateLimiter,
+    SlidingWindowCounterRateLimiter,
+    SlidingWindowLogRateLimiter,
     TimeUnit,
     TimeWindow,
+    TokenBucketRateLimiter,
 )
-from infrastructure import RedisClient
+from infrastructure import STORAGE_ERRORS, MemoryStorage, RateLimitStorage
+
+# Largest cost one check may count, bounding the work one batch item or
+# binary protocol request can ask for
+MAX_COST = 1000
 
 
 class RateLimitUseCase:
@@ -13,25 +40,212 @@ class RateLimitUseCase:
 
     def __init__(
         self,
-        redis_client: RedisClient,
+        redis_client: RateLimitStorage,
         limit: int = 100,
         window_duration: int = 1,
         window_unit: TimeUnit = TimeUnit.MINUTES,
+        near_cache_size: int = 0,
+        algorithm: RateLimitAlgorithm = RateLimitAlgorithm.FIXED_WINDOW,
+        lease_max_size: int | None = None,
+        capacity: int | None = None,
+        refill_rate: float | None = None,
+        burst: int | None = None,
+        max_wait_ms: int = 1000,
+        max_queue: int = 100,
+        max_waiters: int = 100_000,
+        rules: list[RateLimitConfig] | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        instances: int = 1,
+        heavy_hitters: HeavyHitterTracker | None = None,
+        key_encoding: str = "text",
+        rule_set: RuleSet | None = None,
+        prefix_aggregator: PrefixAggregator | None = None,
+        prefix_limit: int | None = None,
     ):
         """
         Initialize the rate limit use case.
 
         Args:
-            redis_client: Redis client for storage
+            redis_client: Redis client (or storage wrapping it)
             limit: Maximum requests allowed per window
             window_duration: Window duration
             window_unit: Unit for window duration
+            near_cache_size: Maximum number of rejected identifiers to
+                answer locally until their window resets (0 disables)
+            algorithm: Rate limiting algorithm to use
+            lease_max_size: Largest quota lease for the leasing
+                algorithm (None picks 5% of the limit)
+            capacity: Token bucket size (None uses the limit)
+            refill_rate: Token bucket refill in tokens per second (None
+                refills the limit once per window)
+            burst: GCRA requests allowed back to back (None uses the
+                limit)
+            max_wait_ms: Longest delay the shaping algorithm schedules
+                a request with before rejecting it
+            max_queue: Most requests one identifier may have waiting
+                with the shaping algorithm
+            max_waiters: Most requests waiting across all identifiers
+                with the shaping algorithm
+            rules: Several limits enforced together by the fixed window
+                algorithm, replacing limit and window when given
+            circuit_breaker: Breaker guarding the storage; while it is
+                open, requests are limited in process memory instead
+                (the storage must raise errors rather than fail open)
+            instances: Expected number of service instances; the local
+                fallback limiter enforces this share of each limit
+            heavy_hitters: Tracker counting every identifier; requests
+                from identifiers it blocked are rejected locally
+            key_encoding: "binary" packs the counter keys of the fixed
+                window and leasing algorithms with a BinaryKeyEncoder
+                instead of spelling them out as text
+            rule_set: Per-route, per-tier and per-network rules; each
+                rule gets a limiter of the same algorithm with its own
+                limits, and allowlisted addresses are never limited
+            prefix_aggregator: Maps client addresses to their network
+                prefix; without a prefix limit, each prefix (rather than
+                each address) gets the limit
+            prefix_limit: Limit of each network prefix, enforced by the
+                fixed window algorithm together with the limit of each
+                address in one atomic call
         """
         config = RateLimitConfig(
             limit=limit,
             window=TimeWindow(duration=window_duration, unit=window_unit),
+            capacity=capacity,
+            refill_rate=refill_rate,
+            burst=burst,
+        )
+        key_encoder = BinaryKeyEncoder() if key_encoding == "binary" else None
+
+        def build(
+            config: RateLimitConfig,
+            rules: list[RateLimitConfig] | None,
+            prefix_limit: int | None = None,
+        ) -> RateLimiter:
+            limiter = self._create_rate_limiter(
+                algorithm,
+                config,
+                redis_client,
+                lease_max_size=lease_max_size,
+                max_wait_ms=max_wait_ms,
+                max_queue=max_queue,
+                max_waiters=max_waiters,
+                rules=rules,
+                key_encoder=key_encoder,
+                prefix_aggregator=prefix_aggregator,
+                prefix_limit=prefix_limit,
+            )
+            if circuit_breaker is not None:
+                limiter = CircuitBreakerRateLimiter(
+                    limiter,
+                    self._create_fallback(
+                        config,
+                        rules,
+                        instances,
+                        prefix_aggregator=prefix_aggregator,
+                        prefix_limit=prefix_limit,
+                    ),
+                    circuit_breaker,
+                    storage_errors=STORAGE_ERRORS,
+                )
+            return limiter
+
+        self.rate_limiter = build(config, rules, prefix_limit)
+        # Without a prefix limit, prefixes replace addresses outright
+        self._aggregate = prefix_aggregator if prefix_limit is None else None
+        self.rule_set = rule_set
+        self._rule_limiters: dict[str, RateLimiter] = {}
+        for rule in rule_set.rules if rule_set is not None else []:
+            self._rule_limiters[rule.name] = build(
+                rule.limits[0],
+                list(rule.limits) if len(rule.limits) > 1 else None,
+            )
+        # A shaping rejection only means the queue is full right now, not
+        # that every request is rejected until reset_time
+        if algorithm == RateLimitAlgorithm.SHAPING:
+            near_cache_size = 0
+        self.rejection_cache = (
+            RejectionCache(near_cache_size) if near_cache_size > 0 else None
+        )
+        self.limit = limit
+        self.heavy_hitters = heavy_hitters
+
+    def _create_rate_limiter(
+        self,
+        algorithm: RateLimitAlgorithm,
+        config: RateLimitConfig,
+        storage: RateLimitStorage,
+        lease_max_size: int | None = None,
+        max_wait_ms: int = 1000,
+        max_queue: int = 100,
+        max_waiters: int = 100_000,
+        rules: list[RateLimitConfig] | None = None,
+        key_encoder: BinaryKeyEncoder | None = None,
+        prefix_aggregator: PrefixAggregator | None = None,
+        prefix_limit: int | None = None,
+    ) -> RateLimiter:
+        """Create the rate limiter implementing the given algorithm."""
+        match algorithm:
+            case RateLimitAlgorithm.FIXED_WINDOW if rules:
+                return CompositeRateLimiter(rules, storage)
+            case RateLimitAlgorithm.FIXED_WINDOW if (
+                prefix_limit is not None and prefix_aggregator is not None
+            ):
+                return PrefixRateLimiter(
+                    config, prefix_limit, storage, prefix_aggregator
+                )
+            case RateLimitAlgorithm.LEASING:
+                return LeasingRateLimiter(
+                    config,
+                    storage,
+                    max_lease=lease_max_size,
+                    key_encoder=key_encoder,
+                )
+            case RateLimitAlgorithm.SLIDING_WINDOW_LOG:
+                return SlidingWindowLogRateLimiter(config, storage)
+            case RateLimitAlgorithm.SLIDING_WINDOW_COUNTER:
+                return SlidingWindowCounterRateLimiter(config, storage)
+            case RateLimitAlgorithm.TOKEN_BUCKET:
+                return TokenBucketRateLimiter(config, storage)
+            case RateLimitAlgorithm.GCRA:
+                return GcraRateLimiter(config, storage)
+            case RateLimitAlgorithm.SHAPING:
+                return ShapingRateLimiter(
+                    config,
+                    storage,
+                    max_wait_ms=max_wait_ms,
+                    max_queue=max_queue,
+                    max_waiters=max_waiters,
+                )
+            case _:
+                return FixedWindowRateLimiter(config, storage, key_encoder)
+
+    def _create_fallback(
+        self,
+        config: RateLimitConfig,
+        rules: list[RateLimitConfig] | None,
+        instances: int,
+        prefix_aggregator: PrefixAggregator | None = None,
+        prefix_limit: int | None = None,
+    ) -> RateLimiter:
+        """Create the in-memory fixed window limiter used during outages."""
+
+        def share(limit: int) -> int:
+            # Every instance limits on its own, so each takes its share
+            return max(1, math.ceil(limit / max(1, instances)))
+
+        return self._create_rate_limiter(
+            RateLimitAlgorithm.FIXED_WINDOW,
+            replace(config, limit=share(config.limit)),
+            MemoryStorage(),
+            rules=[
+                replace(rule, limit=share(rule.limit)) for rule in rules or []
+            ],
+            prefix_aggregator=prefix_aggregator,
+            prefix_limit=(
+                None if prefix_limit is None else share(prefix_limit)
+            ),
         )
-        self.rate_limiter = FixedWindowRateLimiter(config, redis_client)
 
     def _extract_ip_address(
         self, headers: dict[str, str], remote_addr: str
@@ -62,18 +276,237 @@ class RateLimitUseCase:
         # Fallback to remote address
         return remote_addr or "127.0.0.1"
 
+    def _blocked(self, identifier: str) -> RateLimitResult | None:
+        """Count the identifier and return a rejection if it is blocked."""
+        self.heavy_hitters.record(identifier)
+        until = self.heavy_hitters.blocked_until(identifier)
+        if until is None:
+            return None
+        return RateLimitResult(
+            status=RateLimitStatus.REJECTED,
+            limit=self.limit,
+            remaining=0,
+            reset_time=math.ceil(until),
+            retry_after_ms=max(0, math.ceil((until - time.time()) * 1000)),
+        )
+
     async def check_and_increment(
-        self, headers: dict[str, str], remote_addr: str
+        self,
+        headers: Mapping[str, str],
+        remote_addr: str,
+        path: str | None = None,
     ) -> RateLimitResult:
         """
         Check and increment the rate limit for the given request.
 
+        With a rule set, requests from allowlisted addresses are allowed
+        without touching the storage, and the request's rule (chosen by
+        path, API key tier or network) limits it under the rule's name.
+
+        Args:
+            headers: Request headers
+            remote_addr: Remote address
+            path: Request path, for choosing a per-route rule
+
+        Returns:
+            Rate limit result
+        """
+        _, result = await self.check_request(headers, remote_addr, path)
+        return result
+
+    async def check_request(
+        self,
+        headers: Mapping[str, str],
+        remote_addr: str,
+        path: str | None = None,
+    ) -> tuple[str | None, RateLimitResult]:
+        """
+        Check and increment the rate limit for the given request.
+
+        Like check_and_increment, but also returns the name of the rule
+        that limited the request.
+
         Args:
             headers: Request headers
             remote_addr: Remote address
+            path: Request path, for choosing a per-route rule
+
+        Returns:
+            The rule name (None for the default limit) and the rate
+            limit result
+        """
+        ip = self._extract_ip_address(headers, remote_addr)
+        if self.rule_set is None:
+            return None, await self.check(ip)
+
+        if self.rule_set.is_allowlisted(ip):
+            return None, RateLimitResult(
+                status=RateLimitStatus.ALLOWED,
+                limit=self.limit,
+                remaining=self.limit,
+                reset_time=int(time.time()),
+            )
+        header = self.rule_set.api_key_header
+        api_key = headers.get(header, headers.get(header.lower()))
+        rule = self.rule_set.match(path or "/", ip, api_key)
+        if rule is None:
+            return None, await self.check(ip)
+        # Unknown keys are chosen by the client, so they count by address
+        if rule.key == "api_key" and self.rule_set.tier_of(api_key):
+            identifier = api_key
+        elif self._aggregate is not None:
+            identifier = self._aggregate(ip)
+        else:
+            identifier = ip
+        return rule.name, await self._check(
+            self._rule_limiters[rule.name], f"{rule.name}:{identifier}"
+        )
+
+    def client_ip(self, headers: Mapping[str, str], remote_addr: str) -> str:
+        """
+        Return the client IP address requests are limited by.
+
+        Args:
+            headers: Request headers
+            remote_addr: Remote address from connection
+
+        Returns:
+            IP address string, from X-Forwarded-For if present
+        """
+        return self._extract_ip_address(headers, remote_addr)
+
+    async def check(
+        self, identifier: str, cost: int = 1, rule: str | None = None
+    ) -> RateLimitResult:
+        """
+        Check and increment the rate limit of one identifier.
+
+        Args:
+            identifier: The identifier to limit, e.g. an IP address
+            cost: Number of requests the check counts as
+            rule: Rule name giving the identifier its own counter, as in
+                check_and_increment_many
 
         Returns:
             Rate limit result
+
+        Raises:
+            ValueError: If the cost is out of range, see validate_cost
+        """
+        if cost != 1 or rule:
+            results = await self.check_and_increment_many(
+                [(identifier, cost, rule)]
+            )
+            return results[0]
+
+        if self._aggregate is not None:
+            identifier = self._aggregate(identifier)
+        return await self._check(self.rate_limiter, identifier)
+
+    def validate_cost(self, cost: int) -> None:
+        """
+        Check that a cost can be counted by the rate limiter.
+
+        Algorithms with a weighted storage operation count costs of 1 to
+        MAX_COST in one call; the others only count a cost of 1.
+
+        Raises:
+            ValueError: If the cost is out of range
+        """
+        max_cost = MAX_COST if self.rate_limiter.weighted else 1
+        if not 1 <= cost <= max_cost:
+            raise ValueError(f"cost must be from 1 to {max_cost}")
+
+    async def _check(
+        self, limiter: RateLimiter, identifier: str
+    ) -> RateLimitResult:
+        """Check one identifier with limiter, consulting local state first."""
+        if self.heavy_hitters is not None:
+            # Blocked heavy hitters never reach the storage
+            blocked = self._blocked(identifier)
+            if blocked is not None:
+                return blocked
+
+        if self.rejection_cache is None:
+            return await limiter.check_and_increment(identifier)
+
+        # Identifiers already over the limit are answered locally
+        cached = self.rejection_cache.get(identifier)
+        if cached is not None:
+            return cached
+
+        result = await limiter.check_and_increment(identifier)
+        self.rejection_cache.put(identifier, result)
+        return result
+
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int, str | None]]
+    ) -> list[RateLimitResult]:
         """
-        identifier = self._extract_ip_address(headers, remote_addr)
-        return await self.rate_limiter.check_and_increment(identifier)
+        Check and increment the rate limits of several identifiers at once.
+
+        Items are evaluated by the rate limiter in one batch. A rule name
+        gives the identifier its own counter, so e.g. an IP address and
+        an API key with the same value do not share a limit: a rule of
+        the rule set counts with that rule's limits, on the counter
+        check_and_increment uses for it, and any other rule name counts
+        with the default limit in a namespace of its own. With prefix
+        aggregation, addresses are replaced by their network prefix
+        before the rule name is added.
+
+        Args:
+            items: (identifier, cost, rule) tuples; rule may be None
+
+        Returns:
+            One rate limit result per item, in the order of the items
+
+        Raises:
+            ValueError: If an item's cost is out of range, see
+                validate_cost
+        """
+        for _, cost, _ in items:
+            self.validate_cost(cost)
+        limiters = []
+        identifiers = []
+        for identifier, _, rule in items:
+            if self._aggregate is not None:
+                identifier = self._aggregate(identifier)
+            limiter = self._rule_limiters.get(rule) if rule else None
+            if limiter is not None:
+                identifier = f"{rule}:{identifier}"
+            else:
+                limiter = self.rate_limiter
+                if rule:
+                    identifier = f"ad-hoc:{rule}:{identifier}"
+            limiters.append(limiter)
+            identifiers.append(identifier)
+        results: list[RateLimitResult | None] = [None] * len(items)
+        pending: dict[RateLimiter, list[int]] = {}
+        for index, identifier in enumerate(identifiers):
+            if self.heavy_hitters is not None:
+                blocked = self._blocked(identifier)
+                if blocked is not None:
+                    results[index] = blocked
+                    continue
+            if self.rejection_cache is not None:
+                cached = self.rejection_cache.get(identifier)
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            pending.setdefault(limiters[index], []).append(index)
+
+        for limiter, indexes in pending.items():
+            checked = await limiter.check_and_increment_many(
+                [(identifiers[index], items[index][1]) for index in indexes]
+            )
+            for index, result in zip(indexes, checked):
+                if self.rejection_cache is not None:
+                    self.rejection_cache.put(identifiers[index], result)
+                results[index] = result
+        return results
+
+    async def close(self) -> None:
+        """Release state held by the rate limiter (e.g., unused leases)."""
+        await self.rate_limiter.close()
+        for limiter in self._rule_limiters.values():
+            await limiter.close()
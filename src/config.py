@@ -1,7 +1,24 @@
+import json
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 
-from domain import TimeUnit
+from domain import (
+    RateLimitAlgorithm,
+    RateLimitConfig,
+    Rule,
+    RuleSet,
+    TimeUnit,
+    TimeWindow,
+)
+
+# One RATE_LIMIT_RULES entry: count/[duration]unit, e.g. 10/s or 100/5m
+_RULE_PATTERN = re.compile(r"^(\d+)/(\d*)([smh])$")
+_RULE_UNITS = {
+    "s": TimeUnit.SECONDS,
+    "m": TimeUnit.MINUTES,
+    "h": TimeUnit.HOURS,
+}
 
 
 @dataclass
@@ -11,11 +28,144 @@ class Config:
     rate_limit_count: int
     rate_limit_window_duration: int
     rate_limit_window_unit: TimeUnit
+    workers: int = 1
+    binary_socket_path: str | None = None
+    binary_port: int | None = None
+    redis_cluster: bool = False
+    redis_key_layout: str = "keys"
+    hash_buckets: int = 1024
+    hash_field_expiry: bool = False
+    redis_key_encoding: str = "text"
+    storage_backend: str = "redis"
+    shared_memory_path: str = "/dev/shm/rate_limiter"
+    shared_memory_slots: int = 1 << 20
+    circuit_breaker: bool = False
+    circuit_breaker_failure_rate: float = 0.5
+    circuit_breaker_slow_call_ms: float = 250.0
+    circuit_breaker_open_seconds: float = 5.0
+    redis_timeout_ms: float | None = None
+    instance_count: int = 1
+    heavy_hitters: bool = True
+    heavy_hitter_capacity: int = 1000
+    heavy_hitter_top: int = 20
+    heavy_hitter_sync_seconds: float = 5.0
+    heavy_hitter_window_seconds: int = 60
+    heavy_hitter_block_threshold: int = 0
+    heavy_hitter_block_seconds: int = 60
+    admin_token: str | None = None
+    near_cache_max_size: int = 10000
+    redis_batching: bool = False
+    redis_batch_max_size: int = 512
+    redis_batch_max_delay_ms: float = 0.0
+    rate_limit_algorithm: RateLimitAlgorithm = RateLimitAlgorithm.FIXED_WINDOW
+    lease_max_size: int | None = None
+    token_bucket_capacity: int | None = None
+    token_bucket_refill_rate: float | None = None
+    gcra_burst: int | None = None
+    shaping_max_wait_ms: int = 1000
+    shaping_max_queue: int = 100
+    shaping_max_waiters: int = 100_000
+    rate_limit_rules: list[RateLimitConfig] = field(default_factory=list)
+    rule_set: RuleSet | None = None
+    ipv4_prefix_length: int = 32
+    ipv6_prefix_length: int = 128
+    prefix_rate_limit_count: int | None = None
+
+
+def parse_rules(value: str) -> list[RateLimitConfig]:
+    """
+    Parse comma-separated rate limit rules such as "10/s,1000/h".
+
+    Each rule is a count, a slash, an optional window duration and a
+    unit: "s", "m" or "h" (e.g. "100/5m" is 100 requests per 5 minutes).
+
+    Raises:
+        ValueError: If a rule is malformed
+    """
+    rules = []
+    for rule in filter(None, (part.strip() for part in value.split(","))):
+        match = _RULE_PATTERN.match(rule.lower())
+        if match is None:
+            raise ValueError(f"invalid rate limit rule: {rule!r}")
+        count, duration, unit = match.groups()
+        rules.append(
+            RateLimitConfig(
+                limit=int(count),
+                window=TimeWindow(
+                    duration=int(duration or "1"), unit=_RULE_UNITS[unit]
+                ),
+            )
+        )
+    return rules
+
+
+def load_rule_set(path: str) -> RuleSet:
+    """
+    Load per-route, per-tier and per-network rules from a file.
+
+    The file is JSON, or YAML if its name ends in .yaml or .yml (this
+    needs PyYAML). It holds an object with a "rules" list and optional
+    "allowlist" (CIDR networks), "api_keys" (API key to tier) and
+    "api_key_header" entries. Each rule has a "name", one of "path",
+    "tier" and "network", a "limit" in RATE_LIMIT_RULES syntax (e.g.
+    "10/s" or "10/s,1000/h") and optionally "key": "ip" or "api_key".
+
+    Raises:
+        OSError: If the file cannot be read
+        TypeError: If the file does not hold an object with a rules list
+        ValueError: If the file or a rule is malformed
+    """
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ValueError(
+                "YAML rule files need PyYAML (pip install pyyaml)"
+            ) from exc
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(
+        data.get("rules", []), list
+    ):
+        raise TypeError(f"{path}: expected an object with a rules list")
+
+    rules = []
+    for entry in data.get("rules", []):
+        try:
+            rules.append(
+                Rule(
+                    name=str(entry["name"]),
+                    limits=tuple(parse_rules(str(entry["limit"]))),
+                    path=entry.get("path"),
+                    tier=entry.get("tier"),
+                    network=entry.get("network"),
+                    key=entry.get("key", "ip"),
+                )
+            )
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"{path}: malformed rule {entry!r}") from exc
+    return RuleSet(
+        rules,
+        allowlist=data.get("allowlist"),
+        api_keys=data.get("api_keys"),
+        api_key_header=data.get("api_key_header", "X-API-Key"),
+    )
 
 
 def load_config() -> Config:
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
     port = int(os.getenv("PORT", "8000"))
+    # Worker processes sharing the port, 0 for one per CPU
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    # Binary check protocol on a Unix domain socket and/or a TCP port
+    binary_socket_path = os.getenv("BINARY_SOCKET_PATH") or None
+    binary_port_str = os.getenv("BINARY_PORT")
+    binary_port = int(binary_port_str) if binary_port_str else None
 
     # Rate limit configuration with defaults
     rate_limit_count = int(os.getenv("RATE_LIMIT_COUNT", "100"))
@@ -26,6 +176,142 @@ def load_config() -> Config:
         "RATE_LIMIT_WINDOW_UNIT", "minutes"
     ).lower()
 
+    near_cache_max_size = int(os.getenv("NEAR_CACHE_MAX_SIZE", "10000"))
+
+    # Parse algorithm, falling back to the fixed window
+    rate_limit_algorithm_str = os.getenv(
+        "RATE_LIMIT_ALGORITHM", "fixed_window"
+    ).lower()
+    try:
+        rate_limit_algorithm = RateLimitAlgorithm(rate_limit_algorithm_str)
+    except ValueError:
+        rate_limit_algorithm = RateLimitAlgorithm.FIXED_WINDOW
+
+    lease_max_size_str = os.getenv("LEASE_MAX_SIZE")
+    lease_max_size = int(lease_max_size_str) if lease_max_size_str else None
+
+    # Token bucket settings default to the limit per window
+    capacity_str = os.getenv("TOKEN_BUCKET_CAPACITY")
+    token_bucket_capacity = int(capacity_str) if capacity_str else None
+    refill_rate_str = os.getenv("TOKEN_BUCKET_REFILL_RATE")
+    token_bucket_refill_rate = (
+        float(refill_rate_str) if refill_rate_str else None
+    )
+
+    gcra_burst_str = os.getenv("GCRA_BURST")
+    gcra_burst = int(gcra_burst_str) if gcra_burst_str else None
+
+    # Traffic shaping delays requests up to a cutoff instead of rejecting
+    shaping_max_wait_ms = int(os.getenv("SHAPING_MAX_WAIT_MS", "1000"))
+    shaping_max_queue = int(os.getenv("SHAPING_MAX_QUEUE", "100"))
+    shaping_max_waiters = int(os.getenv("SHAPING_MAX_WAITERS", "100000"))
+
+    # Several limits enforced together, e.g. "10/s,1000/h"
+    rate_limit_rules = parse_rules(os.getenv("RATE_LIMIT_RULES", ""))
+
+    # Per-route, per-tier and per-network limits and the allowlist
+    rules_file = os.getenv("RULES_FILE")
+    rule_set = load_rule_set(rules_file) if rules_file else None
+
+    # Limit whole networks (e.g. IPv4 /24, IPv6 /64) instead of, or with
+    # a prefix limit as well as, single addresses
+    ipv4_prefix_length = int(os.getenv("IPV4_PREFIX_LENGTH", "32"))
+    ipv6_prefix_length = int(os.getenv("IPV6_PREFIX_LENGTH", "128"))
+    prefix_count_str = os.getenv("PREFIX_RATE_LIMIT_COUNT")
+    prefix_rate_limit_count = (
+        int(prefix_count_str) if prefix_count_str else None
+    )
+
+    # Treat REDIS_URL as one node of a Redis Cluster
+    redis_cluster = os.getenv("REDIS_CLUSTER", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+    # Keep fixed window counters in one key each or as fields of a few
+    # bucket hashes per window
+    redis_key_layout = os.getenv("REDIS_KEY_LAYOUT", "keys").lower()
+    if redis_key_layout not in ("keys", "hash"):
+        redis_key_layout = "keys"
+    hash_buckets = int(os.getenv("HASH_BUCKETS", "1024"))
+    hash_field_expiry = os.getenv("HASH_FIELD_EXPIRY", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+    # Spell fixed window counter keys out as text or pack them as bytes
+    redis_key_encoding = os.getenv("REDIS_KEY_ENCODING", "text").lower()
+    if redis_key_encoding not in ("text", "binary"):
+        redis_key_encoding = "text"
+
+    # Keep counters in Redis, in process memory or in a table shared by
+    # the processes of one host, falling back to Redis
+    storage_backend = os.getenv("STORAGE_BACKEND", "redis").lower()
+    if storage_backend not in ("redis", "memory", "shared"):
+        storage_backend = "redis"
+    shared_memory_path = os.getenv(
+        "SHARED_MEMORY_PATH", "/dev/shm/rate_limiter"
+    )
+    shared_memory_slots = int(os.getenv("SHARED_MEMORY_SLOTS", "1048576"))
+
+    # Circuit breaker around Redis, with a local limiter taking each
+    # instance's share of the limit while it is open
+    circuit_breaker = os.getenv("CIRCUIT_BREAKER", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    circuit_breaker_failure_rate = float(
+        os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")
+    )
+    circuit_breaker_slow_call_ms = float(
+        os.getenv("CIRCUIT_BREAKER_SLOW_CALL_MS", "250")
+    )
+    circuit_breaker_open_seconds = float(
+        os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "5")
+    )
+    instance_count = int(os.getenv("INSTANCE_COUNT", "1"))
+    # Bound on every Redis connect and reply, unbounded when unset
+    redis_timeout_str = os.getenv("REDIS_TIMEOUT_MS")
+    redis_timeout_ms = float(redis_timeout_str) if redis_timeout_str else None
+
+    # Top-K of the busiest identifiers, merged across instances, with
+    # automatic blocking of those above a threshold
+    heavy_hitters = os.getenv("HEAVY_HITTERS", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    heavy_hitter_capacity = int(os.getenv("HEAVY_HITTER_CAPACITY", "1000"))
+    heavy_hitter_top = int(os.getenv("HEAVY_HITTER_TOP", "20"))
+    heavy_hitter_sync_seconds = float(
+        os.getenv("HEAVY_HITTER_SYNC_SECONDS", "5")
+    )
+    heavy_hitter_window_seconds = int(
+        os.getenv("HEAVY_HITTER_WINDOW_SECONDS", "60")
+    )
+    heavy_hitter_block_threshold = int(
+        os.getenv("HEAVY_HITTER_BLOCK_THRESHOLD", "0")
+    )
+    heavy_hitter_block_seconds = int(
+        os.getenv("HEAVY_HITTER_BLOCK_SECONDS", "60")
+    )
+    # Bearer token required by the /admin endpoints, if set
+    admin_token = os.getenv("ADMIN_TOKEN") or None
+
+    # Micro-batching of concurrent increments into one pipeline
+    redis_batching = os.getenv("REDIS_BATCHING", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    redis_batch_max_size = int(os.getenv("REDIS_BATCH_MAX_SIZE", "512"))
+    redis_batch_max_delay_ms = float(
+        os.getenv("REDIS_BATCH_MAX_DELAY_MS", "0")
+    )
+
     # Parse time unit
     if rate_limit_window_unit_str == "seconds":
         rate_limit_window_unit = TimeUnit.SECONDS
@@ -37,7 +323,49 @@ def load_config() -> Config:
     return Config(
         redis_url=redis_url,
         port=port,
+        workers=workers,
+        binary_socket_path=binary_socket_path,
+        binary_port=binary_port,
         rate_limit_count=rate_limit_count,
         rate_limit_window_duration=rate_limit_window_duration,
         rate_limit_window_unit=rate_limit_window_unit,
+        redis_cluster=redis_cluster,
+        redis_key_layout=redis_key_layout,
+        hash_buckets=hash_buckets,
+        hash_field_expiry=hash_field_expiry,
+        redis_key_encoding=redis_key_encoding,
+        storage_backend=storage_backend,
+        shared_memory_path=shared_memory_path,
+        shared_memory_slots=shared_memory_slots,
+        circuit_breaker=circuit_breaker,
+        circuit_breaker_failure_rate=circuit_breaker_failure_rate,
+        circuit_breaker_slow_call_ms=circuit_breaker_slow_call_ms,
+        circuit_breaker_open_seconds=circuit_breaker_open_seconds,
+        redis_timeout_ms=redis_timeout_ms,
+        instance_count=instance_count,
+        heavy_hitters=heavy_hitters,
+        heavy_hitter_capacity=heavy_hitter_capacity,
+        heavy_hitter_top=heavy_hitter_top,
+        heavy_hitter_sync_seconds=heavy_hitter_sync_seconds,
+        heavy_hitter_window_seconds=heavy_hitter_window_seconds,
+        heavy_hitter_block_threshold=heavy_hitter_block_threshold,
+        heavy_hitter_block_seconds=heavy_hitter_block_seconds,
+        admin_token=admin_token,
+        near_cache_max_size=near_cache_max_size,
+        redis_batching=redis_batching,
+        redis_batch_max_size=redis_batch_max_size,
+        redis_batch_max_delay_ms=redis_batch_max_delay_ms,
+        rate_limit_algorithm=rate_limit_algorithm,
+        lease_max_size=lease_max_size,
+        token_bucket_capacity=token_bucket_capacity,
+        token_bucket_refill_rate=token_bucket_refill_rate,
+        gcra_burst=gcra_burst,
+        shaping_max_wait_ms=shaping_max_wait_ms,
+        shaping_max_queue=shaping_max_queue,
+        shaping_max_waiters=shaping_max_waiters,
+        rate_limit_rules=rate_limit_rules,
+        rule_set=rule_set,
+        ipv4_prefix_length=ipv4_prefix_length,
+        ipv6_prefix_length=ipv6_prefix_length,
+        prefix_rate_limit_count=prefix_rate_limit_count,
     )
@@ -1,6 +1,24 @@
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRateLimiter,
+    CircuitState,
+)
+from .composite import CompositeRateLimiter, MultiWindowStorage
+from .gcra import GcraRateLimiter, GcraStorage
 from .health import CheckResult, CheckStatus, HealthCheckResult, HealthStatus
+from .heavy_hitters import (
+    BlockCache,
+    HeavyHitterStorage,
+    HeavyHitterTracker,
+    SpaceSaving,
+)
+from .keys import BinaryKeyEncoder
+from .leasing import LeasingRateLimiter, QuotaLeaseStorage
+from .near_cache import RejectionCache
+from .prefixes import PrefixAggregator, PrefixRateLimiter
 from .rate_limit import (
     FixedWindowRateLimiter,
+    RateLimitAlgorithm,
     RateLimitConfig,
     RateLimitResult,
     RateLimitStatus,
@@ -8,7 +26,17 @@ from .rate_limit import (
     RateLimitStorage,
     TimeUnit,
     TimeWindow,
+    hash_tag,
+)
+from .rules import CidrTree, PathTrie, Rule, RuleSet
+from .shaping import ShapingRateLimiter, ShapingStorage
+from .sliding_window import (
+    SlidingWindowCounterRateLimiter,
+    SlidingWindowCounterStorage,
+    SlidingWindowLogRateLimiter,
+    SlidingWindowLogStorage,
 )
+from .token_bucket import TokenBucketRateLimiter, TokenBucketStorage
 
 __all__ = [
     "HealthStatus",
@@ -16,6 +44,7 @@ __all__ = [
     "CheckResult",
     "HealthCheckResult",
     "RateLimitStatus",
+    "RateLimitAlgorithm",
     "TimeUnit",
     "TimeWindow",
     "RateLimitResult",
@@ -23,4 +52,34 @@ __all__ = [
     "RateLimitStorage",
     "RateLimitConfig",
     "FixedWindowRateLimiter",
+    "BinaryKeyEncoder",
+    "PrefixAggregator",
+    "PrefixRateLimiter",
+    "RejectionCache",
+    "LeasingRateLimiter",
+    "QuotaLeaseStorage",
+    "SlidingWindowLogRateLimiter",
+    "SlidingWindowLogStorage",
+    "SlidingWindowCounterRateLimiter",
+    "SlidingWindowCounterStorage",
+    "TokenBucketRateLimiter",
+    "TokenBucketStorage",
+    "GcraRateLimiter",
+    "GcraStorage",
+    "ShapingRateLimiter",
+    "ShapingStorage",
+    "CompositeRateLimiter",
+    "MultiWindowStorage",
+    "CircuitBreaker",
+    "CircuitBreakerRateLimiter",
+    "CircuitState",
+    "SpaceSaving",
+    "BlockCache",
+    "HeavyHitterStorage",
+    "HeavyHitterTracker",
+    "PathTrie",
+    "CidrTree",
+    "Rule",
+    "RuleSet",
+    "hash_tag",
 ]
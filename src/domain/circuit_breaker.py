@@ -0,0 +1,189 @@
+import time
+from collections import deque
+from collections.abc import Callable
+from enum import Enum
+
+from .rate_limit import RateLimiter, RateLimitResult
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker tracking the health of calls to a backend.
+
+    While closed, the outcome of the last window_size calls is kept; a
+    call fails if it raises or takes at least slow_call_ms. Once at least
+    min_calls outcomes are known and the share of failures reaches
+    failure_rate, the breaker opens and calls are refused for
+    open_seconds. It then turns half-open and lets half_open_calls
+    probe calls through: if they all succeed it closes again, and the
+    first failure opens it for another open_seconds.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call_ms: float = 250,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 5.0,
+        half_open_calls: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < failure_rate <= 1:
+            raise ValueError("failure_rate must be in (0, 1]")
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.min_calls = min(min_calls, window_size)
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        # Outcomes of recent calls while closed, True for a failure
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state, turning half-open once the open time is over."""
+        if (
+            self._state == CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.open_seconds
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+        return self._state
+
+    @property
+    def recent_failure_rate(self) -> float:
+        """Share of failed calls among the recent calls while closed."""
+        if not self._outcomes:
+            return 0.0
+        return self._failures / len(self._outcomes)
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the backend now."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if (
+            state == CircuitState.HALF_OPEN
+            and self._probes < self.half_open_calls
+        ):
+            self._probes += 1
+            return True
+        return False
+
+    def record_success(self, duration_ms: float) -> None:
+        """Record a call that returned, failing it if it was too slow."""
+        self._record(duration_ms >= self.slow_call_ms)
+
+    def record_failure(self) -> None:
+        """Record a call that raised."""
+        self._record(True)
+
+    def _record(self, failed: bool) -> None:
+        state = self.state
+        if state == CircuitState.HALF_OPEN:
+            if failed:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._close()
+        elif state == CircuitState.CLOSED:
+            if len(self._outcomes) == self._outcomes.maxlen:
+                self._failures -= self._outcomes[0]
+            self._outcomes.append(failed)
+            self._failures += failed
+            if (
+                len(self._outcomes) >= self.min_calls
+                and self.recent_failure_rate >= self.failure_rate
+            ):
+                self._open()
+        # Calls started before the breaker opened are ignored
+
+    def _open(self) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+
+    def _close(self) -> None:
+        self._state = CircuitState.CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+
+
+class CircuitBreakerRateLimiter(RateLimiter):
+    """
+    Rate limiter falling back to a local limiter when storage fails.
+
+    Checks go to the primary limiter while the circuit breaker allows
+    it. A check that raises a storage error is answered by the fallback
+    limiter and counted against the breaker. A slow check is counted
+    against the breaker too, but it is awaited rather than cancelled:
+    the storage may already have counted the request, so answering it
+    again from the fallback would count it twice. Bound the wait with
+    the storage's own timeout, whose errors then count as failures.
+    While the breaker is open every check is answered by the fallback
+    without touching the failing storage.
+    """
+
+    def __init__(
+        self,
+        primary: RateLimiter,
+        fallback: RateLimiter,
+        breaker: CircuitBreaker,
+        storage_errors: tuple[type[Exception], ...] = (OSError,),
+    ):
+        """
+        Initialize the circuit breaker rate limiter.
+
+        Args:
+            primary: Limiter backed by the shared storage; its storage
+                must raise errors instead of failing open
+            fallback: Local limiter used while the storage is failing
+            breaker: Circuit breaker guarding the primary limiter
+            storage_errors: Errors the primary's storage raises when it
+                fails; others propagate
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+        self.storage_errors = storage_errors
+        self.weighted = primary.weighted and fallback.weighted
+
+    async def _check(self, method: str, *args):
+        if not self.breaker.allow():
+            return await getattr(self.fallback, method)(*args)
+        start = time.perf_counter()
+        try:
+            result = await getattr(self.primary, method)(*args)
+        except self.storage_errors:
+            self.breaker.record_failure()
+            return await getattr(self.fallback, method)(*args)
+        self.breaker.record_success((time.perf_counter() - start) * 1000)
+        return result
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Check with the primary limiter, or locally if it is failing."""
+        return await self._check("check_and_increment", identifier)
+
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int]]
+    ) -> list[RateLimitResult]:
+        """Check a batch with the primary limiter, or locally."""
+        return await self._check("check_and_increment_many", items)
+
+    async def close(self) -> None:
+        """Release state held by both limiters."""
+        await self.primary.close()
+        await self.fallback.close()
@@ -0,0 +1,170 @@
+import time
+from typing import Protocol
+
+from .rate_limit import (
+    RateLimitConfig,
+    RateLimiter,
+    RateLimitResult,
+    RateLimitStatus,
+    hash_tag,
+)
+
+
+class MultiWindowStorage(Protocol):
+    """Protocol for storage checking several window counters at once."""
+
+    async def increment_all(
+        self,
+        keys: list[str],
+        limits: list[int],
+        ttls: list[int],
+        cost: int = 1,
+    ) -> tuple[bool, list[int]]:
+        """
+        Atomically increment every rule's counter only if all have room.
+
+        Args:
+            keys: One window counter key per rule
+            limits: The limit of each rule
+            ttls: Time-to-live in seconds of each rule's new counter
+            cost: Amount to add to every counter
+
+        Returns:
+            Tuple of (allowed, count of each rule): the new counts if
+            allowed, otherwise the unchanged current counts
+        """
+        ...
+
+    async def increment_all_many(
+        self, calls: list[tuple[list[str], list[int], list[int], int]]
+    ) -> list[tuple[bool, list[int]]]:
+        """
+        Run several increment_all calls in one round-trip.
+
+        Args:
+            calls: (keys, limits, ttls, cost) tuples
+
+        Returns:
+            (allowed, counts) tuples, in the order of the calls
+        """
+        ...
+
+
+class CompositeRateLimiter(RateLimiter):
+    """
+    Fixed window rate limiter enforcing several rules at once.
+
+    Each rule (e.g. 10 per second and 1000 per hour) has its own window
+    counter. All counters are checked and incremented in one storage
+    call, and only if every rule has room, so a request rejected by one
+    rule does not use up the quota of the others. The result reports
+    the most restrictive rule.
+    """
+
+    weighted = True
+
+    def __init__(
+        self, rules: list[RateLimitConfig], storage: MultiWindowStorage
+    ):
+        """
+        Initialize the composite rate limiter.
+
+        Args:
+            rules: Limits that must all hold, with distinct window
+                lengths
+            storage: Storage checking several counters atomically
+
+        Raises:
+            ValueError: If no rules are given or two share a window
+                length (they would share a counter)
+        """
+        self._validate(rules)
+        self.rules = rules
+        self.storage = storage
+
+    def _validate(self, rules: list[RateLimitConfig]) -> None:
+        """Raise ValueError unless every rule gets its own counter."""
+        if not rules:
+            raise ValueError("at least one rule is required")
+        lengths = [rule.window.seconds for rule in rules]
+        if len(set(lengths)) != len(lengths):
+            raise ValueError("rules must have distinct window lengths")
+
+    def _get_key(
+        self, identifier: str, window_seconds: int, window_start: int
+    ) -> str:
+        """Generate the storage key for the identifier and rule window."""
+        # Windows of different lengths can start at the same second
+        tag = hash_tag(identifier)
+        return f"rate_limit:{tag}:{window_seconds}:{window_start}"
+
+    def _windows(self, current_time: int) -> list[tuple[int, int]]:
+        """Return (window length, window start) of every rule."""
+        windows = []
+        for rule in self.rules:
+            seconds = rule.window.seconds
+            windows.append((seconds, current_time // seconds * seconds))
+        return windows
+
+    def _call(
+        self, identifier: str, cost: int, windows: list[tuple[int, int]]
+    ) -> tuple[list[str], list[int], list[int], int]:
+        keys = [
+            self._get_key(identifier, seconds, start)
+            for seconds, start in windows
+        ]
+        limits = [rule.limit for rule in self.rules]
+        ttls = [seconds for seconds, _ in windows]
+        return keys, limits, ttls, cost
+
+    def _result(
+        self,
+        allowed: bool,
+        counts: list[int],
+        cost: int,
+        windows: list[tuple[int, int]],
+    ) -> RateLimitResult:
+        """Build the result of the most restrictive rule."""
+        candidates = []
+        for rule, count, (seconds, start) in zip(self.rules, counts, windows):
+            # A rejected request did not increment, so count is current
+            if allowed or count + cost > rule.limit:
+                remaining = max(0, rule.limit - count)
+                candidates.append((remaining, -(start + seconds), rule))
+
+        # Fewest remaining wins; on a tie, the rule that resets last
+        remaining, reset, rule = min(candidates, key=lambda c: c[:2])
+        return RateLimitResult(
+            status=(
+                RateLimitStatus.ALLOWED
+                if allowed
+                else RateLimitStatus.REJECTED
+            ),
+            limit=rule.limit,
+            remaining=remaining,
+            reset_time=-reset,
+        )
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Check every rule and increment all counters if all pass."""
+        windows = self._windows(int(time.time()))
+        allowed, counts = await self.storage.increment_all(
+            *self._call(identifier, 1, windows)
+        )
+        return self._result(allowed, counts, 1, windows)
+
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int]]
+    ) -> list[RateLimitResult]:
+        """Check every item against all rules in one round-trip."""
+        windows = self._windows(int(time.time()))
+        results = await self.storage.increment_all_many(
+            [
+                self._call(identifier, cost, windows)
+                for identifier, cost in items
+            ]
+        )
+        return [
+            self._result(allowed, counts, cost, windows)
+            for (allowed, counts), (_, cost) in zip(results, items)
+        ]
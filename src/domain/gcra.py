@@ -0,0 +1,103 @@
+import math
+from typing import Protocol
+
+from .rate_limit import (
+    RateLimitConfig,
+    RateLimiter,
+    RateLimitResult,
+    RateLimitStatus,
+    hash_tag,
+)
+
+
+class GcraStorage(Protocol):
+    """Protocol for storage keeping one theoretical arrival time per key."""
+
+    async def update_tat(
+        self,
+        key: str,
+        emission_interval_us: int,
+        tolerance_us: int,
+        cost: int = 1,
+    ) -> tuple[bool, int, int, int]:
+        """
+        Atomically apply the GCRA to the key's theoretical arrival time.
+
+        Args:
+            key: The key holding the theoretical arrival time (TAT)
+            emission_interval_us: Microseconds between requests at the
+                sustained rate
+            tolerance_us: How far ahead of now the TAT may run, which
+                sets the burst size
+            cost: Number of requests to count at once
+
+        Returns:
+            Tuple of (allowed, requests left in the burst, milliseconds
+            until a retry can succeed, Unix time in ms when the burst is
+            fully available again)
+        """
+        ...
+
+
+class GcraRateLimiter(RateLimiter):
+    """
+    Generic Cell Rate Algorithm (GCRA) rate limiter implementation.
+
+    Stores a single integer per identifier: the theoretical arrival time
+    (TAT) of the next request at the sustained rate of limit requests
+    per window. A request is allowed if the TAT is no more than the
+    burst tolerance ahead of now, which enforces a smooth rate while
+    still allowing up to burst requests back to back.
+    """
+
+    weighted = True
+
+    def __init__(self, config: RateLimitConfig, storage: GcraStorage):
+        self.config = config
+        self.storage = storage
+        self.burst = config.burst or config.limit
+        self.emission_interval_us = math.ceil(
+            config.window.seconds * 1_000_000 / config.limit
+        )
+        self.tolerance_us = self.emission_interval_us * self.burst
+
+    def _get_key(self, identifier: str) -> str:
+        """Generate the storage key for the identifier's TAT."""
+        return f"rate_limit_gcra:{hash_tag(identifier)}"
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Check the identifier's TAT and advance it if allowed."""
+        return await self._check(identifier, 1)
+
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int]]
+    ) -> list[RateLimitResult]:
+        """Check the items one by one, each cost in one storage call."""
+        return [
+            await self._check(identifier, cost) for identifier, cost in items
+        ]
+
+    async def _check(self, identifier: str, cost: int) -> RateLimitResult:
+        (
+            allowed,
+            remaining,
+            retry_after_ms,
+            reset_at_ms,
+        ) = await self.storage.update_tat(
+            self._get_key(identifier),
+            self.emission_interval_us,
+            self.tolerance_us,
+            cost,
+        )
+
+        return RateLimitResult(
+            status=(
+                RateLimitStatus.ALLOWED
+                if allowed
+                else RateLimitStatus.REJECTED
+            ),
+            limit=self.burst,
+            remaining=max(0, remaining),
+            reset_time=math.ceil(reset_at_ms / 1000),
+            retry_after_ms=retry_after_ms,
+        )
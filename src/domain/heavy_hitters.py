@@ -0,0 +1,280 @@
+import asyncio
+import heapq
+import time
+from collections.abc import Callable
+from operator import itemgetter
+from typing import Protocol
+
+from .rate_limit import hash_tag
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the most frequent items in a stream.
+
+    At most capacity items are counted. An item that is not counted yet
+    replaces the item with the lowest count and inherits that count, so
+    counts are upper bounds that overestimate by at most the smallest
+    count, and any item seen more than 1/capacity of the time is always
+    in the summary. The minimum is found through a heap holding one
+    entry per item; entries are only corrected when they reach the top,
+    so counting a tracked item is a single dictionary update.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._counts: dict[str, int] = {}
+        # (count, item) per item; a count may lag behind _counts
+        self._heap: list[tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, item: str, count: int = 1) -> None:
+        """Count item count more times."""
+        counts = self._counts
+        current = counts.get(item)
+        if current is not None:
+            counts[item] = current + count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            heapq.heappush(self._heap, (count, item))
+            return
+
+        heap = self._heap
+        while True:
+            low, victim = heap[0]
+            actual = counts[victim]
+            if actual == low:
+                break
+            heapq.heapreplace(heap, (actual, victim))
+        del counts[victim]
+        counts[item] = low + count
+        heapq.heapreplace(heap, (low + count, item))
+
+    def top(self, k: int) -> list[tuple[str, int]]:
+        """Return the k items with the highest counts, highest first."""
+        return heapq.nlargest(k, self._counts.items(), key=itemgetter(1))
+
+    def drain(self) -> dict[str, int]:
+        """Return every counted item and start the summary over."""
+        counts = self._counts
+        self._counts = {}
+        self._heap = []
+        return counts
+
+
+class BlockCache:
+    """
+    Bounded in-process set of identifiers blocked until a given time.
+
+    Requests from a blocked identifier are rejected locally without
+    reaching the storage. Entries expire at their end time; when the
+    cache is full, the entry ending soonest makes room.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self._entries: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, identifier: str, now: float | None = None) -> float | None:
+        """
+        Return the Unix time the identifier is blocked until, if blocked.
+
+        Args:
+            identifier: The identifier to look up
+            now: Current Unix time, defaults to time.time()
+        """
+        until = self._entries.get(identifier)
+        if until is None:
+            return None
+        if now is None:
+            now = time.time()
+        if now >= until:
+            del self._entries[identifier]
+            return None
+        return until
+
+    def block(self, identifier: str, until: float) -> None:
+        """Block an identifier until the given Unix time."""
+        self._entries[identifier] = until
+        if len(self._entries) > self.max_size:
+            soonest = min(self._entries, key=self._entries.__getitem__)
+            del self._entries[soonest]
+
+    def unblock(self, identifier: str) -> bool:
+        """Unblock an identifier, returning whether it was blocked."""
+        return self._entries.pop(identifier, None) is not None
+
+    def entries(self, now: float | None = None) -> dict[str, float]:
+        """Return the blocked identifiers and their end times."""
+        if now is None:
+            now = time.time()
+        return {
+            identifier: until
+            for identifier, until in self._entries.items()
+            if until > now
+        }
+
+
+class HeavyHitterStorage(Protocol):
+    """Protocol for storage merging the heavy hitters of all instances."""
+
+    async def merge_top(
+        self,
+        current_key: str,
+        previous_key: str,
+        counts: dict[str, int],
+        ttl: int,
+        capacity: int,
+        top: int,
+    ) -> list[tuple[str, int]]:
+        """
+        Add counts to the current window and return the global top.
+
+        Args:
+            current_key: Key of the current window's summary
+            previous_key: Key of the previous window's summary
+            counts: Requests per identifier since the last merge
+            ttl: Time-to-live in seconds of a window's summary
+            capacity: Most identifiers a window's summary keeps
+            top: Number of identifiers to return
+
+        Returns:
+            (identifier, count over both windows) pairs, highest first
+        """
+        ...
+
+
+class HeavyHitterTracker:
+    """
+    Streaming top-K of the identifiers sending the most requests.
+
+    Every request is counted in a local Space-Saving summary of fixed
+    size. Every few seconds the summary is merged into a shared one per
+    time window in the storage and cleared, and the merged top-K over
+    the current and previous window becomes the fleet-wide view. If the
+    storage cannot be reached, the local counts are ranked instead.
+
+    Identifiers in the view with at least block_threshold requests are
+    promoted into a local block cache for block_seconds, so their
+    requests are rejected before they reach the storage; identifiers can
+    also be blocked by hand.
+    """
+
+    def __init__(
+        self,
+        storage: HeavyHitterStorage,
+        capacity: int = 1000,
+        top: int = 20,
+        window_seconds: int = 60,
+        block_threshold: int = 0,
+        block_seconds: int = 60,
+        block_cache_size: int = 10000,
+        clock: Callable[[], float] = time.time,
+        storage_errors: tuple[type[Exception], ...] = (OSError,),
+    ):
+        """
+        Initialize the heavy hitter tracker.
+
+        Args:
+            storage: Storage merging the summaries of all instances
+            capacity: Identifiers counted locally and kept per window
+            top: Number of identifiers in the view
+            window_seconds: Length of a shared summary's window
+            block_threshold: Requests over the current and previous
+                window that get an identifier blocked (0 disables)
+            block_seconds: How long a promoted identifier stays blocked
+            block_cache_size: Most identifiers blocked at once
+            clock: Current Unix time in seconds
+            storage_errors: Errors the storage raises when it cannot be
+                reached; others propagate
+        """
+        self.storage = storage
+        self.capacity = capacity
+        self.top_size = top
+        self.window_seconds = window_seconds
+        self.block_threshold = block_threshold
+        self.block_seconds = block_seconds
+        self.block_cache = BlockCache(block_cache_size)
+        self.top: list[tuple[str, int]] = []
+        self._clock = clock
+        self._sketch = SpaceSaving(capacity)
+        self._storage_errors = storage_errors
+
+    def _key(self, window: int) -> str:
+        # One hash tag for both windows, so a cluster merges them on one node
+        return f"rate_limit:heavy_hitters:{hash_tag('top')}:{window}"
+
+    def record(self, identifier: str) -> None:
+        """Count a request from the identifier."""
+        self._sketch.add(identifier)
+
+    def blocked_until(self, identifier: str) -> float | None:
+        """Return the Unix time the identifier is blocked until, if any."""
+        return self.block_cache.get(identifier)
+
+    def block(self, identifier: str, seconds: int | None = None) -> float:
+        """
+        Block an identifier locally.
+
+        Args:
+            identifier: The identifier to block
+            seconds: Block duration, defaults to block_seconds
+
+        Returns:
+            The Unix time the identifier is blocked until
+        """
+        if seconds is None:
+            seconds = self.block_seconds
+        until = self._clock() + seconds
+        self.block_cache.block(identifier, until)
+        return until
+
+    def unblock(self, identifier: str) -> bool:
+        """Unblock an identifier, returning whether it was blocked."""
+        return self.block_cache.unblock(identifier)
+
+    async def sync(self) -> list[tuple[str, int]]:
+        """
+        Merge the local counts into the shared summary and refresh the view.
+
+        Returns:
+            The new top identifiers and their counts, highest first
+        """
+        window = int(self._clock() // self.window_seconds)
+        counts = self._sketch.drain()
+        try:
+            self.top = await self.storage.merge_top(
+                self._key(window),
+                self._key(window - 1),
+                counts,
+                ttl=2 * self.window_seconds,
+                capacity=self.capacity,
+                top=self.top_size,
+            )
+        except self._storage_errors:
+            # Storage unavailable: rank what this instance has seen
+            self.top = heapq.nlargest(
+                self.top_size, counts.items(), key=itemgetter(1)
+            )
+
+        if self.block_threshold > 0:
+            for identifier, count in self.top:
+                if count >= self.block_threshold:
+                    self.block(identifier)
+        return self.top
+
+    async def run(self, interval: float) -> None:
+        """Sync every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.sync()
@@ -0,0 +1,243 @@
+import asyncio
+import math
+import time
+from collections.abc import Callable
+from typing import Protocol
+
+from .rate_limit import (
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    RateLimiter,
+    RateLimitResult,
+    RateLimitStatus,
+)
+
+
+class QuotaLeaseStorage(Protocol):
+    """Protocol for storage that hands out blocks of a window's quota."""
+
+    async def reserve(
+        self, key: str, amount: int, limit: int, ttl: int
+    ) -> tuple[int, int]:
+        """
+        Atomically reserve up to amount units without exceeding limit.
+
+        Args:
+            key: The window counter key
+            amount: Number of units requested
+            limit: Total units available in the window
+            ttl: Time-to-live in seconds for a new key
+
+        Returns:
+            Tuple of (units granted, units reserved in the window so far)
+        """
+        ...
+
+    async def release(self, key: str, amount: int) -> None:
+        """
+        Give unused units back to the window.
+
+        Args:
+            key: The window counter key
+            amount: Number of units to return
+        """
+        ...
+
+
+class _Lease:
+    """Local share of one identifier's window quota."""
+
+    __slots__ = (
+        "available",
+        "consumed",
+        "exhausted",
+        "lease_size",
+        "refill",
+        "reserved_total",
+        "started_at",
+        "waiting",
+        "window_start",
+    )
+
+    def __init__(self, window_start: int, started_at: float, lease_size: int):
+        self.window_start = window_start
+        self.started_at = started_at
+        self.available = 0
+        self.consumed = 0
+        self.reserved_total = 0
+        self.lease_size = lease_size
+        self.waiting = 0
+        self.exhausted = False
+        self.refill: asyncio.Task | None = None
+
+
+class LeasingRateLimiter(FixedWindowRateLimiter):
+    """
+    Fixed window rate limiter that leases blocks of quota from storage.
+
+    Instead of one storage increment per request, each instance reserves
+    a chunk of the window's quota and serves requests from it locally.
+    The next chunk is reserved in the background before the current one
+    runs out. Because storage never grants more than the window limit in
+    total, the cluster cannot admit more than the limit; the cost is that
+    up to one lease per instance may sit unused when the quota runs out.
+
+    Lease size adapts per identifier to its consumption rate: a key
+    consuming r requests/second leases about r * lease_seconds units,
+    bounded by min_lease and max_lease.
+    """
+
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        storage: QuotaLeaseStorage,
+        min_lease: int = 1,
+        max_lease: int | None = None,
+        lease_seconds: float = 1.0,
+        prefetch_ratio: float = 0.5,
+        key_encoder: Callable[[str, int], bytes] | None = None,
+    ):
+        """
+        Initialize the leasing rate limiter.
+
+        Args:
+            config: Rate limit configuration
+            storage: Storage handing out quota leases
+            min_lease: Smallest number of units reserved at once
+            max_lease: Largest number of units reserved at once,
+                defaults to 5% of the limit
+            lease_seconds: Seconds of traffic a lease should cover
+            prefetch_ratio: Reserve the next lease when the local share
+                drops to this fraction of the lease size
+            key_encoder: Builds the counter key from the identifier and
+                window start; None uses text keys
+        """
+        super().__init__(config, storage, key_encoder)
+        if max_lease is None:
+            max_lease = max(min_lease, config.limit // 20)
+        self.min_lease = min_lease
+        self.max_lease = max_lease
+        self.lease_seconds = lease_seconds
+        self.prefetch_ratio = prefetch_ratio
+        self._leases: dict[str, _Lease] = {}
+        self._window_start = 0
+
+    # Batches are served from the local leases one item at a time
+    check_and_increment_many = RateLimiter.check_and_increment_many
+    weighted = False
+
+    def _next_lease_size(self, lease: _Lease, now: float) -> int:
+        """Size the next lease from the identifier's consumption rate."""
+        elapsed = max(now - lease.started_at, 1.0)
+        rate = lease.consumed / elapsed
+        # Requests already queued on an empty lease need serving too
+        size = max(math.ceil(rate * self.lease_seconds), lease.waiting)
+        return max(self.min_lease, min(self.max_lease, size))
+
+    def _prune(self, window_start: int) -> None:
+        """Forget leases older than the previous window."""
+        previous = window_start - self._get_window_seconds()
+        self._leases = {
+            identifier: lease
+            for identifier, lease in self._leases.items()
+            if lease.window_start >= previous
+        }
+        self._window_start = window_start
+
+    def _get_lease(self, identifier: str, window_start: int, now: float):
+        if window_start != self._window_start:
+            self._prune(window_start)
+
+        lease = self._leases.get(identifier)
+        if lease is not None and lease.window_start == window_start:
+            return lease
+
+        # Window rollover: the previous window's counter is no longer
+        # consulted, so its unused share is simply dropped
+        lease_size = self.min_lease
+        if lease is not None:
+            lease_size = self._next_lease_size(lease, now)
+        lease = _Lease(window_start, now, lease_size)
+        self._leases[identifier] = lease
+        return lease
+
+    async def _reserve(self, identifier: str, lease: _Lease) -> None:
+        window_seconds = self._get_window_seconds()
+        key = self._get_key(identifier, lease.window_start)
+        lease.lease_size = self._next_lease_size(lease, time.time())
+
+        granted, reserved_total = await self.storage.reserve(
+            key, lease.lease_size, self.config.limit, window_seconds
+        )
+
+        if self._leases.get(identifier) is not lease:
+            # The window rolled over while the reservation was in flight
+            lease.exhausted = True
+            if granted > 0:
+                await self.storage.release(key, granted)
+            return
+
+        lease.available += granted
+        lease.reserved_total = max(lease.reserved_total, reserved_total)
+        if granted < lease.lease_size:
+            lease.exhausted = True
+
+    def _start_refill(self, identifier: str, lease: _Lease) -> asyncio.Task:
+        if lease.refill is None:
+            lease.refill = asyncio.get_running_loop().create_task(
+                self._reserve(identifier, lease)
+            )
+            lease.refill.add_done_callback(
+                lambda _: setattr(lease, "refill", None)
+            )
+        return lease.refill
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Check rate limit and consume one unit from the local lease."""
+        now = time.time()
+        window_start = self._get_window_start(int(now))
+        reset_time = window_start + self._get_window_seconds()
+
+        lease = self._get_lease(identifier, window_start, now)
+        if lease.available == 0 and not lease.exhausted:
+            lease.waiting += 1
+            try:
+                while lease.available == 0 and not lease.exhausted:
+                    await asyncio.shield(self._start_refill(identifier, lease))
+            finally:
+                lease.waiting -= 1
+
+        if lease.available > 0:
+            lease.available -= 1
+            lease.consumed += 1
+            status = RateLimitStatus.ALLOWED
+            low_water = math.ceil(lease.lease_size * self.prefetch_ratio)
+            if lease.available <= low_water and not lease.exhausted:
+                self._start_refill(identifier, lease)
+        else:
+            status = RateLimitStatus.REJECTED
+
+        remaining = self.config.limit - lease.reserved_total + lease.available
+        return RateLimitResult(
+            status=status,
+            limit=self.config.limit,
+            remaining=max(0, remaining),
+            reset_time=reset_time,
+        )
+
+    async def close(self) -> None:
+        """Return every unused lease of the current window to storage."""
+        refills = [
+            lease.refill
+            for lease in self._leases.values()
+            if lease.refill is not None
+        ]
+        if refills:
+            await asyncio.gather(*refills, return_exceptions=True)
+
+        current_window = self._get_window_start(int(time.time()))
+        leases, self._leases = self._leases, {}
+        for identifier, lease in leases.items():
+            if lease.available > 0 and lease.window_start == current_window:
+                key = self._get_key(identifier, lease.window_start)
+                await self.storage.release(key, lease.available)
@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+
+from .rate_limit import RateLimitResult, RateLimitStatus
+
+
+class RejectionCache:
+    """
+    Bounded in-process cache of rejected rate limit decisions.
+
+    Once an identifier is rejected it stays rejected until a retry can
+    succeed, so the decision can be answered locally instead of doing a
+    storage round-trip for every further request. Entries expire after
+    the rejection's retry_after_ms when it is set, since a token bucket
+    or GCRA admits requests again long before it is back to its full
+    reset time, and at the reset time of the window otherwise. The least
+    recently used entry is evicted when the cache is full.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, RateLimitResult]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, identifier: str, now: float | None = None
+    ) -> RateLimitResult | None:
+        """
+        Return the cached rejection for the identifier, if still valid.
+
+        Args:
+            identifier: The identifier to look up
+            now: Current Unix time, defaults to time.time()
+
+        Returns:
+            The cached RateLimitResult, or None on a miss
+        """
+        entry = self._entries.get(identifier)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if now is None:
+            now = time.time()
+        expires_at, result = entry
+        if now >= expires_at:
+            del self._entries[identifier]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(identifier)
+        self.hits += 1
+        return result
+
+    def put(
+        self,
+        identifier: str,
+        result: RateLimitResult,
+        now: float | None = None,
+    ) -> None:
+        """
+        Remember a decision if it is a rejection.
+
+        Args:
+            identifier: The identifier the decision belongs to
+            result: The rate limit decision
+            now: Current Unix time, defaults to time.time()
+        """
+        if result.status != RateLimitStatus.REJECTED:
+            return
+
+        if result.retry_after_ms is None:
+            expires_at = result.reset_time
+        else:
+            if now is None:
+                now = time.time()
+            expires_at = now + result.retry_after_ms / 1000
+
+        self._entries[identifier] = (expires_at, result)
+        self._entries.move_to_end(identifier)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached decisions and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,115 @@
+from dataclasses import replace
+from socket import AF_INET, AF_INET6, inet_ntop, inet_pton
+
+from .composite import CompositeRateLimiter, MultiWindowStorage
+from .rate_limit import RateLimitConfig, hash_tag
+
+
+class PrefixAggregator:
+    """
+    Map IP addresses to the network prefix they belong to.
+
+    "203.0.113.7" becomes "203.0.113.0/24" and "2001:db8:1:2::5"
+    becomes "2001:db8:1:2::/64" with the default lengths, so every
+    address of a network shares one identifier. An address whose family
+    is kept at full length, and any identifier that is not an IP
+    address, is returned unchanged.
+    """
+
+    def __init__(self, ipv4_prefix: int = 24, ipv6_prefix: int = 64):
+        """
+        Initialize the aggregator.
+
+        Args:
+            ipv4_prefix: Prefix length IPv4 addresses are cut to (0-32)
+            ipv6_prefix: Prefix length IPv6 addresses are cut to (0-128)
+
+        Raises:
+            ValueError: If a prefix length is out of range
+        """
+        if not 0 <= ipv4_prefix <= 32 or not 0 <= ipv6_prefix <= 128:
+            raise ValueError(
+                "prefix lengths must be 0-32 for IPv4 and 0-128 for IPv6"
+            )
+        self.ipv4_prefix = ipv4_prefix
+        self.ipv6_prefix = ipv6_prefix
+        self._mask4 = ((1 << ipv4_prefix) - 1) << (32 - ipv4_prefix)
+        self._mask6 = ((1 << ipv6_prefix) - 1) << (128 - ipv6_prefix)
+
+    def __call__(self, identifier: str) -> str:
+        """Return the network prefix of identifier, or identifier."""
+        try:
+            if ":" in identifier:
+                if self.ipv6_prefix == 128:
+                    return identifier
+                family, mask, length = AF_INET6, self._mask6, self.ipv6_prefix
+            else:
+                if self.ipv4_prefix == 32:
+                    return identifier
+                family, mask, length = AF_INET, self._mask4, self.ipv4_prefix
+            packed = inet_pton(family, identifier)
+        except (OSError, ValueError):
+            return identifier
+        network = (int.from_bytes(packed) & mask).to_bytes(len(packed))
+        return f"{inet_ntop(family, network)}/{length}"
+
+
+class PrefixRateLimiter(CompositeRateLimiter):
+    """
+    Fixed window rate limiter enforcing a host and a network limit.
+
+    Each request increments its address's counter and its network
+    prefix's counter in one atomic storage call, and only if both have
+    room, so an address rotating within one network is capped by the
+    network limit, and a rejected request creates no counter for a new
+    address. Both counters carry the prefix as their hash tag, so they
+    share a Redis Cluster slot. Identifiers that are not IP addresses,
+    or whose family is kept at full length, get the host counter only;
+    one that already looks like a prefix, such as "203.0.113.0/24", is
+    counted apart from that network's counter.
+    """
+
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        prefix_limit: int,
+        storage: MultiWindowStorage,
+        aggregator: PrefixAggregator,
+    ):
+        """
+        Initialize the prefix rate limiter.
+
+        Args:
+            config: Limit and window of each address
+            prefix_limit: Limit of each network prefix in the same window
+            storage: Storage checking several counters atomically
+            aggregator: Maps addresses to their network prefix
+        """
+        # The host rule comes first: it alone applies to single counters
+        super().__init__(
+            [config, replace(config, limit=prefix_limit)], storage
+        )
+        self.aggregator = aggregator
+
+    def _validate(self, rules: list[RateLimitConfig]) -> None:
+        # Both rules share a window: host and network keys tell them apart
+        pass
+
+    def _call(
+        self, identifier: str, cost: int, windows: list[tuple[int, int]]
+    ) -> tuple[list[str], list[int], list[int], int]:
+        seconds, start = windows[0]
+        prefix = self.aggregator(identifier)
+        tag = hash_tag(prefix)
+        if prefix == identifier:
+            if "/" in identifier:
+                # A network's own key would be rate_limit:{tag}:{start}
+                key = f"rate_limit:{tag}:{identifier}:{start}"
+            else:
+                # Same key as FixedWindowRateLimiter would use
+                key = f"rate_limit:{tag}:{start}"
+            return [key], [self.rules[0].limit], [seconds], cost
+        keys = [f"rate_limit:{tag}:{identifier}:{start}"]
+        keys.append(f"rate_limit:{tag}:{start}")
+        limits = [rule.limit for rule in self.rules]
+        return keys, limits, [seconds, seconds], cost
@@ -1,7 +1,8 @@
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
 from enum import Enum
 from typing import Protocol
-import time
 
 
 class RateLimitStatus(Enum):
@@ -9,6 +10,16 @@ class RateLimitStatus(Enum):
     REJECTED = "rejected"
 
 
+class RateLimitAlgorithm(Enum):
+    FIXED_WINDOW = "fixed_window"
+    LEASING = "leasing"
+    SLIDING_WINDOW_LOG = "sliding_window_log"
+    SLIDING_WINDOW_COUNTER = "sliding_window_counter"
+    TOKEN_BUCKET = "token_bucket"
+    GCRA = "gcra"
+    SHAPING = "shaping"
+
+
 class TimeUnit(Enum):
     SECONDS = "seconds"
     MINUTES = "minutes"
@@ -20,6 +31,17 @@ class TimeWindow:
     duration: int
     unit: TimeUnit
 
+    @property
+    def seconds(self) -> int:
+        """Window duration in seconds."""
+        match self.unit:
+            case TimeUnit.SECONDS:
+                return self.duration
+            case TimeUnit.MINUTES:
+                return self.duration * 60
+            case TimeUnit.HOURS:
+                return self.duration * 3600
+
 
 @dataclass
 class RateLimitResult:
@@ -27,6 +49,21 @@ class RateLimitResult:
     limit: int
     remaining: int
     reset_time: int  # Unix timestamp when window resets
+    retry_after_ms: int | None = None  # Wait before a retry can succeed
+    delay_ms: int = 0  # Wait before an allowed request proceeds (shaping)
+
+
+def hash_tag(identifier: str) -> str:
+    """
+    Wrap an identifier in a Redis Cluster hash tag.
+
+    Only the part of a key between the first "{" and "}" is hashed, so
+    every key built with the same tag lands in the same cluster slot and
+    multi-key scripts for one identifier can run on one node. Braces in
+    the identifier are escaped so they cannot end the tag early.
+    """
+    escaped = identifier.replace("{", "%7B").replace("}", "%7D")
+    return f"{{{escaped}}}"
 
 
 class RateLimitStorage(Protocol):
@@ -45,10 +82,28 @@ class RateLimitStorage(Protocol):
         """
         ...
 
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]:
+        """
+        Increment several counters in one round-trip.
+
+        Args:
+            items: (key, ttl in seconds, amount) tuples
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        ...
+
 
 class RateLimiter(Protocol):
     """Protocol for rate limiting algorithms."""
 
+    # Whether check_and_increment_many counts an item's cost in one
+    # storage call; other limiters only accept a cost of 1
+    weighted: bool = False
+
     async def check_and_increment(self, identifier: str) -> RateLimitResult:
         """
         Check if the identifier is within the rate limit and increment the counter.
@@ -61,38 +116,91 @@ class RateLimiter(Protocol):
         """
         ...
 
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int]]
+    ) -> list[RateLimitResult]:
+        """
+        Check and increment the rate limits of several identifiers.
+
+        Algorithms with a batched storage operation evaluate every item
+        in one round-trip. This default checks the items one by one and
+        only accepts a cost of 1: charging a cost as that many separate
+        requests would not be atomic and would cost a round-trip each.
+
+        Args:
+            items: (identifier, cost) tuples; the same identifier may
+                appear more than once
+
+        Returns:
+            One RateLimitResult per item, in the order of the items
+
+        Raises:
+            ValueError: If an item's cost is not 1
+        """
+        if any(cost != 1 for _, cost in items):
+            raise ValueError(
+                f"{type(self).__name__} only supports a cost of 1"
+            )
+        return [
+            await self.check_and_increment(identifier)
+            for identifier, _ in items
+        ]
+
+    async def close(self) -> None:
+        """Release any state the limiter holds (e.g., on shutdown)."""
+        ...
+
 
 @dataclass
 class RateLimitConfig:
     limit: int
     window: TimeWindow
+    # Token bucket settings; default to limit and limit per window
+    capacity: int | None = None
+    refill_rate: float | None = None  # Tokens added per second
+    # GCRA requests allowed back to back, defaults to limit
+    burst: int | None = None
 
 
 class FixedWindowRateLimiter(RateLimiter):
     """Fixed window rate limiter implementation."""
 
-    def __init__(self, config: RateLimitConfig, storage: RateLimitStorage):
+    weighted = True
+
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        storage: RateLimitStorage,
+        key_encoder: Callable[[str, int], bytes] | None = None,
+    ):
+        """
+        Initialize the fixed window rate limiter.
+
+        Args:
+            config: Rate limit configuration
+            storage: Storage holding the window counters
+            key_encoder: Builds the counter key from the identifier and
+                window start (e.g. a BinaryKeyEncoder); None uses text
+                keys such as rate_limit:{ip}:1700000040
+        """
         self.config = config
         self.storage = storage
+        self.key_encoder = key_encoder
 
     def _get_window_seconds(self) -> int:
         """Convert window duration to seconds."""
-        match self.config.window.unit:
-            case TimeUnit.SECONDS:
-                return self.config.window.duration
-            case TimeUnit.MINUTES:
-                return self.config.window.duration * 60
-            case TimeUnit.HOURS:
-                return self.config.window.duration * 3600
+        return self.config.window.seconds
 
     def _get_window_start(self, current_time: int) -> int:
         """Get the start time of the current window."""
         window_seconds = self._get_window_seconds()
         return (current_time // window_seconds) * window_seconds
 
-    def _get_key(self, identifier: str, window_start: int) -> str:
+    def _get_key(self, identifier: str, window_start: int) -> str | bytes:
         """Generate the storage key for the identifier and window."""
-        return f"rate_limit:{identifier}:{window_start}"
+        if self.key_encoder is not None:
+            return self.key_encoder(identifier, window_start)
+        return f"rate_limit:{hash_tag(identifier)}:{window_start}"
 
     async def check_and_increment(self, identifier: str) -> RateLimitResult:
         """Check rate limit and increment counter."""
@@ -117,3 +225,33 @@ class FixedWindowRateLimiter(RateLimiter):
             remaining=max(0, remaining),  # Ensure remaining is never negative
             reset_time=reset_time,
         )
+
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int]]
+    ) -> list[RateLimitResult]:
+        """Check and increment every item's counter in one round-trip."""
+        current_time = int(time.time())
+        window_start = self._get_window_start(current_time)
+        window_seconds = self._get_window_seconds()
+        reset_time = window_start + window_seconds
+
+        counts = await self.storage.increment_many(
+            [
+                (self._get_key(identifier, window_start), window_seconds, cost)
+                for identifier, cost in items
+            ]
+        )
+
+        return [
+            RateLimitResult(
+                status=(
+                    RateLimitStatus.ALLOWED
+                    if count <= self.config.limit
+                    else RateLimitStatus.REJECTED
+                ),
+                limit=self.config.limit,
+                remaining=max(0, self.config.limit - count),
+                reset_time=reset_time,
+            )
+            for count in counts
+        ]
@@ -0,0 +1,247 @@
+import ipaddress
+from dataclasses import dataclass
+from socket import AF_INET, AF_INET6, inet_pton
+
+from .rate_limit import RateLimitConfig
+
+# Marks trie nodes that hold no value (None is a valid value)
+_MISSING = object()
+
+
+class PathTrie:
+    """
+    Longest-prefix match of URL paths, by whole path segments.
+
+    "/api" matches "/api" and "/api/users" but not "/apiary". A lookup
+    walks one node per segment of the path, however many prefixes are
+    stored.
+    """
+
+    def __init__(self) -> None:
+        # Node: segment -> child node, plus the value under _MISSING
+        self._root: dict = {}
+
+    def insert(self, prefix: str, value: object) -> None:
+        """Store value for every path starting with prefix."""
+        node = self._root
+        for segment in prefix.split("/"):
+            if segment:
+                node = node.setdefault(segment, {})
+        node[_MISSING] = value
+
+    def match(self, path: str) -> object | None:
+        """Return the value of the longest stored prefix of path."""
+        node = self._root
+        best = node.get(_MISSING)
+        for segment in path.split("/"):
+            if not segment:
+                continue
+            node = node.get(segment)
+            if node is None:
+                break
+            best = node.get(_MISSING, best)
+        return best
+
+
+class CidrTree:
+    """
+    Longest-prefix match of IP addresses against CIDR networks.
+
+    A binary radix tree per address family: each level tests one bit of
+    the address, so a lookup takes at most 32 (IPv4) or 128 (IPv6)
+    steps and stops early where no stored network continues.
+    """
+
+    def __init__(self) -> None:
+        # Node: [child for bit 0, child for bit 1, value]
+        self._roots = {
+            4: [None, None, _MISSING],
+            6: [None, None, _MISSING],
+        }
+
+    def insert(self, network: str, value: object) -> None:
+        """
+        Store value for every address in network.
+
+        Raises:
+            ValueError: If network is not a valid IPv4 or IPv6 network
+        """
+        net = ipaddress.ip_network(network, strict=False)
+        bits = int(net.network_address)
+        width = net.max_prefixlen
+        node = self._roots[net.version]
+        for position in range(width - 1, width - 1 - net.prefixlen, -1):
+            bit = (bits >> position) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, _MISSING]
+            node = child
+        node[2] = value
+
+    def match(self, address: str) -> object | None:
+        """
+        Return the value of the most specific network holding address.
+
+        Returns None if no network holds it or address is no IP address.
+        """
+        try:
+            if ":" in address:
+                packed = inet_pton(AF_INET6, address)
+                node = self._roots[6]
+            else:
+                packed = inet_pton(AF_INET, address)
+                node = self._roots[4]
+        except (OSError, ValueError):
+            return None
+        bits = int.from_bytes(packed)
+        best = node[2]
+        position = len(packed) * 8 - 1
+        while position >= 0:
+            node = node[(bits >> position) & 1]
+            if node is None:
+                break
+            if node[2] is not _MISSING:
+                best = node[2]
+            position -= 1
+        return None if best is _MISSING else best
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A named limit for requests matching a path, API key tier or network.
+
+    Exactly one of path, tier and network is set. Requests under a rule
+    are counted per client IP address, or per API key when key is
+    "api_key", under the rule's name, so they do not share counters
+    with other rules.
+    """
+
+    name: str
+    # One limit, or several enforced together (fixed window only)
+    limits: tuple[RateLimitConfig, ...]
+    path: str | None = None
+    tier: str | None = None
+    network: str | None = None
+    key: str = "ip"
+
+
+class RuleSet:
+    """
+    Rules compiled for matching a request in time linear in its keys.
+
+    At construction, path rules go into a PathTrie, network rules and
+    the allowlist into CidrTrees, and tier rules into a dictionary, so
+    choosing a request's rule never scans the rule list. A request is
+    limited by the most specific path rule matching it, else by the
+    rule of its API key's tier, else by the most specific network rule,
+    else by the default limit (no rule). Allowlisted addresses are not
+    limited at all.
+    """
+
+    def __init__(
+        self,
+        rules: list[Rule],
+        allowlist: list[str] | None = None,
+        api_keys: dict[str, str] | None = None,
+        api_key_header: str = "X-API-Key",
+    ):
+        """
+        Compile the rules.
+
+        Args:
+            rules: Rules to choose from
+            allowlist: CIDR networks whose requests are never limited
+            api_keys: Tier of each API key
+            api_key_header: Request header carrying the API key
+
+        Raises:
+            ValueError: If a rule does not set exactly one of path, tier
+                and network, has no limit or an unknown key, two rules
+                share a name or a match, or a network is invalid
+        """
+        self.rules = rules
+        self.api_keys = api_keys or {}
+        self.api_key_header = api_key_header
+        self._paths = PathTrie()
+        self._networks = CidrTree()
+        self._tiers: dict[str, Rule] = {}
+        self._allowlist = CidrTree()
+
+        seen: set[tuple[str, str]] = set()
+        names: set[str] = set()
+        for rule in rules:
+            matches = [
+                (kind, value)
+                for kind, value in (
+                    ("path", rule.path),
+                    ("tier", rule.tier),
+                    ("network", rule.network),
+                )
+                if value is not None
+            ]
+            if len(matches) != 1:
+                raise ValueError(
+                    f"rule {rule.name!r} must set exactly one of path, "
+                    "tier and network"
+                )
+            if not rule.limits:
+                raise ValueError(f"rule {rule.name!r} has no limit")
+            if rule.key not in ("ip", "api_key"):
+                raise ValueError(
+                    f"rule {rule.name!r} has unknown key {rule.key!r}"
+                )
+            if rule.name in names:
+                raise ValueError(f"duplicate rule name {rule.name!r}")
+            kind, value = matches[0]
+            if kind == "network":
+                value = str(ipaddress.ip_network(value, strict=False))
+            elif kind == "path":
+                value = "/".join(filter(None, value.split("/")))
+            if (kind, value) in seen:
+                raise ValueError(f"two rules match {kind} {value!r}")
+            names.add(rule.name)
+            seen.add((kind, value))
+
+            if kind == "path":
+                self._paths.insert(rule.path, rule)
+            elif kind == "tier":
+                self._tiers[rule.tier] = rule
+            else:
+                self._networks.insert(rule.network, rule)
+        for network in allowlist or []:
+            self._allowlist.insert(network, True)
+
+    def is_allowlisted(self, address: str) -> bool:
+        """Whether requests from address bypass rate limiting."""
+        return self._allowlist.match(address) is True
+
+    def tier_of(self, api_key: str | None) -> str | None:
+        """Return the tier of an API key, if it is known."""
+        if api_key is None:
+            return None
+        return self.api_keys.get(api_key)
+
+    def match(
+        self, path: str, address: str, api_key: str | None = None
+    ) -> Rule | None:
+        """
+        Choose the rule limiting a request.
+
+        Args:
+            path: Request path, without the query string
+            address: Client IP address
+            api_key: API key of the request, if any
+
+        Returns:
+            The rule, or None if the default limit applies
+        """
+        rule = self._paths.match(path)
+        if rule is not None:
+            return rule
+        tier = self.tier_of(api_key)
+        if tier is not None:
+            rule = self._tiers.get(tier)
+            if rule is not None:
+                return rule
+        return self._networks.match(address)
@@ -0,0 +1,157 @@
+import asyncio
+import math
+import time
+from typing import Protocol
+
+from .gcra import GcraRateLimiter
+from .rate_limit import RateLimitConfig, RateLimitResult, RateLimitStatus
+
+
+class ShapingStorage(Protocol):
+    """Protocol for storage scheduling requests into future GCRA slots."""
+
+    async def schedule(
+        self,
+        key: str,
+        emission_interval_us: int,
+        tolerance_us: int,
+        max_delay_us: int,
+    ) -> tuple[bool, int, int, int, int]:
+        """
+        Atomically reserve the key's next slot, up to max_delay_us ahead.
+
+        Args:
+            key: The key holding the theoretical arrival time (TAT)
+            emission_interval_us: Microseconds between requests at the
+                sustained rate
+            tolerance_us: How far ahead of now the TAT may run, which
+                sets the burst size
+            max_delay_us: Longest delay a request may be scheduled with
+
+        Returns:
+            Tuple of (scheduled, requests left in the burst, milliseconds
+            until a retry can succeed, Unix time in ms when the burst is
+            fully available again, milliseconds to delay the request)
+        """
+        ...
+
+
+class ShapingRateLimiter(GcraRateLimiter):
+    """
+    Leaky bucket queue that delays requests instead of rejecting them.
+
+    Each request reserves the identifier's next GCRA slot in storage and
+    the result carries how long the caller must wait for it (delay_ms).
+    Requests within the burst proceed at once; later ones are spaced one
+    emission interval apart. A request is rejected only if its slot is
+    more than max_wait_ms away or a waiter queue is full.
+
+    The slot is reserved in a single storage call, so waiting holds no
+    storage connection. Locally, a waiter costs one counter increment
+    and one event-loop timer that removes it from the queue when its
+    slot arrives; max_queue bounds each identifier's queue and
+    max_waiters bounds the instance's total.
+    """
+
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        storage: ShapingStorage,
+        max_wait_ms: int = 1000,
+        max_queue: int = 100,
+        max_waiters: int = 100_000,
+    ):
+        """
+        Initialize the shaping rate limiter.
+
+        Args:
+            config: Rate limit configuration
+            storage: Storage scheduling GCRA slots
+            max_wait_ms: Longest delay before a request is rejected
+            max_queue: Most requests one identifier may have waiting
+            max_waiters: Most requests waiting across all identifiers
+        """
+        super().__init__(config, storage)
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+        self.max_waiters = max_waiters
+        self._queued: dict[str, int] = {}
+        self._waiters = 0
+
+    @property
+    def waiters(self) -> int:
+        """Number of requests waiting for their slot (or being scheduled)."""
+        return self._waiters
+
+    def _enqueue(self, identifier: str) -> bool:
+        queued = self._queued.get(identifier, 0)
+        if queued >= self.max_queue or self._waiters >= self.max_waiters:
+            return False
+        self._queued[identifier] = queued + 1
+        self._waiters += 1
+        return True
+
+    def _dequeue(self, identifier: str) -> None:
+        queued = self._queued[identifier] - 1
+        if queued:
+            self._queued[identifier] = queued
+        else:
+            # Drop idle identifiers so memory follows the waiters only
+            del self._queued[identifier]
+        self._waiters -= 1
+
+    def _queue_full(self) -> RateLimitResult:
+        # The queue frees up as waiters reach their slots, roughly one
+        # emission interval apart
+        retry_after_ms = math.ceil(self.emission_interval_us / 1000)
+        return RateLimitResult(
+            status=RateLimitStatus.REJECTED,
+            limit=self.burst,
+            remaining=0,
+            reset_time=math.ceil(time.time() + self.max_wait_ms / 1000),
+            retry_after_ms=retry_after_ms,
+        )
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Reserve the identifier's next slot and report the delay."""
+        # Take the queue place before the storage call so concurrent
+        # requests cannot all pass the check
+        if not self._enqueue(identifier):
+            return self._queue_full()
+
+        try:
+            (
+                scheduled,
+                remaining,
+                retry_after_ms,
+                reset_at_ms,
+                delay_ms,
+            ) = await self.storage.schedule(
+                self._get_key(identifier),
+                self.emission_interval_us,
+                self.tolerance_us,
+                self.max_wait_ms * 1000,
+            )
+        except BaseException:
+            self._dequeue(identifier)
+            raise
+
+        if scheduled and delay_ms > 0:
+            asyncio.get_running_loop().call_later(
+                delay_ms / 1000, self._dequeue, identifier
+            )
+        else:
+            self._dequeue(identifier)
+
+        return RateLimitResult(
+            status=(
+                RateLimitStatus.ALLOWED
+                if scheduled
+                else RateLimitStatus.REJECTED
+            ),
+            limit=self.burst,
+            remaining=max(0, remaining),
+            reset_time=math.ceil(reset_at_ms / 1000),
+            retry_after_ms=retry_after_ms,
+            delay_ms=delay_ms if scheduled else 0,
+        )
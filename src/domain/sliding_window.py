@@ -0,0 +1,172 @@
+import math
+import os
+import time
+from typing import Protocol
+
+from .rate_limit import (
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    RateLimiter,
+    RateLimitResult,
+    RateLimitStatus,
+    hash_tag,
+)
+
+
+class SlidingWindowLogStorage(Protocol):
+    """Protocol for storage keeping a log of request timestamps."""
+
+    async def log_request(
+        self,
+        key: str,
+        now_ms: int,
+        window_ms: int,
+        limit: int,
+        member: bytes,
+    ) -> tuple[bool, int, int]:
+        """
+        Atomically trim the log and record the request if under the limit.
+
+        Entries older than the window are removed first; the request is
+        only logged when fewer than limit entries remain, so the log
+        never holds more than limit entries.
+
+        Args:
+            key: The log key
+            now_ms: Current time in milliseconds
+            window_ms: Window length in milliseconds
+            limit: Maximum requests per window
+            member: Unique member identifying this request
+
+        Returns:
+            Tuple of (allowed, entries in window, oldest entry time in ms)
+        """
+        ...
+
+
+class SlidingWindowCounterStorage(Protocol):
+    """Protocol for storage weighing two consecutive window counters."""
+
+    async def weighted_increment(
+        self,
+        current_key: str,
+        previous_key: str,
+        limit: int,
+        weight: float,
+        ttl: int,
+    ) -> tuple[bool, int, int]:
+        """
+        Atomically increment the current counter if the estimate allows.
+
+        The estimate is previous * weight + current; the current counter
+        is only incremented when the estimate is below the limit.
+
+        Args:
+            current_key: Counter key of the current window
+            previous_key: Counter key of the previous window
+            limit: Maximum requests per window
+            weight: Share of the previous window still inside the
+                sliding window, between 0 and 1
+            ttl: Time-to-live in seconds for a new current counter
+
+        Returns:
+            Tuple of (allowed, current count, previous count)
+        """
+        ...
+
+
+class SlidingWindowLogRateLimiter(RateLimiter):
+    """
+    Sliding window log rate limiter implementation.
+
+    Keeps the timestamp of every allowed request within the last window
+    and allows a request only if fewer than limit requests were allowed
+    in the window ending now. Unlike the fixed window it cannot let
+    twice the limit through across a window boundary.
+    """
+
+    def __init__(
+        self, config: RateLimitConfig, storage: SlidingWindowLogStorage
+    ):
+        self.config = config
+        self.storage = storage
+
+    def _get_key(self, identifier: str) -> str:
+        """Generate the storage key for the identifier's log."""
+        return f"rate_limit_log:{hash_tag(identifier)}"
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Check rate limit and log the request if allowed."""
+        now_ms = int(time.time() * 1000)
+        window_ms = self.config.window.seconds * 1000
+
+        allowed, count, oldest_ms = await self.storage.log_request(
+            self._get_key(identifier),
+            now_ms,
+            window_ms,
+            self.config.limit,
+            os.urandom(8),
+        )
+
+        # The oldest logged request is the next one to leave the window
+        reset_time = math.ceil((oldest_ms + window_ms) / 1000)
+        return RateLimitResult(
+            status=(
+                RateLimitStatus.ALLOWED
+                if allowed
+                else RateLimitStatus.REJECTED
+            ),
+            limit=self.config.limit,
+            remaining=max(0, self.config.limit - count),
+            reset_time=reset_time,
+        )
+
+
+class SlidingWindowCounterRateLimiter(FixedWindowRateLimiter):
+    """
+    Sliding window counter (weighted two-window) rate limiter.
+
+    Approximates a sliding window from the current and previous fixed
+    window counters: the previous count is weighted by how much of the
+    previous window still overlaps the window ending now. It costs two
+    counters per identifier instead of one log entry per request, and
+    uses the same keys as FixedWindowRateLimiter, so switching between
+    the two algorithms does not add keys.
+    """
+
+    def __init__(
+        self, config: RateLimitConfig, storage: SlidingWindowCounterStorage
+    ):
+        super().__init__(config, storage)
+
+    # Plain window increments would skip the weighted estimate
+    check_and_increment_many = RateLimiter.check_and_increment_many
+    weighted = False
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Check the weighted estimate and increment if allowed."""
+        now = time.time()
+        window_seconds = self._get_window_seconds()
+        window_start = self._get_window_start(int(now))
+        weight = 1 - (now - window_start) / window_seconds
+
+        allowed, current, previous = await self.storage.weighted_increment(
+            self._get_key(identifier, window_start),
+            self._get_key(identifier, window_start - window_seconds),
+            self.config.limit,
+            weight,
+            # The counter is still read as the previous window next time
+            2 * window_seconds,
+        )
+
+        estimated = math.floor(previous * weight + current)
+        return RateLimitResult(
+            status=(
+                RateLimitStatus.ALLOWED
+                if allowed
+                else RateLimitStatus.REJECTED
+            ),
+            limit=self.config.limit,
+            remaining=max(0, self.config.limit - estimated),
+            reset_time=window_start + window_seconds,
+        )
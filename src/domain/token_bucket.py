@@ -0,0 +1,96 @@
+import math
+from typing import Protocol
+
+from .rate_limit import (
+    RateLimitConfig,
+    RateLimiter,
+    RateLimitResult,
+    RateLimitStatus,
+    hash_tag,
+)
+
+
+class TokenBucketStorage(Protocol):
+    """Protocol for storage keeping token bucket state."""
+
+    async def take_token(
+        self, key: str, capacity: int, refill_rate: float, cost: int = 1
+    ) -> tuple[bool, int, int, int]:
+        """
+        Atomically refill the bucket and take cost tokens if available.
+
+        Args:
+            key: The bucket key
+            capacity: Maximum number of tokens in the bucket
+            refill_rate: Tokens added per second
+            cost: Number of tokens to take
+
+        Returns:
+            Tuple of (allowed, tokens left, milliseconds until enough
+            tokens are available, Unix time in ms when the bucket is
+            full again)
+        """
+        ...
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    Token bucket rate limiter implementation.
+
+    Each identifier has a bucket of up to capacity tokens refilled at
+    refill_rate tokens per second; a request takes one token. Bursts up
+    to capacity are allowed at once, while the sustained rate is bounded
+    by the refill rate. Refill is computed lazily with millisecond
+    precision when a request arrives.
+    """
+
+    weighted = True
+
+    def __init__(self, config: RateLimitConfig, storage: TokenBucketStorage):
+        self.config = config
+        self.storage = storage
+        self.capacity = config.capacity or config.limit
+        self.refill_rate = config.refill_rate or (
+            config.limit / config.window.seconds
+        )
+
+    def _get_key(self, identifier: str) -> str:
+        """Generate the storage key for the identifier's bucket."""
+        return f"rate_limit_bucket:{hash_tag(identifier)}"
+
+    async def check_and_increment(self, identifier: str) -> RateLimitResult:
+        """Take a token from the identifier's bucket."""
+        return await self._check(identifier, 1)
+
+    async def check_and_increment_many(
+        self, items: list[tuple[str, int]]
+    ) -> list[RateLimitResult]:
+        """Check the items one by one, each cost in one storage call."""
+        return [
+            await self._check(identifier, cost) for identifier, cost in items
+        ]
+
+    async def _check(self, identifier: str, cost: int) -> RateLimitResult:
+        (
+            allowed,
+            tokens,
+            retry_after_ms,
+            full_at_ms,
+        ) = await self.storage.take_token(
+            self._get_key(identifier),
+            self.capacity,
+            self.refill_rate,
+            cost,
+        )
+
+        return RateLimitResult(
+            status=(
+                RateLimitStatus.ALLOWED
+                if allowed
+                else RateLimitStatus.REJECTED
+            ),
+            limit=self.capacity,
+            remaining=max(0, tokens),
+            reset_time=math.ceil(full_at_ms / 1000),
+            retry_after_ms=retry_after_ms,
+        )
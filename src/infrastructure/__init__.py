@@ -1,3 +1,26 @@
-from .redis_client import RateLimitStorage, RedisClient
+from .batching import BatchingStorage
+from .hash_buckets import HashBucketStorage
+from .memory_storage import MemoryStorage, TimingWheel
+from .metrics import Counter, Histogram, Metrics
+from .redis_client import STORAGE_ERRORS, RateLimitStorage, RedisClient
+from .redis_cluster import RedisClusterClient
+from .scripts import LIMITER_SCRIPTS, LuaScript, ScriptRegistry
+from .shared_memory import SharedMemoryStorage
 
-__all__ = ["RateLimitStorage", "RedisClient"]
+__all__ = [
+    "LIMITER_SCRIPTS",
+    "STORAGE_ERRORS",
+    "BatchingStorage",
+    "Counter",
+    "HashBucketStorage",
+    "Histogram",
+    "LuaScript",
+    "MemoryStorage",
+    "Metrics",
+    "RateLimitStorage",
+    "RedisClient",
+    "RedisClusterClient",
+    "ScriptRegistry",
+    "SharedMemoryStorage",
+    "TimingWheel",
+]
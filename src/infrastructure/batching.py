@@ -0,0 +1,154 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from .redis_client import STORAGE_ERRORS, RateLimitStorage
+
+
+class BatchIncrementStorage(Protocol):
+    """Storage that can increment several counters in one round-trip."""
+
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]: ...
+
+
+@dataclass
+class _PendingKey:
+    ttl: int
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+
+def _fail(batch: dict[str, _PendingKey], error: Exception) -> None:
+    """Raise error in every caller still waiting on the batch."""
+    for pending in batch.values():
+        for waiter in pending.waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+
+
+class BatchingStorage(RateLimitStorage):
+    """
+    Storage that coalesces concurrent increments into one pipeline.
+
+    Increments issued during the same event-loop tick (or within
+    max_delay seconds) are collected and sent to the backing storage as a
+    single pipeline. Increments for the same key are merged into one
+    INCRBY and every caller receives its own position in the resulting
+    count, exactly as if the increments had been sent one by one.
+    """
+
+    def __init__(
+        self,
+        storage: BatchIncrementStorage,
+        max_batch_size: int = 512,
+        max_delay: float = 0.0,
+    ):
+        """
+        Initialize the batching storage.
+
+        Args:
+            storage: Backing storage supporting increment_many
+            max_batch_size: Flush as soon as this many increments wait
+            max_delay: Seconds to wait for more increments before a
+                flush; 0 flushes at the end of the current loop tick
+        """
+        self._storage = storage
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: dict[str, _PendingKey] = {}
+        self._pending_count = 0
+        self._flush_handle: asyncio.Handle | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def increment(self, key: str, ttl: int) -> int:
+        """
+        Queue an increment and wait for the batch it lands in.
+
+        Args:
+            key: The key to increment
+            ttl: Time-to-live in seconds
+
+        Returns:
+            The counter value after this caller's increment
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingKey(ttl=ttl)
+        pending.waiters.append(future)
+        self._pending_count += 1
+
+        if self._pending_count >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            if self.max_delay > 0:
+                self._flush_handle = loop.call_later(
+                    self.max_delay, self._flush
+                )
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+
+        return await future
+
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]:
+        """
+        Increment several counters in one round-trip, bypassing the queue.
+
+        Args:
+            items: (key, ttl in seconds, amount) tuples
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        return await self._storage.increment_many(items)
+
+    async def drain(self) -> None:
+        """Flush pending increments and wait for in-flight batches."""
+        if self._pending:
+            self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch = self._pending
+        self._pending = {}
+        self._pending_count = 0
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: dict[str, _PendingKey]) -> None:
+        items = [
+            (key, pending.ttl, len(pending.waiters))
+            for key, pending in batch.items()
+        ]
+        try:
+            counts = await self._storage.increment_many(items)
+        except STORAGE_ERRORS as exc:
+            _fail(batch, exc)
+            return
+        except Exception as exc:
+            # Not a storage failure: the callers get it and it is logged
+            # as the task's error
+            _fail(batch, exc)
+            raise
+
+        for pending, count in zip(batch.values(), counts):
+            # The callers of a coalesced key take the consecutive counts
+            # that ended at the value returned by Redis
+            first = count - len(pending.waiters) + 1
+            for offset, waiter in enumerate(pending.waiters):
+                if not waiter.done():
+                    waiter.set_result(first + offset)
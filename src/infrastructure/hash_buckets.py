@@ -0,0 +1,117 @@
+import zlib
+from typing import Protocol
+
+from .redis_client import RateLimitStorage
+
+# Prefix of the counter keys built by the fixed window rate limiter,
+# dropped from field names since every field in a bucket shares it
+_COUNTER_PREFIX = "rate_limit:"
+
+
+class HashIncrementStorage(Protocol):
+    """Storage that can increment counters kept in bucket hashes."""
+
+    async def hash_increment_many(
+        self,
+        items: list[tuple[str, str, int, int]],
+        field_expiry: bool = False,
+    ) -> list[int]: ...
+
+
+class HashBucketStorage(RateLimitStorage):
+    """
+    Storage keeping window counters as fields of a few bucket hashes.
+
+    With one key per identifier and window, Redis spends more memory on
+    each key's bookkeeping (dict and expiry entries, key object) than on
+    the count itself. This storage maps a counter key such as
+    rate_limit:{ip}:1700000000 to a field of one of `buckets` hashes,
+    chosen by a CRC32 of the identifier, and counts with HINCRBY.
+
+    By default there is one set of buckets per window and TTL, and a
+    bucket gets the TTL when its first field is created, so the whole
+    bucket expires with its window. With field_expiry, buckets are
+    permanent, the window is part of the field name and every field
+    gets its own TTL with HEXPIRE, which needs Redis 7.4 or later.
+
+    Counter keys must end with ":<window start>", as the keys of the
+    fixed window rate limiter do.
+    """
+
+    def __init__(
+        self,
+        storage: HashIncrementStorage,
+        buckets: int = 1024,
+        field_expiry: bool = False,
+    ):
+        """
+        Initialize the hash bucket storage.
+
+        Args:
+            storage: Backing storage supporting hash_increment_many
+            buckets: Number of bucket hashes per window
+            field_expiry: Expire fields individually with HEXPIRE
+                instead of whole buckets
+        """
+        if buckets <= 0:
+            raise ValueError("buckets must be positive")
+        self._storage = storage
+        self.buckets = buckets
+        self.field_expiry = field_expiry
+
+    def locate(self, key: str, ttl: int) -> tuple[str, str]:
+        """
+        Return the bucket hash and field holding a counter key.
+
+        Args:
+            key: Counter key ending with ":<window start>"
+            ttl: Time-to-live in seconds of the counter
+
+        Returns:
+            Tuple of (bucket key, field name)
+        """
+        counter, _, window = key.rpartition(":")
+        field = counter.removeprefix(_COUNTER_PREFIX)
+        bucket = zlib.crc32(field.encode()) % self.buckets
+        if self.field_expiry:
+            return f"rate_limit_hash:{{{bucket}}}", f"{field}:{window}"
+        # Counters sharing a bucket must share its TTL, so it is part of
+        # the bucket key along with the window
+        return f"rate_limit_hash:{{{bucket}}}:{ttl}:{window}", field
+
+    async def increment(self, key: str, ttl: int) -> int:
+        """
+        Atomically increment the counter's field and set the TTL if new.
+
+        Args:
+            key: Counter key ending with ":<window start>"
+            ttl: Time-to-live in seconds
+
+        Returns:
+            The new counter value after increment
+        """
+        bucket, field = self.locate(key, ttl)
+        counts = await self._storage.hash_increment_many(
+            [(bucket, field, ttl, 1)], self.field_expiry
+        )
+        return counts[0]
+
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]:
+        """
+        Increment several counters' fields in one round-trip.
+
+        Args:
+            items: (key, ttl, amount) tuples
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        return await self._storage.hash_increment_many(
+            [
+                (*self.locate(key, ttl), ttl, amount)
+                for key, ttl, amount in items
+            ],
+            self.field_expiry,
+        )
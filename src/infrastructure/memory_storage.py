@@ -0,0 +1,368 @@
+import heapq
+import math
+import time
+from collections.abc import Callable, Iterator
+from operator import itemgetter
+
+from .redis_client import RateLimitStorage
+
+
+class _Counter:
+    """One stored counter; slots keep it at ~56 bytes plus the key."""
+
+    __slots__ = ("expires_at", "key", "value")
+
+    def __init__(self, key: str, value: int, expires_at: int | None):
+        self.key = key
+        self.value = value
+        # Tick (whole second) the counter expires at, None for never
+        self.expires_at = expires_at
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel expiring counters at one-second ticks.
+
+    Level 0 has one slot per second for the next 64 seconds, level 1
+    one slot per 64 seconds for the next ~68 minutes, and so on; with
+    four levels the wheel spans ~194 days. A counter is appended to the
+    slot of its expiry time in the finest level that covers it. Each
+    tick expires the current level 0 slot without looking at any other
+    counter, and whenever a level wraps around, the next slot of the
+    level above is cascaded down. A counter is moved at most once per
+    level, so scheduling and expiry are O(1) amortized regardless of how
+    many counters are stored, and stretches of time in which the finer
+    levels are empty are skipped rather than ticked through.
+    """
+
+    SLOT_BITS = 6
+    SLOTS = 1 << SLOT_BITS
+    LEVELS = 4
+
+    def __init__(self, now: int) -> None:
+        self._current = now
+        self._levels: list[list[list[_Counter]]] = [
+            [[] for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        # Counters held by each level
+        self._counts = [0] * self.LEVELS
+
+    def __len__(self) -> int:
+        return sum(self._counts)
+
+    def schedule(self, counter: _Counter) -> None:
+        """Add a counter to the slot of its expiry time."""
+        expires_at = counter.expires_at
+        delta = expires_at - self._current
+        for level in range(self.LEVELS):
+            shift = level * self.SLOT_BITS
+            if delta < self.SLOTS << shift or level == self.LEVELS - 1:
+                # Beyond the wheel's span, wait in the farthest slot and
+                # be placed again when it is cascaded
+                if delta >= self.SLOTS << shift:
+                    expires_at = self._current + (self.SLOTS << shift) - 1
+                slot = (expires_at >> shift) & (self.SLOTS - 1)
+                self._levels[level][slot].append(counter)
+                self._counts[level] += 1
+                return
+
+    def _take(self, level: int, slot: int) -> list[_Counter]:
+        counters = self._levels[level][slot]
+        if counters:
+            self._levels[level][slot] = []
+            self._counts[level] -= len(counters)
+        return counters
+
+    def advance(self, now: int) -> Iterator[_Counter]:
+        """
+        Move the wheel forward to now, yielding every expired counter.
+
+        The returned iterator must be consumed for the wheel to advance.
+        """
+        mask = self.SLOTS - 1
+        while self._current < now:
+            # Levels below the first non-empty one have nothing to expire
+            # or cascade until that level's next slot boundary
+            empty = 0
+            while empty < self.LEVELS and not self._counts[empty]:
+                empty += 1
+            if empty == self.LEVELS:
+                self._current = now
+                return
+            if empty:
+                span = 1 << (empty * self.SLOT_BITS)
+                boundary = (self._current // span + 1) * span
+                if boundary - 1 > self._current:
+                    self._current = min(now, boundary - 1)
+                    continue
+
+            self._current += 1
+            tick = self._current
+            # Cascade coarser levels whose slot boundary was reached,
+            # from the outermost down so counters can fall several levels
+            level = 1
+            while (
+                level < self.LEVELS
+                and (tick >> ((level - 1) * self.SLOT_BITS)) & mask == 0
+            ):
+                level += 1
+            for cascade in range(level - 1, 0, -1):
+                slot = (tick >> (cascade * self.SLOT_BITS)) & mask
+                for counter in self._take(cascade, slot):
+                    self.schedule(counter)
+
+            yield from self._take(0, tick & mask)
+
+
+class MemoryStorage(RateLimitStorage):
+    """
+    In-process rate limit storage for running without Redis.
+
+    Counters live in a dict of slotted entries and expire through a
+    hierarchical timing wheel, which is advanced by every call, so no
+    background task or key scan is needed. Every operation runs without
+    awaiting anything and is therefore atomic within the event loop.
+
+    Counts are local to the process: use it for single-instance
+    deployments and sidecars. It implements the counter-based
+    algorithms (fixed window, multiple rules, leasing and the sliding
+    window counter).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initialize the memory storage.
+
+        Args:
+            clock: Monotonic time in seconds used for expiry
+        """
+        self._clock = clock
+        self._counters: dict[str, _Counter] = {}
+        self._wheel = TimingWheel(int(clock()))
+        # Heavy hitter summaries: key -> (expiry time, counts)
+        self._tops: dict[str, tuple[float, dict[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _expire(self) -> float:
+        """Drop counters whose TTL has passed and return the time."""
+        now = self._clock()
+        for counter in self._wheel.advance(int(now)):
+            del self._counters[counter.key]
+        return now
+
+    def _add(self, key: str, amount: int, ttl: int, now: float) -> int:
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter.value += amount
+            return counter.value
+        # Like Redis EXPIRE, a counter lives at least ttl seconds
+        expires_at = math.ceil(now + ttl) if ttl > 0 else None
+        counter = _Counter(key, amount, expires_at)
+        self._counters[key] = counter
+        if expires_at is not None:
+            self._wheel.schedule(counter)
+        return amount
+
+    def _get(self, key: str) -> int:
+        counter = self._counters.get(key)
+        return counter.value if counter is not None else 0
+
+    async def ping(self) -> bool:
+        return True
+
+    async def load_scripts(self) -> bool:
+        """Nothing to load; present for parity with RedisClient."""
+        return True
+
+    async def increment(self, key: str, ttl: int) -> int:
+        """
+        Increment the counter for the given key and set TTL if it's new.
+
+        Args:
+            key: The key to increment
+            ttl: Time-to-live in seconds
+
+        Returns:
+            The new counter value after increment
+        """
+        return self._add(key, 1, ttl, self._expire())
+
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]:
+        """
+        Increment several counters.
+
+        Args:
+            items: (key, ttl, amount) tuples; each key is incremented by
+                its amount and gets the TTL if it is new
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        now = self._expire()
+        return [self._add(key, amount, ttl, now) for key, ttl, amount in items]
+
+    async def increment_all(
+        self,
+        keys: list[str],
+        limits: list[int],
+        ttls: list[int],
+        cost: int = 1,
+    ) -> tuple[bool, list[int]]:
+        """
+        Increment every rule's counter only if all have room.
+
+        Args:
+            keys: One window counter key per rule
+            limits: The limit of each rule
+            ttls: Time-to-live in seconds of each rule's new counter
+            cost: Amount to add to every counter
+
+        Returns:
+            Tuple of (allowed, count of each rule): the new counts if
+            allowed, otherwise the unchanged current counts
+        """
+        return self._increment_all(keys, limits, ttls, cost, self._expire())
+
+    def _increment_all(self, keys, limits, ttls, cost, now):
+        counts = [self._get(key) for key in keys]
+        if any(count + cost > limit for count, limit in zip(counts, limits)):
+            return False, counts
+        return True, [
+            self._add(key, cost, ttl, now) for key, ttl in zip(keys, ttls)
+        ]
+
+    async def increment_all_many(
+        self, calls: list[tuple[list[str], list[int], list[int], int]]
+    ) -> list[tuple[bool, list[int]]]:
+        """
+        Run several increment_all calls.
+
+        Args:
+            calls: (keys, limits, ttls, cost) tuples, as for
+                increment_all
+
+        Returns:
+            (allowed, counts) tuples, in the order of the calls
+        """
+        now = self._expire()
+        return [
+            self._increment_all(keys, limits, ttls, cost, now)
+            for keys, limits, ttls, cost in calls
+        ]
+
+    async def reserve(
+        self, key: str, amount: int, limit: int, ttl: int
+    ) -> tuple[int, int]:
+        """
+        Reserve up to amount units of a window's quota.
+
+        Args:
+            key: The window counter key
+            amount: Number of units requested
+            limit: Total units available in the window
+            ttl: Time-to-live in seconds for a new key
+
+        Returns:
+            Tuple of (units granted, units reserved in the window so far)
+        """
+        now = self._expire()
+        used = self._get(key)
+        grant = min(amount, limit - used)
+        if grant <= 0:
+            return 0, used
+        return grant, self._add(key, grant, ttl, now)
+
+    async def release(self, key: str, amount: int) -> None:
+        """
+        Return unused units to a window's quota.
+
+        Never drops below zero and never recreates an expired window.
+
+        Args:
+            key: The window counter key
+            amount: Number of units to return
+        """
+        self._expire()
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter.value -= max(0, min(amount, counter.value))
+
+    async def weighted_increment(
+        self,
+        current_key: str,
+        previous_key: str,
+        limit: int,
+        weight: float,
+        ttl: int,
+    ) -> tuple[bool, int, int]:
+        """
+        Read two window counters and increment the current one if allowed.
+
+        Args:
+            current_key: Counter key of the current window
+            previous_key: Counter key of the previous window
+            limit: Maximum requests per window
+            weight: Share of the previous window still inside the
+                sliding window, between 0 and 1
+            ttl: Time-to-live in seconds for a new current counter
+
+        Returns:
+            Tuple of (allowed, current count, previous count)
+        """
+        now = self._expire()
+        current = self._get(current_key)
+        previous = self._get(previous_key)
+        if previous * weight + current + 1 > limit:
+            return False, current, previous
+        return True, self._add(current_key, 1, ttl, now), previous
+
+    async def merge_top(
+        self,
+        current_key: str,
+        previous_key: str,
+        counts: dict[str, int],
+        ttl: int,
+        capacity: int,
+        top: int,
+    ) -> list[tuple[str, int]]:
+        """
+        Add counts to the current window and return the top identifiers.
+
+        Args:
+            current_key: Summary of the current window
+            previous_key: Summary of the previous window
+            counts: Requests per identifier since the last merge
+            ttl: Time-to-live in seconds of a window's summary
+            capacity: Most identifiers a window's summary keeps
+            top: Number of identifiers to return
+
+        Returns:
+            (identifier, count over both windows) pairs, highest first
+        """
+        now = self._clock()
+        # Only a couple of windows are alive, so expire them by scanning
+        expired = [key for key, (ends, _) in self._tops.items() if ends <= now]
+        for key in expired:
+            del self._tops[key]
+
+        ends, window = self._tops.get(current_key, (now, {}))
+        if counts:
+            ends = now + ttl
+            for identifier, count in counts.items():
+                window[identifier] = window.get(identifier, 0) + count
+            if len(window) > capacity:
+                window = dict(
+                    heapq.nlargest(capacity, window.items(), key=itemgetter(1))
+                )
+            self._tops[current_key] = (ends, window)
+
+        totals = dict(window)
+        _, previous = self._tops.get(previous_key, (now, {}))
+        for identifier, count in previous.items():
+            totals[identifier] = totals.get(identifier, 0) + count
+        # Sorted first so equal counts come out by identifier, as in Redis
+        return heapq.nlargest(top, sorted(totals.items()), key=itemgetter(1))
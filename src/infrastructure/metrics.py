@@ -0,0 +1,205 @@
+from bisect import bisect_left
+from collections.abc import Callable
+
+# Latency bucket upper bounds in seconds, from 50 us to 2.5 s
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+# Label value shared by rules beyond max_rules, bounding the series count
+OTHER_RULE = "other"
+
+
+class Counter:
+    """Monotonic counter; recording is a single attribute increment."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets allocated up front.
+
+    Observing a value bisects the bucket bounds and increments one slot;
+    counts are made cumulative only when the histogram is rendered.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        # One slot per bound plus the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Metrics:
+    """
+    Metrics of the rate limiter, exposed in the Prometheus text format.
+
+    Every metric is a plain object mutated in place from the event loop,
+    so recording takes no lock and formats no strings; label values are
+    dictionary keys mapped to pre-built metric objects, and the text is
+    only produced when /metrics is scraped.
+    """
+
+    def __init__(
+        self,
+        routes: tuple[str, ...] = ("/rate-limit", "/rate-limit/batch"),
+        max_rules: int = 100,
+    ) -> None:
+        """
+        Initialize the metrics.
+
+        Args:
+            routes: Routes whose handler latency is recorded
+            max_rules: Most distinct rule labels tracked; further rules
+                are counted under "other"
+        """
+        self.max_rules = max_rules
+        # rule -> (allowed, rejected)
+        self.decisions: dict[str, tuple[Counter, Counter]] = {}
+        self.handler_latency = {route: Histogram() for route in routes}
+        self.redis_latency = Histogram()
+        self.storage_errors: dict[type, Counter] = {}
+        self.pool_usage: Callable[[], tuple[int, int, int] | None] | None = (
+            None
+        )
+
+    def record_decision(self, rule: str, allowed: bool) -> None:
+        """Count an allowed or rejected decision for a rule."""
+        counters = self.decisions.get(rule)
+        if counters is None:
+            if len(self.decisions) >= self.max_rules:
+                rule = OTHER_RULE
+            counters = self.decisions.setdefault(rule, (Counter(), Counter()))
+        counters[0 if allowed else 1].inc()
+
+    def record_storage_error(self, error: Exception) -> None:
+        """Count a failed storage call by exception type."""
+        counter = self.storage_errors.get(type(error))
+        if counter is None:
+            counter = self.storage_errors[type(error)] = Counter()
+        counter.inc()
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = [
+            "# HELP rate_limiter_requests_total Rate limit decisions.",
+            "# TYPE rate_limiter_requests_total counter",
+        ]
+        for rule, (allowed, rejected) in self.decisions.items():
+            label = _escape(rule)
+            lines.append(
+                f'rate_limiter_requests_total{{rule="{label}",'
+                f'decision="allowed"}} {allowed.value}'
+            )
+            lines.append(
+                f'rate_limiter_requests_total{{rule="{label}",'
+                f'decision="rejected"}} {rejected.value}'
+            )
+
+        lines += [
+            (
+                "# HELP rate_limiter_handler_duration_seconds Time to answer "
+                "a rate limit request."
+            ),
+            "# TYPE rate_limiter_handler_duration_seconds histogram",
+        ]
+        for route, histogram in self.handler_latency.items():
+            lines += _histogram_lines(
+                "rate_limiter_handler_duration_seconds",
+                f'route="{_escape(route)}"',
+                histogram,
+            )
+
+        lines += [
+            (
+                "# HELP rate_limiter_redis_duration_seconds Round-trip time "
+                "of Redis script calls and pipelines."
+            ),
+            "# TYPE rate_limiter_redis_duration_seconds histogram",
+        ]
+        lines += _histogram_lines(
+            "rate_limiter_redis_duration_seconds", "", self.redis_latency
+        )
+
+        lines += [
+            (
+                "# HELP rate_limiter_storage_errors_total Failed storage "
+                "calls by error type."
+            ),
+            "# TYPE rate_limiter_storage_errors_total counter",
+        ]
+        for error, counter in self.storage_errors.items():
+            lines.append(
+                f'rate_limiter_storage_errors_total{{error="'
+                f'{_escape(error.__name__)}"}} {counter.value}'
+            )
+
+        usage = self.pool_usage() if self.pool_usage is not None else None
+        if usage is not None:
+            in_use, idle, maximum = usage
+            lines += [
+                (
+                    "# HELP rate_limiter_redis_connections Redis connections "
+                    "by state."
+                ),
+                "# TYPE rate_limiter_redis_connections gauge",
+                f'rate_limiter_redis_connections{{state="in_use"}} {in_use}',
+                f'rate_limiter_redis_connections{{state="idle"}} {idle}',
+                (
+                    "# HELP rate_limiter_redis_connections_max Size limit of "
+                    "the Redis connection pool."
+                ),
+                "# TYPE rate_limiter_redis_connections_max gauge",
+                f"rate_limiter_redis_connections_max {maximum}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram):
+    prefix = f"{labels}," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    cumulative += histogram.counts[-1]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+    lines.append(f"{name}_count{suffix} {cumulative}")
+    return lines
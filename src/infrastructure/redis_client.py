@@ -1,5 +1,18 @@
+import logging
+import time
+from typing import Any, Protocol
+
 from redis import asyncio as aioredis
-from typing import Protocol
+from redis.exceptions import RedisClusterException, RedisError
+
+from .metrics import Metrics
+from .scripts import LIMITER_SCRIPTS, ScriptRegistry
+
+# Errors storages raise when Redis, or the socket or file behind them, is
+# unavailable; OSError covers connection failures and timeouts
+STORAGE_ERRORS = (RedisError, RedisClusterException, OSError)
+
+logger = logging.getLogger(__name__)
 
 
 class RateLimitStorage(Protocol):
@@ -20,8 +33,81 @@ class RateLimitStorage(Protocol):
 
 
 class RedisClient(RateLimitStorage):
-    def __init__(self, url: str) -> None:
-        self._client = aioredis.from_url(url)
+    def __init__(
+        self,
+        url: str,
+        scripts: ScriptRegistry = LIMITER_SCRIPTS,
+        fail_open: bool = True,
+        metrics: Metrics | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        """
+        Initialize the Redis client.
+
+        Args:
+            url: Redis connection URL
+            scripts: Registry of the Lua scripts to run
+            fail_open: Answer rate limit calls with permissive defaults
+                when Redis fails; when False, errors are raised so a
+                caller such as a circuit breaker can handle them
+            metrics: Metrics recording the round-trip time of every
+                script call and pipeline, and storage errors
+            timeout: Seconds to wait for a connection or a reply before
+                raising a timeout error; None waits indefinitely
+        """
+        self._client = self._connect(url, timeout)
+        self._scripts = scripts
+        self._fail_open = fail_open
+        self._metrics = metrics
+
+    def _connect(self, url: str, timeout: float | None = None):
+        """Create the underlying redis-py client for the URL."""
+        return aioredis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+
+    def pool_usage(self) -> tuple[int, int, int] | None:
+        """
+        Return the connection pool usage as (in use, idle, maximum).
+
+        Returns:
+            The usage, or None if the pool does not expose it
+        """
+        pool = self._client.connection_pool
+        try:
+            return (
+                len(pool._in_use_connections),
+                len(pool._available_connections),
+                pool.max_connections,
+            )
+        except AttributeError:
+            return None
+
+    async def _execute(self, name: str, keys: list, args: list) -> Any:
+        """Run a registered script, recording its latency and errors."""
+        if self._metrics is None:
+            return await self._scripts.execute(self._client, name, keys, args)
+        start = time.perf_counter()
+        try:
+            return await self._scripts.execute(self._client, name, keys, args)
+        except Exception as exc:
+            self._metrics.record_storage_error(exc)
+            raise
+        finally:
+            self._metrics.redis_latency.observe(time.perf_counter() - start)
+
+    async def _execute_many(self, calls: list) -> list[Any]:
+        """Run scripts in one pipeline, recording latency and errors."""
+        if self._metrics is None:
+            return await self._scripts.execute_many(self._client, calls)
+        start = time.perf_counter()
+        try:
+            return await self._scripts.execute_many(self._client, calls)
+        except Exception as exc:
+            self._metrics.record_storage_error(exc)
+            raise
+        finally:
+            self._metrics.redis_latency.observe(time.perf_counter() - start)
 
     async def ping(self) -> bool:
         try:
@@ -30,12 +116,26 @@ class RedisClient(RateLimitStorage):
         except Exception:
             return False
 
+    async def load_scripts(self) -> bool:
+        """
+        Preload every registered Lua script into the Redis script cache.
+
+        Returns:
+            True if all scripts were loaded, False if Redis is unavailable
+        """
+        try:
+            await self._scripts.load_all(self._client)
+            return True
+        except STORAGE_ERRORS:
+            # Scripts are reloaded on demand after a NOSCRIPT error
+            return False
+
     async def increment(self, key: str, ttl: int) -> int:
         """
         Atomically increment the counter for the given key and set TTL if it's a new key.
 
-        Uses a Lua script to ensure atomicity:
-        - INCR increments the counter
+        Uses a preloaded Lua script, called by SHA, to ensure atomicity:
+        - INCRBY increments the counter
         - EXPIRE sets TTL only if the key didn't exist before (ttl > 0 check)
 
         Args:
@@ -46,17 +146,432 @@ class RedisClient(RateLimitStorage):
             The new counter value after increment
         """
         try:
-            # Lua script for atomic increment with conditional expiration
-            lua_script = """
-            local count = redis.call('INCR', KEYS[1])
-            if count == 1 then
-                redis.call('EXPIRE', KEYS[1], ARGV[1])
-            end
-            return count
-            """
-
-            count = await self._client.eval(lua_script, 1, key, ttl)
+            count = await self._execute("increment", [key], [ttl])
             return count
         except Exception:
+            if not self._fail_open:
+                raise
             # If Redis is unavailable, return 1 (fail open)
             return 1
+
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]:
+        """
+        Increment several counters in a single pipeline round-trip.
+
+        Args:
+            items: (key, ttl, amount) tuples; each key is incremented by
+                its amount and gets the TTL if it is new
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        try:
+            return await self._execute_many(
+                [
+                    ("increment", [key], [ttl, amount])
+                    for key, ttl, amount in items
+                ],
+            )
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, count every key as new (fail open)
+            return [amount for _, _, amount in items]
+
+    async def hash_increment_many(
+        self,
+        items: list[tuple[str, str, int, int]],
+        field_expiry: bool = False,
+    ) -> list[int]:
+        """
+        Increment several counters kept as fields of bucket hashes.
+
+        A single item runs one script call, several run in one pipeline.
+        A new field either gives its bucket the TTL if the bucket has
+        none yet, or with field_expiry gets the TTL itself via HEXPIRE.
+
+        Args:
+            items: (bucket key, field, ttl, amount) tuples
+            field_expiry: Expire fields individually (Redis 7.4+)
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        flag = "1" if field_expiry else "0"
+        calls = [
+            ("hash_increment", [key], [field, ttl, amount, flag])
+            for key, field, ttl, amount in items
+        ]
+        try:
+            if len(calls) == 1:
+                return [await self._execute(*calls[0])]
+            return await self._execute_many(calls)
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, count every field as new (fail open)
+            return [amount for _, _, _, amount in items]
+
+    async def increment_all(
+        self,
+        keys: list[str],
+        limits: list[int],
+        ttls: list[int],
+        cost: int = 1,
+    ) -> tuple[bool, list[int]]:
+        """
+        Atomically increment every rule's counter only if all have room.
+
+        Args:
+            keys: One window counter key per rule
+            limits: The limit of each rule
+            ttls: Time-to-live in seconds of each rule's new counter
+            cost: Amount to add to every counter
+
+        Returns:
+            Tuple of (allowed, count of each rule): the new counts if
+            allowed, otherwise the unchanged current counts
+        """
+        try:
+            allowed, *counts = await self._execute(
+                "multi_window",
+                keys,
+                [cost, *_interleave(limits, ttls)],
+            )
+            return bool(allowed), counts
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow the request (fail open)
+            return True, [cost] * len(keys)
+
+    async def increment_all_many(
+        self, calls: list[tuple[list[str], list[int], list[int], int]]
+    ) -> list[tuple[bool, list[int]]]:
+        """
+        Run several increment_all calls in one pipeline round-trip.
+
+        Args:
+            calls: (keys, limits, ttls, cost) tuples, as for
+                increment_all
+
+        Returns:
+            (allowed, counts) tuples, in the order of the calls
+        """
+        try:
+            results = await self._execute_many(
+                [
+                    ("multi_window", keys, [cost, *_interleave(limits, ttls)])
+                    for keys, limits, ttls, cost in calls
+                ],
+            )
+            return [(bool(allowed), counts) for allowed, *counts in results]
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow every request (fail open)
+            return [(True, [cost] * len(keys)) for keys, _, _, cost in calls]
+
+    async def reserve(
+        self, key: str, amount: int, limit: int, ttl: int
+    ) -> tuple[int, int]:
+        """
+        Atomically reserve up to amount units of a window's quota.
+
+        Args:
+            key: The window counter key
+            amount: Number of units requested
+            limit: Total units available in the window
+            ttl: Time-to-live in seconds for a new key
+
+        Returns:
+            Tuple of (units granted, units reserved in the window so far)
+        """
+        try:
+            granted, reserved = await self._execute(
+                "reserve", [key], [amount, limit, ttl]
+            )
+            return granted, reserved
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, grant the lease (fail open)
+            return amount, amount
+
+    async def release(self, key: str, amount: int) -> None:
+        """
+        Return unused units to a window's quota.
+
+        Args:
+            key: The window counter key
+            amount: Number of units to return
+        """
+        try:
+            await self._execute("release", [key], [amount])
+        except STORAGE_ERRORS as exc:
+            # Unreturned units only expire with the window
+            logger.warning(
+                "could not return %d units to %r: %s", amount, key, exc
+            )
+
+    async def log_request(
+        self,
+        key: str,
+        now_ms: int,
+        window_ms: int,
+        limit: int,
+        member: bytes,
+    ) -> tuple[bool, int, int]:
+        """
+        Atomically trim a sliding window log and record the request.
+
+        Uses a Lua script over a sorted set scored by request time:
+        - ZREMRANGEBYSCORE drops entries older than the window
+        - ZCARD counts the remaining entries
+        - ZADD logs the request only if the count is below the limit
+
+        Args:
+            key: The log key
+            now_ms: Current time in milliseconds
+            window_ms: Window length in milliseconds
+            limit: Maximum requests per window
+            member: Unique member identifying this request
+
+        Returns:
+            Tuple of (allowed, entries in window, oldest entry time in ms)
+        """
+        try:
+            allowed, count, oldest_ms = await self._execute(
+                "sliding_log",
+                [key],
+                [now_ms, window_ms, limit, member],
+            )
+            return bool(allowed), count, oldest_ms
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow the request (fail open)
+            return True, 1, now_ms
+
+    async def weighted_increment(
+        self,
+        current_key: str,
+        previous_key: str,
+        limit: int,
+        weight: float,
+        ttl: int,
+    ) -> tuple[bool, int, int]:
+        """
+        Atomically read two window counters and increment if allowed.
+
+        Both counters are read in one Lua script; the current counter is
+        only incremented when previous * weight + current is below the
+        limit.
+
+        Args:
+            current_key: Counter key of the current window
+            previous_key: Counter key of the previous window
+            limit: Maximum requests per window
+            weight: Share of the previous window still inside the
+                sliding window, between 0 and 1
+            ttl: Time-to-live in seconds for a new current counter
+
+        Returns:
+            Tuple of (allowed, current count, previous count)
+        """
+        try:
+            allowed, current, previous = await self._execute(
+                "sliding_counter",
+                [current_key, previous_key],
+                [limit, repr(weight), ttl],
+            )
+            return bool(allowed), current, previous
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow the request (fail open)
+            return True, 1, 0
+
+    async def take_token(
+        self, key: str, capacity: int, refill_rate: float, cost: int = 1
+    ) -> tuple[bool, int, int, int]:
+        """
+        Atomically refill a token bucket and take cost tokens if available.
+
+        The bucket is a hash holding the token count and the time of the
+        last refill. A Lua script refills it lazily from the Redis TIME
+        clock with millisecond precision, so instances with skewed clocks
+        still agree.
+
+        Args:
+            key: The bucket key
+            capacity: Maximum number of tokens in the bucket
+            refill_rate: Tokens added per second
+            cost: Number of tokens to take
+
+        Returns:
+            Tuple of (allowed, tokens left, milliseconds until enough
+            tokens are available, Unix time in ms when the bucket is
+            full again)
+        """
+        try:
+            allowed, tokens, retry_after_ms, full_at_ms = await self._execute(
+                "token_bucket",
+                [key],
+                [capacity, repr(float(refill_rate)), cost],
+            )
+            return bool(allowed), tokens, retry_after_ms, full_at_ms
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow the request (fail open)
+            return True, capacity - cost, 0, int(time.time() * 1000)
+
+    async def update_tat(
+        self,
+        key: str,
+        emission_interval_us: int,
+        tolerance_us: int,
+        cost: int = 1,
+    ) -> tuple[bool, int, int, int]:
+        """
+        Atomically apply the GCRA to a key's theoretical arrival time.
+
+        The key holds one integer, the theoretical arrival time (TAT) in
+        microseconds, written with SET ... PX so it expires as soon as
+        the identifier is back to a full burst. Time comes from the
+        Redis TIME clock.
+
+        Args:
+            key: The key holding the theoretical arrival time
+            emission_interval_us: Microseconds between requests at the
+                sustained rate
+            tolerance_us: How far ahead of now the TAT may run
+            cost: Number of requests to count, advancing the TAT by as
+                many emission intervals
+
+        Returns:
+            Tuple of (allowed, requests left in the burst, milliseconds
+            until a retry can succeed, Unix time in ms when the burst is
+            fully available again)
+        """
+        try:
+            (
+                allowed,
+                remaining,
+                retry_after_ms,
+                reset_at_ms,
+                _,
+            ) = await self._execute(
+                "gcra",
+                [key],
+                [emission_interval_us, tolerance_us, 0, cost],
+            )
+            return bool(allowed), remaining, retry_after_ms, reset_at_ms
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow the request (fail open)
+            burst = tolerance_us // emission_interval_us
+            return True, burst - cost, 0, int(time.time() * 1000)
+
+    async def schedule(
+        self,
+        key: str,
+        emission_interval_us: int,
+        tolerance_us: int,
+        max_delay_us: int,
+    ) -> tuple[bool, int, int, int, int]:
+        """
+        Atomically reserve the key's next GCRA slot, up to max_delay ahead.
+
+        Uses the same theoretical arrival time (TAT) as update_tat, but a
+        request arriving too early is scheduled for its slot instead of
+        being rejected, as long as the slot is at most max_delay_us away.
+
+        Args:
+            key: The key holding the theoretical arrival time
+            emission_interval_us: Microseconds between requests at the
+                sustained rate
+            tolerance_us: How far ahead of now the TAT may run
+            max_delay_us: Longest delay a request may be scheduled with
+
+        Returns:
+            Tuple of (scheduled, requests left in the burst, milliseconds
+            until a retry can succeed, Unix time in ms when the burst is
+            fully available again, milliseconds to delay the request)
+        """
+        try:
+            (
+                allowed,
+                remaining,
+                retry_after_ms,
+                reset_at_ms,
+                delay_ms,
+            ) = await self._execute(
+                "gcra",
+                [key],
+                [emission_interval_us, tolerance_us, max_delay_us],
+            )
+            return (
+                bool(allowed),
+                remaining,
+                retry_after_ms,
+                reset_at_ms,
+                delay_ms,
+            )
+        except Exception:
+            if not self._fail_open:
+                raise
+            # If Redis is unavailable, allow the request now (fail open)
+            burst = tolerance_us // emission_interval_us
+            return True, burst - 1, 0, int(time.time() * 1000), 0
+
+    async def merge_top(
+        self,
+        current_key: str,
+        previous_key: str,
+        counts: dict[str, int],
+        ttl: int,
+        capacity: int,
+        top: int,
+    ) -> list[tuple[str, int]]:
+        """
+        Add counts to the current window and return the global top.
+
+        Every instance adds its counts to a sorted set per window, kept
+        at the capacity highest counts, and reads the top over the
+        current and previous window in the same Lua script.
+
+        Args:
+            current_key: Sorted set of the current window
+            previous_key: Sorted set of the previous window
+            counts: Requests per identifier since the last merge
+            ttl: Time-to-live in seconds of a window's sorted set
+            capacity: Most identifiers a window's sorted set keeps
+            top: Number of identifiers to return
+
+        Returns:
+            (identifier, count over both windows) pairs, highest first
+
+        Raises:
+            redis.RedisError: If Redis is unavailable; the view is not
+                needed to answer requests, so it never fails open
+        """
+        args: list = [ttl, capacity, top]
+        for identifier, count in counts.items():
+            args += [identifier, count]
+        reply = await self._execute(
+            "merge_top", [current_key, previous_key], args
+        )
+        return [
+            (identifier.decode(), int(count))
+            for identifier, count in zip(reply[::2], reply[1::2])
+        ]
+
+
+def _interleave(limits: list[int], ttls: list[int]) -> list[int]:
+    """Flatten per-rule limits and TTLs into limit, ttl, limit, ... args."""
+    return [value for pair in zip(limits, ttls) for value in pair]
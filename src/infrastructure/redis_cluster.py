@@ -0,0 +1,37 @@
+from redis import asyncio as aioredis
+
+from .redis_client import RedisClient
+
+
+class RedisClusterClient(RedisClient):
+    """
+    Rate limit storage backed by a Redis Cluster.
+
+    Scripts and pipelines run through redis-py's cluster client, which
+    reads the slot map from the node in the URL (CLUSTER SLOTS), sends
+    each script call to the node owning the slot of its keys, splits
+    pipelines into one pipeline per node and follows MOVED and ASK
+    redirections, refreshing the slot map after a MOVED. Script loads go
+    to every primary.
+
+    Multi-key scripts need all their keys in one slot; the limiters tag
+    every key with the identifier (see domain.hash_tag) to ensure that.
+    """
+
+    def _connect(self, url: str, timeout: float | None = None):
+        """Create a cluster client discovering the nodes from the URL."""
+        return aioredis.RedisCluster.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+
+    def pool_usage(self) -> tuple[int, int, int] | None:
+        """Return the connection usage summed over every cluster node."""
+        in_use = idle = maximum = 0
+        try:
+            for node in self._client.get_nodes():
+                in_use += len(node._connections) - len(node._free)
+                idle += len(node._free)
+                maximum += node.max_connections
+        except AttributeError:
+            return None
+        return in_use, idle, maximum
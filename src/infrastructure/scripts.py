@@ -0,0 +1,420 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any
+
+from redis.exceptions import NoScriptError
+
+
+@dataclass(frozen=True)
+class LuaScript:
+    """A Lua script identified by the SHA1 digest of its source."""
+
+    name: str
+    source: str
+    sha: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        digest = hashlib.sha1(self.source.encode()).hexdigest()
+        object.__setattr__(self, "sha", digest)
+
+
+class ScriptRegistry:
+    """
+    Registry of the Lua scripts used by the rate limiting algorithms.
+
+    Scripts are loaded once with SCRIPT LOAD and invoked by SHA with
+    EVALSHA, so only the 40-byte digest travels over the wire per call.
+    If the server has lost its script cache (restart, failover or
+    SCRIPT FLUSH) the NOSCRIPT error is handled by loading the script
+    again and retrying the call once.
+    """
+
+    def __init__(self) -> None:
+        self._scripts: dict[str, LuaScript] = {}
+
+    def register(self, name: str, source: str) -> LuaScript:
+        """
+        Register a script under the given name.
+
+        Args:
+            name: Unique script name
+            source: Lua source code
+
+        Returns:
+            The registered script
+        """
+        if name in self._scripts:
+            raise ValueError(f"Script {name!r} is already registered")
+        script = LuaScript(name=name, source=source)
+        self._scripts[name] = script
+        return script
+
+    def __getitem__(self, name: str) -> LuaScript:
+        return self._scripts[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._scripts
+
+    def __iter__(self):
+        return iter(self._scripts.values())
+
+    def __len__(self) -> int:
+        return len(self._scripts)
+
+    async def load_all(self, client) -> None:
+        """
+        Load every registered script into the server script cache.
+
+        Args:
+            client: Redis client to load the scripts with
+        """
+        for script in self._scripts.values():
+            await client.script_load(script.source)
+
+    async def execute(
+        self,
+        client,
+        name: str,
+        keys: list[Any],
+        args: list[Any],
+    ) -> Any:
+        """
+        Run a registered script with EVALSHA, reloading it on NOSCRIPT.
+
+        Args:
+            client: Redis client to run the script with
+            name: Name of the registered script
+            keys: Values for KEYS
+            args: Values for ARGV
+
+        Returns:
+            The script result
+        """
+        script = self._scripts[name]
+        try:
+            return await client.evalsha(script.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await client.script_load(script.source)
+            return await client.evalsha(script.sha, len(keys), *keys, *args)
+
+    async def execute_many(
+        self,
+        client,
+        calls: list[tuple[str, list[Any], list[Any]]],
+    ) -> list[Any]:
+        """
+        Run several registered scripts in one pipeline round-trip.
+
+        Calls that fail with NOSCRIPT are retried once after reloading
+        their scripts; calls that succeeded are not executed twice.
+
+        Args:
+            client: Redis client to run the scripts with
+            calls: (name, keys, args) tuples, one per script call
+
+        Returns:
+            The script results, in the order of the calls
+        """
+        results = await self._run_pipeline(client, calls)
+        missing = [
+            index
+            for index, result in enumerate(results)
+            if isinstance(result, NoScriptError)
+        ]
+        if missing:
+            for name in {calls[index][0] for index in missing}:
+                await client.script_load(self._scripts[name].source)
+            retried = await self._run_pipeline(
+                client, [calls[index] for index in missing]
+            )
+            for index, result in zip(missing, retried):
+                results[index] = result
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    async def _run_pipeline(
+        self,
+        client,
+        calls: list[tuple[str, list[Any], list[Any]]],
+    ) -> list[Any]:
+        pipe = client.pipeline(transaction=False)
+        for name, keys, args in calls:
+            script = self._scripts[name]
+            # Cluster pipelines block the evalsha() helper but route a
+            # plain EVALSHA command by the slot of its keys
+            pipe.execute_command(
+                "EVALSHA", script.sha, len(keys), *keys, *args
+            )
+        return await pipe.execute(raise_on_error=False)
+
+
+# Registry shared by every Redis-backed algorithm. New algorithms
+# register their scripts here so they are preloaded at startup.
+LIMITER_SCRIPTS = ScriptRegistry()
+
+# KEYS[1] counter key, ARGV[1] TTL in seconds, ARGV[2] optional amount
+INCREMENT = LIMITER_SCRIPTS.register(
+    "increment",
+    """
+    local amount = tonumber(ARGV[2] or '1')
+    local count = redis.call('INCRBY', KEYS[1], amount)
+    if count == amount then
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+    end
+    return count
+    """,
+)
+
+# KEYS[1] counter key, ARGV[1] requested units, ARGV[2] window limit,
+# ARGV[3] TTL in seconds. Returns {granted, reserved in window}.
+RESERVE = LIMITER_SCRIPTS.register(
+    "reserve",
+    """
+    local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local grant = math.min(tonumber(ARGV[1]), tonumber(ARGV[2]) - used)
+    if grant <= 0 then
+        return {0, used}
+    end
+    used = redis.call('INCRBY', KEYS[1], grant)
+    if used == grant then
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+    end
+    return {grant, used}
+    """,
+)
+
+# KEYS[1] counter key, ARGV[1] units to return. Never drops below zero
+# and never recreates an expired window.
+RELEASE = LIMITER_SCRIPTS.register(
+    "release",
+    """
+    local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local amount = math.min(tonumber(ARGV[1]), used)
+    if amount <= 0 then
+        return used
+    end
+    return redis.call('DECRBY', KEYS[1], amount)
+    """,
+)
+
+# KEYS[1] log key, ARGV[1] now in ms, ARGV[2] window in ms, ARGV[3] limit,
+# ARGV[4] unique member. Returns {allowed, entries, oldest entry in ms}.
+SLIDING_LOG = LIMITER_SCRIPTS.register(
+    "sliding_log",
+    """
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+    local count = redis.call('ZCARD', KEYS[1])
+    local allowed = 0
+    if count < tonumber(ARGV[3]) then
+        redis.call('ZADD', KEYS[1], now, ARGV[4])
+        count = count + 1
+        allowed = 1
+    end
+    local oldest = now
+    local first = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if first[2] then
+        oldest = tonumber(first[2])
+        -- Every entry is at most `now`, so the log is stale after window
+        redis.call('PEXPIRE', KEYS[1], window)
+    end
+    return {allowed, count, oldest}
+    """,
+)
+
+# KEYS[1] current window counter, KEYS[2] previous window counter,
+# ARGV[1] limit, ARGV[2] previous window weight, ARGV[3] TTL in seconds.
+# Returns {allowed, current count, previous count}.
+SLIDING_COUNTER = LIMITER_SCRIPTS.register(
+    "sliding_counter",
+    """
+    local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+    local estimated = previous * tonumber(ARGV[2]) + current
+    if estimated + 1 > tonumber(ARGV[1]) then
+        return {0, current, previous}
+    end
+    current = redis.call('INCR', KEYS[1])
+    if current == 1 then
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+    end
+    return {1, current, previous}
+    """,
+)
+
+# KEYS[1] bucket hash, ARGV[1] capacity, ARGV[2] refill rate in tokens per
+# second, ARGV[3] optional tokens to take (default 1). Time comes from the
+# Redis server clock so every instance agrees. Returns {allowed, tokens
+# left, ms until a token is available, Unix time in ms when the bucket is
+# full again}.
+TOKEN_BUCKET = LIMITER_SCRIPTS.register(
+    "token_bucket",
+    """
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) * 1000
+    now = now + math.floor(tonumber(time[2]) / 1000)
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2]) / 1000
+    local cost = tonumber(ARGV[3] or '1')
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if tokens == nil or ts == nil then
+        tokens = capacity
+        ts = now
+    end
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = math.ceil((cost - tokens) / rate)
+    end
+    local full_in = math.ceil((capacity - tokens) / rate)
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+    -- A full bucket is the same as a missing one, so it can expire then
+    redis.call('PEXPIRE', KEYS[1], math.max(full_in, 1))
+    return {allowed, math.floor(tokens), retry_after, now + full_in}
+    """,
+)
+
+# KEYS[1] TAT key, ARGV[1] emission interval in us, ARGV[2] burst
+# tolerance in us, ARGV[3] optional longest delay in us a request may be
+# scheduled ahead instead of being rejected (traffic shaping), ARGV[4]
+# optional number of requests to count (default 1). Times are
+# microseconds from the Redis TIME clock and are formatted with %.0f
+# because tostring() would use exponent notation. Returns {allowed,
+# requests left in the burst, ms until a retry can succeed, Unix time in
+# ms when the burst is fully available again, ms to delay the request}.
+GCRA = LIMITER_SCRIPTS.register(
+    "gcra",
+    """
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+    local interval = tonumber(ARGV[1])
+    local tolerance = tonumber(ARGV[2])
+    local max_delay = tonumber(ARGV[3] or '0')
+    local cost = tonumber(ARGV[4] or '1')
+    local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+    tat = math.max(tat, now)
+    local new_tat = tat + interval * cost
+    local delay = new_tat - tolerance - now
+    if delay > max_delay then
+        local left = math.floor((now + tolerance - tat) / interval)
+        local retry_after = math.ceil((delay - max_delay) / 1000)
+        return {0, left, retry_after, math.ceil(tat / 1000), 0}
+    end
+    local ttl = math.ceil((new_tat - now) / 1000)
+    redis.call(
+        'SET', KEYS[1], string.format('%.0f', new_tat),
+        'PX', string.format('%.0f', ttl)
+    )
+    local left = math.floor((now + tolerance - new_tat) / interval)
+    delay = math.ceil(math.max(delay, 0) / 1000)
+    return {1, left, 0, math.ceil(new_tat / 1000), delay}
+    """,
+)
+
+# KEYS one counter per rule, ARGV[1] cost, then ARGV[2i] limit and
+# ARGV[2i+1] TTL in seconds of the rule of KEYS[i]. Counters are only
+# incremented if every rule has room for the cost. Returns {allowed,
+# count of each rule}: the new counts if allowed, else the current ones.
+MULTI_WINDOW = LIMITER_SCRIPTS.register(
+    "multi_window",
+    """
+    local cost = tonumber(ARGV[1])
+    local result = {1}
+    for i, key in ipairs(KEYS) do
+        local count = tonumber(redis.call('GET', key) or '0')
+        result[i + 1] = count
+        if count + cost > tonumber(ARGV[2 * i]) then
+            result[1] = 0
+        end
+    end
+    if result[1] == 0 then
+        return result
+    end
+    for i, key in ipairs(KEYS) do
+        local count = redis.call('INCRBY', key, cost)
+        if count == cost then
+            redis.call('EXPIRE', key, ARGV[2 * i + 1])
+        end
+        result[i + 1] = count
+    end
+    return result
+    """,
+)
+
+# KEYS[1] sorted set of the current window, KEYS[2] of the previous one,
+# ARGV[1] TTL in seconds, ARGV[2] capacity, ARGV[3] top, then identifier
+# and count pairs added to the current window, which is trimmed to its
+# capacity highest counts. Returns identifier, count pairs of the top
+# identifiers summed over both windows, highest first.
+MERGE_TOP = LIMITER_SCRIPTS.register(
+    "merge_top",
+    """
+    for i = 4, #ARGV, 2 do
+        redis.call('ZINCRBY', KEYS[1], ARGV[i + 1], ARGV[i])
+    end
+    if #ARGV >= 4 then
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+    end
+    local capacity = tonumber(ARGV[2])
+    local size = redis.call('ZCARD', KEYS[1])
+    if size > capacity then
+        redis.call('ZREMRANGEBYRANK', KEYS[1], 0, size - capacity - 1)
+    end
+    local totals = {}
+    local order = {}
+    for _, key in ipairs(KEYS) do
+        local entries = redis.call(
+            'ZREVRANGE', key, 0, capacity - 1, 'WITHSCORES'
+        )
+        for j = 1, #entries, 2 do
+            local identifier = entries[j]
+            if totals[identifier] == nil then
+                totals[identifier] = 0
+                order[#order + 1] = identifier
+            end
+            totals[identifier] = totals[identifier] + tonumber(entries[j + 1])
+        end
+    end
+    table.sort(order, function(a, b)
+        if totals[a] == totals[b] then
+            return a < b
+        end
+        return totals[a] > totals[b]
+    end)
+    local result = {}
+    for j = 1, math.min(tonumber(ARGV[3]), #order) do
+        result[2 * j - 1] = order[j]
+        result[2 * j] = totals[order[j]]
+    end
+    return result
+    """,
+)
+
+# KEYS[1] bucket hash, ARGV[1] field, ARGV[2] TTL in seconds, ARGV[3]
+# amount, ARGV[4] "1" to expire the field with HEXPIRE (Redis 7.4+)
+# instead of the whole bucket. Returns the field's new count.
+HASH_INCREMENT = LIMITER_SCRIPTS.register(
+    "hash_increment",
+    """
+    local amount = tonumber(ARGV[3])
+    local count = redis.call('HINCRBY', KEYS[1], ARGV[1], amount)
+    if count == amount and tonumber(ARGV[2]) > 0 then
+        if ARGV[4] == '1' then
+            redis.call('HEXPIRE', KEYS[1], ARGV[2], 'FIELDS', 1, ARGV[1])
+        elseif redis.call('TTL', KEYS[1]) < 0 then
+            redis.call('EXPIRE', KEYS[1], ARGV[2])
+        end
+    end
+    return count
+    """,
+)
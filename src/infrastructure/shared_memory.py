@@ -0,0 +1,192 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections.abc import Callable
+
+from .redis_client import RateLimitStorage
+
+# Table header: magic, segment count, slots per segment, slot size
+_HEADER = struct.Struct("<8sIII")
+_HEADER_SIZE = 64
+_MAGIC = b"RLCOUNT1"
+
+# Slot: 16-byte key digest, count, expiry as Unix time in ms. A slot
+# that was never used has expiry 0, an expired one is free for reuse.
+_SLOT = struct.Struct("<16sqq")
+
+# Expiry of counters stored without a TTL
+_NEVER = 2**62
+
+
+class SharedMemoryStorage(RateLimitStorage):
+    """
+    Counter table shared by the worker processes of one host.
+
+    Counters live in a fixed-size open-addressing hash table in a
+    memory-mapped file (by default under /dev/shm, i.e. in RAM), so
+    every process that maps the same path sees the same counts without
+    a network hop. Keys are stored as 16-byte BLAKE2b digests next to
+    their count and expiry time.
+
+    The table is split into segments, each guarded by an fcntl record
+    lock on its byte range. A key hashes to one segment and is probed
+    linearly within it, so an update locks a single segment and workers
+    touching different segments never wait for each other. Expired
+    slots are reused by new keys; when a key's probe window holds only
+    live counters, the one expiring soonest is evicted, so a full table
+    loses the least valuable count instead of failing.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 1 << 20,
+        segments: int = 256,
+        max_probe: int = 32,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Open the table at path, creating it if it does not exist.
+
+        Args:
+            path: File backing the table; every worker uses the same one
+            slots: Total number of counters the table holds
+            segments: Number of independently locked segments
+            max_probe: Most slots looked at for one key
+            clock: Wall-clock time in seconds, shared by all processes
+
+        Raises:
+            ValueError: If the file holds a table of another layout
+        """
+        self._segments = max(1, min(segments, slots))
+        self._segment_slots = max(1, slots // self._segments)
+        self._max_probe = min(max_probe, self._segment_slots)
+        self._segment_size = self._segment_slots * _SLOT.size
+        self._clock = clock
+        size = _HEADER_SIZE + self._segments * self._segment_size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # Workers starting together agree on who initializes the file
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _HEADER_SIZE, 0)
+            try:
+                self._map = self._attach(size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _HEADER_SIZE, 0)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _attach(self, size: int) -> mmap.mmap:
+        header = _HEADER.pack(
+            _MAGIC, self._segments, self._segment_slots, _SLOT.size
+        )
+        if os.fstat(self._fd).st_size == 0:
+            # A new file reads as zeros, i.e. all slots never used
+            os.ftruncate(self._fd, size)
+            table = mmap.mmap(self._fd, size)
+            table[: _HEADER.size] = header
+            return table
+        if os.fstat(self._fd).st_size != size:
+            raise ValueError("shared counter table has a different size")
+        table = mmap.mmap(self._fd, size)
+        if table[: _HEADER.size] != header:
+            table.close()
+            raise ValueError("shared counter table has a different layout")
+        return table
+
+    def close(self) -> None:
+        """Unmap the table; the file stays for the other processes."""
+        self._map.close()
+        os.close(self._fd)
+
+    async def ping(self) -> bool:
+        return not self._map.closed
+
+    async def load_scripts(self) -> bool:
+        """Nothing to load; present for parity with RedisClient."""
+        return True
+
+    async def increment(self, key: str, ttl: int) -> int:
+        """
+        Atomically increment the counter for the given key and set TTL.
+
+        Args:
+            key: The key to increment
+            ttl: Time-to-live in seconds, applied if the key is new
+
+        Returns:
+            The new counter value after increment
+        """
+        return self._add(key, 1, ttl, int(self._clock() * 1000))
+
+    async def increment_many(
+        self, items: list[tuple[str, int, int]]
+    ) -> list[int]:
+        """
+        Increment several counters.
+
+        Args:
+            items: (key, ttl, amount) tuples; each key is incremented by
+                its amount and gets the TTL if it is new
+
+        Returns:
+            The new counter values, in the order of the items
+        """
+        now_ms = int(self._clock() * 1000)
+        return [
+            self._add(key, amount, ttl, now_ms) for key, ttl, amount in items
+        ]
+
+    def _add(self, key: str, amount: int, ttl: int, now_ms: int) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        hashed = int.from_bytes(digest[:8], "little")
+        segment = hashed % self._segments
+        home = (hashed // self._segments) % self._segment_slots
+        start = _HEADER_SIZE + segment * self._segment_size
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._segment_size, start)
+        try:
+            free = None
+            oldest = None
+            oldest_expiry = _NEVER + 1
+            for probe in range(self._max_probe):
+                offset = (
+                    start + (home + probe) % self._segment_slots * _SLOT.size
+                )
+                slot_digest, count, expires_at = _SLOT.unpack_from(
+                    self._map, offset
+                )
+                if expires_at == 0:
+                    # Never used: the key is not stored further along
+                    if free is None:
+                        free = offset
+                    break
+                if expires_at <= now_ms:
+                    if free is None:
+                        free = offset
+                    continue
+                if slot_digest == digest:
+                    count += amount
+                    _SLOT.pack_into(
+                        self._map, offset, digest, count, expires_at
+                    )
+                    return count
+                if expires_at < oldest_expiry:
+                    oldest, oldest_expiry = offset, expires_at
+
+            # New key: reuse a free slot or evict the soonest to expire
+            expires_at = now_ms + ttl * 1000 if ttl > 0 else _NEVER
+            _SLOT.pack_into(
+                self._map,
+                free if free is not None else oldest,
+                digest,
+                amount,
+                expires_at,
+            )
+            return amount
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._segment_size, start)
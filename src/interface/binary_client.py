@@ -0,0 +1,150 @@
+import asyncio
+import contextlib
+import itertools
+
+from domain import RateLimitResult, RateLimitStatus
+
+from .binary_protocol import (
+    LENGTH,
+    NO_RETRY_AFTER,
+    RESPONSE,
+    STATUS_ALLOWED,
+    STATUS_REJECTED,
+    encode_request,
+)
+
+_STATUS = {
+    STATUS_ALLOWED: RateLimitStatus.ALLOWED,
+    STATUS_REJECTED: RateLimitStatus.REJECTED,
+}
+
+
+class BinaryCheckError(Exception):
+    """The server could not check a request."""
+
+
+class BinaryCheckClient:
+    """
+    Async client of the binary check protocol.
+
+    Concurrent checks are pipelined over the one connection: each sends
+    its request without waiting for earlier responses, and a reader task
+    hands every response to the check with its request id.
+    """
+
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self._reader = reader
+        self._writer = writer
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._read_task = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(
+        cls,
+        path: str | None = None,
+        host: str | None = None,
+        port: int | None = None,
+    ) -> "BinaryCheckClient":
+        """
+        Connect to a Unix domain socket at path, or else host and port.
+
+        Raises:
+            OSError: If the connection cannot be made
+        """
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def check(
+        self, identifier: str, cost: int = 1, rule: str | None = None
+    ) -> RateLimitResult:
+        """
+        Check and increment the rate limit of an identifier.
+
+        Args:
+            identifier: The identifier to limit
+            cost: Number of requests the check counts as (1-65535)
+            rule: Optional rule name giving the identifier its own
+                counter
+
+        Returns:
+            Rate limit result; a positive delay_ms asks the caller to
+            wait that long before proceeding (traffic shaping)
+
+        Raises:
+            BinaryCheckError: If the server rejected the request as
+                malformed or its check failed
+            ConnectionError: If the connection is closed
+        """
+        if self._read_task.done():
+            raise ConnectionError("connection closed")
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(encode_request(request_id, identifier, cost, rule))
+        try:
+            await self._writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read(self) -> None:
+        error: Exception = ConnectionError("connection closed")
+        try:
+            while True:
+                (size,) = LENGTH.unpack(
+                    await self._reader.readexactly(LENGTH.size)
+                )
+                frame = await self._reader.readexactly(size)
+                (
+                    request_id,
+                    status,
+                    limit,
+                    remaining,
+                    reset_time,
+                    retry_after_ms,
+                    delay_ms,
+                ) = RESPONSE.unpack_from(frame)
+                future = self._pending.get(request_id)
+                if future is None or future.done():
+                    continue
+                if status not in _STATUS:
+                    future.set_exception(
+                        BinaryCheckError("the server could not check")
+                    )
+                    continue
+                future.set_result(
+                    RateLimitResult(
+                        status=_STATUS[status],
+                        limit=limit,
+                        remaining=remaining,
+                        reset_time=reset_time,
+                        retry_after_ms=(
+                            None
+                            if retry_after_ms == NO_RETRY_AFTER
+                            else retry_after_ms
+                        ),
+                        delay_ms=delay_ms,
+                    )
+                )
+        except (asyncio.IncompleteReadError, OSError) as exc:
+            if isinstance(exc, OSError):
+                error = exc
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def close(self) -> None:
+        """Close the connection, failing checks still waiting."""
+        self._writer.close()
+        with contextlib.suppress(OSError):
+            await self._writer.wait_closed()
+        self._read_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._read_task
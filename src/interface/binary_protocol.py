@@ -0,0 +1,319 @@
+import asyncio
+import contextlib
+import os
+import socket
+import stat
+import struct
+from collections.abc import Callable
+
+from application.rate_limit import RateLimitUseCase
+from domain import RateLimitResult, RateLimitStatus
+from infrastructure import STORAGE_ERRORS
+
+# Frames start with the byte length of the rest of the frame
+LENGTH = struct.Struct(">I")
+# Request: request id, cost, rule name length; the rule name and the
+# identifier (both UTF-8) follow
+REQUEST = struct.Struct(">IHB")
+# Response: request id, status, limit, remaining, reset time (Unix
+# seconds), retry after (ms, NO_RETRY_AFTER if unknown), delay (ms)
+RESPONSE = struct.Struct(">IBIIIII")
+
+STATUS_ALLOWED = 0
+STATUS_REJECTED = 1
+# The request was malformed (e.g. empty identifier, a cost of zero or
+# above the use case's bound) or the check failed; the other fields are
+# zero
+STATUS_ERROR = 2
+
+NO_RETRY_AFTER = 0xFFFFFFFF
+# Longest request frame accepted; a longer one closes the connection
+MAX_FRAME_SIZE = 4096
+# Batches being checked per connection before it stops reading
+MAX_PENDING_BATCHES = 64
+
+_STATUS = {
+    RateLimitStatus.ALLOWED: STATUS_ALLOWED,
+    RateLimitStatus.REJECTED: STATUS_REJECTED,
+}
+_RESPONSE_LENGTH = LENGTH.pack(RESPONSE.size)
+
+
+def encode_request(
+    request_id: int, identifier: str, cost: int = 1, rule: str | None = None
+) -> bytes:
+    """
+    Encode a check-and-increment request frame.
+
+    Args:
+        request_id: Number echoed in the response, to match it up
+        identifier: The identifier to limit
+        cost: Number of requests the check counts as (1-65535)
+        rule: Optional rule name giving the identifier its own counter
+
+    Returns:
+        The frame, length prefix included
+    """
+    rule_bytes = rule.encode() if rule else b""
+    body = (
+        REQUEST.pack(request_id, cost, len(rule_bytes))
+        + rule_bytes
+        + identifier.encode()
+    )
+    return LENGTH.pack(len(body)) + body
+
+
+def encode_response(request_id: int, result: RateLimitResult | None) -> bytes:
+    """Encode the response frame of a result, or of an error if None."""
+    if result is None:
+        return _RESPONSE_LENGTH + RESPONSE.pack(
+            request_id, STATUS_ERROR, 0, 0, 0, 0, 0
+        )
+    retry_after = result.retry_after_ms
+    return _RESPONSE_LENGTH + RESPONSE.pack(
+        request_id,
+        _STATUS[result.status],
+        result.limit,
+        result.remaining,
+        result.reset_time,
+        NO_RETRY_AFTER if retry_after is None else retry_after,
+        result.delay_ms,
+    )
+
+
+class CheckProtocol(asyncio.Protocol):
+    """
+    Server side of the binary check protocol for one connection.
+
+    Clients may pipeline requests: every complete frame read in one go
+    is checked as one batch with check_and_increment_many, so a burst of
+    requests costs one storage round-trip. Batches run concurrently and
+    each request's response carries its request id, so responses of
+    different batches may arrive out of order.
+    """
+
+    def __init__(
+        self,
+        use_case: RateLimitUseCase,
+        on_result: Callable[[str | None, bool], None] | None = None,
+        connections: set["CheckProtocol"] | None = None,
+    ):
+        """
+        Initialize the protocol.
+
+        Args:
+            use_case: Rate limit use case checking the requests
+            on_result: Called with the rule and whether the request was
+                allowed, e.g. to record metrics
+            connections: Set the protocol belongs to while connected
+        """
+        self.use_case = use_case
+        self.on_result = on_result
+        self._connections = connections if connections is not None else set()
+        self._buffer = bytearray()
+        self._tasks: set[asyncio.Task] = set()
+        self._transport: asyncio.Transport | None = None
+        self._paused = False
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self._transport = transport
+        self._connections.add(self)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._transport = None
+        self._connections.discard(self)
+        for task in self._tasks:
+            task.cancel()
+
+    def close(self) -> None:
+        """Close the connection, dropping checks still in progress."""
+        if self._transport is not None:
+            self._transport.close()
+
+    def data_received(self, data: bytes) -> None:
+        buffer = self._buffer
+        buffer += data
+        requests = []
+        offset = 0
+        while len(buffer) - offset >= LENGTH.size:
+            (size,) = LENGTH.unpack_from(buffer, offset)
+            if size < REQUEST.size or size > MAX_FRAME_SIZE:
+                # The stream cannot be resynchronised
+                self._transport.close()
+                return
+            end = offset + LENGTH.size + size
+            if end > len(buffer):
+                break
+            start = offset + LENGTH.size
+            request_id, cost, rule_size = REQUEST.unpack_from(buffer, start)
+            start += REQUEST.size
+            try:
+                rule = bytes(buffer[start : start + rule_size]).decode()
+                identifier = bytes(buffer[start + rule_size : end]).decode()
+            except UnicodeDecodeError:
+                identifier = ""
+            requests.append((request_id, identifier, cost, rule or None))
+            offset = end
+        del buffer[:offset]
+        if not requests:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._answer(requests))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        if len(self._tasks) >= MAX_PENDING_BATCHES and not self._paused:
+            self._paused = True
+            self._transport.pause_reading()
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if self._paused and self._transport is not None:
+            self._paused = False
+            self._transport.resume_reading()
+
+    def _valid(self, identifier: str, cost: int) -> bool:
+        """Return whether a request is valid, bounding cost as batches."""
+        try:
+            self.use_case.validate_cost(cost)
+        except ValueError:
+            return False
+        return bool(identifier)
+
+    async def _answer(
+        self, requests: list[tuple[int, str, int, str | None]]
+    ) -> None:
+        checked = [
+            self._valid(identifier, cost)
+            for _, identifier, cost, _ in requests
+        ]
+        valid = [
+            (identifier, cost, rule)
+            for (_, identifier, cost, rule), ok in zip(requests, checked)
+            if ok
+        ]
+        results = iter(())
+        try:
+            if valid:
+                results = iter(
+                    await self.use_case.check_and_increment_many(valid)
+                )
+        except STORAGE_ERRORS:
+            results = None
+
+        frames = []
+        for (request_id, _, _, rule), ok in zip(requests, checked):
+            result = None
+            if results is not None and ok:
+                result = next(results)
+                if self.on_result is not None:
+                    self.on_result(
+                        rule, result.status == RateLimitStatus.ALLOWED
+                    )
+            frames.append(encode_response(request_id, result))
+        if self._transport is not None:
+            self._transport.write(b"".join(frames))
+
+
+def unix_socket(path: str) -> socket.socket:
+    """
+    Create a listening Unix domain socket at path.
+
+    A socket file left behind by an earlier run is replaced; any other
+    file at path is an error.
+
+    Raises:
+        OSError: If path exists and is not a socket, or binding fails
+    """
+    with contextlib.suppress(FileNotFoundError):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise OSError(f"{path} exists and is not a socket")
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+        sock.listen(1024)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def tcp_socket(host: str, port: int) -> socket.socket:
+    """Create a listening TCP socket on host and port."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(1024)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def binary_sockets(config, host: str = "0.0.0.0") -> list[socket.socket]:
+    """
+    Bind the listening sockets of the binary protocol in config.
+
+    Returns:
+        A Unix domain socket at binary_socket_path and a TCP socket on
+        binary_port, for those that are set
+    """
+    sockets = []
+    if config.binary_socket_path:
+        sockets.append(unix_socket(config.binary_socket_path))
+    if config.binary_port is not None:
+        sockets.append(tcp_socket(host, config.binary_port))
+    return sockets
+
+
+class BinaryCheckServer:
+    """
+    Server of the binary check protocol on already bound sockets.
+
+    Closing the server also closes the connections still open, so a
+    shutdown does not wait for clients to hang up.
+    """
+
+    def __init__(
+        self,
+        use_case: RateLimitUseCase,
+        on_result: Callable[[str | None, bool], None] | None = None,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            use_case: Rate limit use case checking the requests
+            on_result: Called with the rule and whether each checked
+                request was allowed
+        """
+        self.use_case = use_case
+        self.on_result = on_result
+        self._servers: list[asyncio.Server] = []
+        self._connections: set[CheckProtocol] = set()
+
+    def _protocol(self) -> CheckProtocol:
+        return CheckProtocol(self.use_case, self.on_result, self._connections)
+
+    async def start(self, sockets: list[socket.socket]) -> None:
+        """Start serving on listening Unix domain or TCP sockets."""
+        loop = asyncio.get_running_loop()
+        for sock in sockets:
+            if sock.family == socket.AF_UNIX:
+                server = await loop.create_unix_server(
+                    self._protocol, sock=sock
+                )
+            else:
+                server = await loop.create_server(self._protocol, sock=sock)
+            self._servers.append(server)
+
+    async def close(self) -> None:
+        """Stop listening and close every open connection."""
+        for server in self._servers:
+            server.close()
+        for protocol in list(self._connections):
+            protocol.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
@@ -0,0 +1,160 @@
+import asyncio
+import functools
+import math
+from collections.abc import Awaitable, Callable
+
+from aiohttp import web
+
+from application.rate_limit import RateLimitUseCase
+from domain import RateLimitResult, RateLimitStatus
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+# Returns the identifier to limit a request by, or None to let it through
+KeyFunction = Callable[[web.Request], str | None]
+
+# Set on decorated handlers, so the middleware does not count them twice
+_DECORATED = "__rate_limited__"
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict[str, str]:
+    """
+    Return the X-RateLimit-* (and Retry-After) headers of a result.
+
+    Args:
+        result: Result of a rate limit check
+
+    Returns:
+        Header names and values
+    """
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(result.reset_time),
+    }
+    if (
+        result.status == RateLimitStatus.REJECTED
+        and result.retry_after_ms is not None
+    ):
+        # Retry-After is in whole seconds; round up so retries succeed
+        headers["Retry-After"] = str(math.ceil(result.retry_after_ms / 1000))
+    return headers
+
+
+async def _limited(
+    request: web.Request,
+    handler: Handler,
+    use_case: RateLimitUseCase,
+    key: KeyFunction | None,
+    rule: str | None,
+    cost: int,
+) -> web.StreamResponse:
+    """Run handler if the request is within its limit, adding headers."""
+    if key is None and rule is None and cost == 1:
+        # The use case's rule set, if any, picks the limit by path
+        result = await use_case.check_and_increment(
+            request.headers, request.remote, request.path
+        )
+    else:
+        if key is None:
+            identifier = use_case.client_ip(request.headers, request.remote)
+        else:
+            identifier = key(request)
+            if identifier is None:
+                return await handler(request)
+        result = await use_case.check(identifier, cost, rule)
+    headers = rate_limit_headers(result)
+    if result.status == RateLimitStatus.REJECTED:
+        return web.Response(status=429, headers=headers)
+    if result.delay_ms > 0:
+        # Shaping: the slot is already reserved, so wait for it
+        await asyncio.sleep(result.delay_ms / 1000)
+
+    try:
+        response = await handler(request)
+    except web.HTTPException as exc:
+        exc.headers.update(headers)
+        raise
+    # A streamed response has sent its headers already
+    if not response.prepared:
+        response.headers.update(headers)
+    return response
+
+
+def rate_limit_middleware(
+    use_case: RateLimitUseCase,
+    key: KeyFunction | None = None,
+    rule: str | None = None,
+    cost: int = 1,
+):
+    """
+    Create a middleware limiting every route of an application.
+
+    The check runs in process, so a protected request costs no extra
+    round-trip to a rate limiting service. Rejected requests get a 429
+    response without reaching the handler; allowed ones get the
+    X-RateLimit-* headers added to the handler's response. Routes
+    decorated with rate_limit are left to their decorator.
+
+    Args:
+        use_case: Rate limit use case checking the requests
+        key: Function returning the identifier of a request, or None to
+            let it through unlimited; defaults to the client IP address
+        rule: Rule name giving the requests their own counters
+        cost: Number of requests each request counts as
+
+    Returns:
+        The aiohttp middleware
+
+    Raises:
+        ValueError: If the use case cannot count cost
+    """
+    use_case.validate_cost(cost)
+
+    @web.middleware
+    async def middleware(
+        request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        if getattr(request.match_info.handler, _DECORATED, False):
+            return await handler(request)
+        return await _limited(request, handler, use_case, key, rule, cost)
+
+    return middleware
+
+
+def rate_limit(
+    use_case: RateLimitUseCase,
+    key: KeyFunction | None = None,
+    rule: str | None = None,
+    cost: int = 1,
+) -> Callable[[Handler], Handler]:
+    """
+    Decorate a route handler to limit its requests in process.
+
+    Each route can use its own use case (and so its own limit), key
+    function and rule name. A decorated route is not limited again by
+    rate_limit_middleware.
+
+    Args:
+        use_case: Rate limit use case checking the route's requests
+        key: Function returning the identifier of a request, or None to
+            let it through unlimited; defaults to the client IP address
+        rule: Rule name giving the route's requests their own counters
+        cost: Number of requests each request counts as
+
+    Returns:
+        Decorator wrapping a handler
+
+    Raises:
+        ValueError: If the use case cannot count cost
+    """
+    use_case.validate_cost(cost)
+
+    def decorator(handler: Handler) -> Handler:
+        @functools.wraps(handler)
+        async def wrapper(request: web.Request) -> web.StreamResponse:
+            return await _limited(request, handler, use_case, key, rule, cost)
+
+        setattr(wrapper, _DECORATED, True)
+        return wrapper
+
+    return decorator
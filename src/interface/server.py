@@ -0,0 +1,258 @@
+import contextlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import replace
+
+from aiohttp import web
+
+from .binary_protocol import binary_sockets
+from .web_app import create_app
+
+logger = logging.getLogger(__name__)
+
+# Seconds a stopping worker gets to finish its requests
+SHUTDOWN_TIMEOUT = 10.0
+# A worker that exits sooner than this after starting is restarted only
+# once this much time has passed, so a worker failing at startup does
+# not spin
+RESTART_DELAY = 1.0
+# How often the supervisor checks for exited workers
+POLL_INTERVAL = 0.1
+
+
+def reuseport_socket(host: str, port: int) -> socket.socket:
+    """
+    Create a listening socket that other processes may bind as well.
+
+    With SO_REUSEPORT every worker owns a listening socket on the same
+    port and the kernel spreads incoming connections across them, so
+    workers do not contend on one shared accept queue.
+
+    Raises:
+        OSError: If the platform has no SO_REUSEPORT
+    """
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise OSError("SO_REUSEPORT is not supported on this platform")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(1024)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def run_worker(
+    config,
+    host: str = "0.0.0.0",
+    binary_sockets: list[socket.socket] | None = None,
+) -> None:
+    """
+    Serve the app in this process on a SO_REUSEPORT socket.
+
+    The app, and with it the Redis connection pool, is created here,
+    after the fork, so no connection is shared between workers. SIGTERM
+    and SIGINT stop accepting connections, let open requests finish for
+    up to SHUTDOWN_TIMEOUT seconds and run the app cleanup.
+
+    Binary protocol sockets are bound once by the supervisor and
+    inherited, so every worker accepts connections on the same ones.
+    """
+    sock = reuseport_socket(host, config.port)
+    web.run_app(
+        create_app(config, binary_sockets),
+        sock=sock,
+        shutdown_timeout=SHUTDOWN_TIMEOUT,
+        print=None,
+    )
+
+
+class Supervisor:
+    """
+    Pre-fork supervisor keeping a fixed number of worker processes.
+
+    Each worker is a forked child running target. A worker that exits
+    while the supervisor is running is replaced; SIGTERM or SIGINT
+    forwards SIGTERM to every worker, waits for them to exit and kills
+    the ones still running after shutdown_timeout seconds.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[], None],
+        workers: int,
+        restart_delay: float = RESTART_DELAY,
+        shutdown_timeout: float = SHUTDOWN_TIMEOUT,
+    ) -> None:
+        """
+        Initialize the supervisor.
+
+        Args:
+            target: Function serving requests in a worker process
+            workers: Number of worker processes to keep running
+            restart_delay: Shortest time between starting a worker and
+                restarting it
+            shutdown_timeout: Seconds workers get to exit on shutdown
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.target = target
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.shutdown_timeout = shutdown_timeout
+        # pid -> start time
+        self._children: dict[int, float] = {}
+        self._stop_deadline: float | None = None
+
+    @property
+    def pids(self) -> list[int]:
+        """Process ids of the running workers."""
+        return list(self._children)
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Worker: serve until told to stop, never return to the caller
+            code = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self.target()
+                code = 0
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else 1
+            except Exception:
+                logger.exception("worker %d failed", os.getpid())
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self._children[pid] = time.monotonic()
+
+    def _stop(self, signum, frame) -> None:
+        if self._stop_deadline is None:
+            self._stop_deadline = time.monotonic() + self.shutdown_timeout
+            self._signal_all(signal.SIGTERM)
+
+    def _signal_all(self, signum: int) -> None:
+        for pid in self._children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> list[tuple[int, float, int]]:
+        """Collect exited workers as (pid, start time, exit code)."""
+        exited = []
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self._children.pop(pid, None)
+            if started is not None:
+                code = os.waitstatus_to_exitcode(status)
+                exited.append((pid, started, code))
+        return exited
+
+    def run(self) -> int:
+        """
+        Start the workers and supervise them until stopped.
+
+        Returns:
+            0 if every worker exited cleanly on shutdown, 1 otherwise
+        """
+        previous = {
+            signum: signal.signal(signum, self._stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        clean = True
+        # Start times of replacements waiting for their restart delay
+        pending: list[float] = []
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            while self._children or (pending and self._stop_deadline is None):
+                for pid, started, code in self._reap():
+                    if self._stop_deadline is not None:
+                        clean = clean and code == 0
+                        continue
+                    logger.warning(
+                        "worker %d exited with code %d, restarting", pid, code
+                    )
+                    pending.append(started + self.restart_delay)
+
+                now = time.monotonic()
+                if self._stop_deadline is None:
+                    for due in [due for due in pending if due <= now]:
+                        pending.remove(due)
+                        self._spawn()
+                elif now >= self._stop_deadline and self._children:
+                    self._signal_all(signal.SIGKILL)
+                    clean = False
+                time.sleep(POLL_INTERVAL)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        return 0 if clean else 1
+
+
+def serve(config) -> int:
+    """
+    Run the service with config.workers processes.
+
+    A single worker serves in this process as before. With more, a
+    supervisor forks that many workers, each binding config.port with
+    SO_REUSEPORT and owning its Redis connection pool. Each worker
+    counts as an instance when the local fallback limiter splits the
+    limit, so instance_count is multiplied by the worker count.
+
+    The binary check protocol, if configured, listens on sockets bound
+    here, before any fork.
+
+    Returns:
+        Process exit code
+
+    Raises:
+        ValueError: If several workers would keep separate in-process
+            counters, multiplying the limit by the worker count
+    """
+    if config.workers > 1 and config.storage_backend == "memory":
+        raise ValueError(
+            "STORAGE_BACKEND=memory counts per process; use the redis or "
+            "shared backend with WORKERS above 1"
+        )
+    sockets = binary_sockets(config)
+    try:
+        if config.workers <= 1:
+            web.run_app(create_app(config, sockets), port=config.port)
+            return 0
+        worker_config = replace(
+            config, instance_count=config.instance_count * config.workers
+        )
+        print(
+            f"======== Running {config.workers} workers on "
+            f"http://0.0.0.0:{config.port} ========",
+            flush=True,
+        )
+        supervisor = Supervisor(
+            lambda: run_worker(worker_config, binary_sockets=sockets),
+            config.workers,
+        )
+        return supervisor.run()
+    finally:
+        for sock in sockets:
+            sock.close()
+        if config.binary_socket_path:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(config.binary_socket_path)
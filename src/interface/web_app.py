@@ -1,19 +1,292 @@
+import asyncio
+import contextlib
+import hmac
+import socket
+import time
+
 from aiohttp import web
 
 from application.health_check import HealthCheckUseCase
-from application.rate_limit import RateLimitUseCase
-from domain import HealthStatus, RateLimitStatus
-from infrastructure.redis_client import RedisClient
+from application.rate_limit import MAX_COST, RateLimitUseCase
+from domain import (
+    CircuitBreaker,
+    HealthStatus,
+    HeavyHitterTracker,
+    PrefixAggregator,
+    RateLimitAlgorithm,
+    RateLimitStatus,
+)
+from infrastructure.batching import BatchingStorage
+from infrastructure.hash_buckets import HashBucketStorage
+from infrastructure.memory_storage import MemoryStorage
+from infrastructure.metrics import Metrics
+from infrastructure.redis_client import STORAGE_ERRORS, RedisClient
+from infrastructure.redis_cluster import RedisClusterClient
+from infrastructure.shared_memory import SharedMemoryStorage
+
+from .binary_protocol import BinaryCheckServer
+from .middleware import rate_limit_headers
+
+# Algorithms each local storage backend keeps the state of
+LOCAL_BACKEND_ALGORITHMS = {
+    # Plain counters, as kept by MemoryStorage
+    "memory": {
+        RateLimitAlgorithm.FIXED_WINDOW,
+        RateLimitAlgorithm.LEASING,
+        RateLimitAlgorithm.SLIDING_WINDOW_COUNTER,
+    },
+    # Single counter increments, as kept by SharedMemoryStorage
+    "shared": {RateLimitAlgorithm.FIXED_WINDOW},
+}
+
+# Rule label of requests limited by the default limit and of batch items
+# without a rule
+DEFAULT_RULE = "default"
+
+# Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Most items one POST /rate-limit/batch request may check
+BATCH_MAX_ITEMS = 100
+
+
+def _parse_batch_items(data) -> list[tuple[str, int, str | None]]:
+    """
+    Validate a batch request body into (identifier, cost, rule) tuples.
+
+    Items are either identifier strings or objects with an identifier
+    and an optional integer cost (1 to MAX_COST) and rule name.
+
+    Raises:
+        TypeError: If the body or an item is not of the expected type
+        ValueError: If the body is not a valid batch request
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        raise TypeError("body must be an object with an 'items' list")
+    items = data["items"]
+    if not items or len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"'items' must hold 1 to {BATCH_MAX_ITEMS} items")
+
+    parsed = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"identifier": item}
+        if not isinstance(item, dict):
+            raise TypeError("each item must be a string or an object")
+        identifier = item.get("identifier")
+        cost = item.get("cost", 1)
+        rule = item.get("rule")
+        if not isinstance(identifier, str) or not identifier:
+            raise ValueError("each item needs a non-empty 'identifier'")
+        if (
+            isinstance(cost, bool)
+            or not isinstance(cost, int)
+            or not 1 <= cost <= MAX_COST
+        ):
+            raise ValueError(f"'cost' must be an integer from 1 to {MAX_COST}")
+        if rule is not None and not isinstance(rule, str):
+            raise ValueError("'rule' must be a string")
+        parsed.append((identifier, cost, rule or None))
+    return parsed
+
+
+def _parse_block_request(data) -> tuple[list[str], int, int | None]:
+    """
+    Validate a block request body into (identifiers, top, seconds).
+
+    The body names identifiers to block, a number of top heavy hitters
+    to block, or both, and an optional block duration in seconds.
+
+    Raises:
+        TypeError: If the body is not an object
+        ValueError: If the body is not a valid block request
+    """
+    if not isinstance(data, dict):
+        raise TypeError("body must be an object")
+    identifiers = data.get("identifiers", [])
+    top = data.get("top", 0)
+    seconds = data.get("seconds")
+    if not isinstance(identifiers, list) or not all(
+        isinstance(identifier, str) and identifier
+        for identifier in identifiers
+    ):
+        raise ValueError("'identifiers' must be a list of non-empty strings")
+    if isinstance(top, bool) or not isinstance(top, int) or top < 0:
+        raise ValueError("'top' must be a non-negative integer")
+    if not identifiers and not top:
+        raise ValueError("give 'identifiers' or 'top' to block")
+    if seconds is not None and (
+        isinstance(seconds, bool)
+        or not isinstance(seconds, int)
+        or seconds < 1
+    ):
+        raise ValueError("'seconds' must be a positive integer")
+    return identifiers, top, seconds
 
 
-def create_app(config) -> web.Application:
-    redis_client = RedisClient(config.redis_url)
-    health_use_case = HealthCheckUseCase(redis_client)
+def create_app(
+    config, binary_sockets: list[socket.socket] | None = None
+) -> web.Application:
+    """
+    Create the rate limiting service's aiohttp application.
+
+    Args:
+        config: Service configuration
+        binary_sockets: Listening sockets to serve the binary check
+            protocol on while the app runs (see binary_protocol)
+
+    Raises:
+        ValueError: If the configuration combines unsupported options
+    """
+    backend = config.storage_backend
+    rule_set = config.rule_set
+    prefix_limit = config.prefix_rate_limit_count
+    prefix_aggregator = None
+    if (config.ipv4_prefix_length, config.ipv6_prefix_length) != (32, 128):
+        # Raises ValueError for lengths out of range
+        prefix_aggregator = PrefixAggregator(
+            config.ipv4_prefix_length, config.ipv6_prefix_length
+        )
+    if prefix_limit is not None and (
+        prefix_aggregator is None or config.rate_limit_rules
+    ):
+        raise ValueError(
+            "a prefix limit needs a prefix length shorter than the "
+            "address and a single rule"
+        )
+    # Several limits enforced together, globally, by a rule or for an
+    # address and its network
+    composite = (
+        bool(config.rate_limit_rules)
+        or prefix_limit is not None
+        or (
+            rule_set is not None
+            and any(len(rule.limits) > 1 for rule in rule_set.rules)
+        )
+    )
+    if (
+        composite
+        and config.rate_limit_algorithm != RateLimitAlgorithm.FIXED_WINDOW
+    ):
+        raise ValueError(
+            "several limits per request need the fixed window algorithm"
+        )
+    if backend in LOCAL_BACKEND_ALGORITHMS and (
+        config.rate_limit_algorithm not in LOCAL_BACKEND_ALGORITHMS[backend]
+        or (backend == "shared" and composite)
+    ):
+        raise ValueError(
+            f"{config.rate_limit_algorithm.value} is not supported by "
+            f"the {backend} storage backend"
+        )
+    if config.redis_key_layout == "hash" and (
+        backend != "redis"
+        or config.rate_limit_algorithm != RateLimitAlgorithm.FIXED_WINDOW
+        or composite
+    ):
+        raise ValueError(
+            "the hash key layout needs the Redis storage backend and the "
+            "fixed window algorithm with a single rule"
+        )
+    if config.redis_key_encoding == "binary" and (
+        backend != "redis"
+        or config.redis_key_layout != "keys"
+        or config.rate_limit_algorithm
+        not in (RateLimitAlgorithm.FIXED_WINDOW, RateLimitAlgorithm.LEASING)
+        or composite
+    ):
+        raise ValueError(
+            "binary keys need the Redis storage backend with one key per "
+            "counter and the fixed window or leasing algorithm with a "
+            "single rule"
+        )
+    metrics = Metrics()
+    # Only a remote Redis can fail in ways a local limiter should cover
+    circuit_breaker = None
+    if backend == "redis" and config.circuit_breaker:
+        circuit_breaker = CircuitBreaker(
+            failure_rate=config.circuit_breaker_failure_rate,
+            slow_call_ms=config.circuit_breaker_slow_call_ms,
+            open_seconds=config.circuit_breaker_open_seconds,
+        )
+    if backend == "memory":
+        redis_client = MemoryStorage()
+    elif backend == "shared":
+        redis_client = SharedMemoryStorage(
+            config.shared_memory_path, slots=config.shared_memory_slots
+        )
+    else:
+        redis_class = (
+            RedisClusterClient if config.redis_cluster else RedisClient
+        )
+        redis_client = redis_class(
+            config.redis_url,
+            fail_open=circuit_breaker is None,
+            metrics=metrics,
+            timeout=(
+                config.redis_timeout_ms / 1000
+                if config.redis_timeout_ms
+                else None
+            ),
+        )
+    if isinstance(redis_client, RedisClient):
+        metrics.pool_usage = redis_client.pool_usage
+    health_use_case = HealthCheckUseCase(redis_client, circuit_breaker)
+    heavy_hitters = None
+    if config.heavy_hitters:
+        heavy_hitters = HeavyHitterTracker(
+            # The shared-memory table cannot merge, so views stay local
+            redis_client
+            if isinstance(redis_client, (RedisClient, MemoryStorage))
+            else MemoryStorage(),
+            capacity=config.heavy_hitter_capacity,
+            top=config.heavy_hitter_top,
+            window_seconds=config.heavy_hitter_window_seconds,
+            block_threshold=config.heavy_hitter_block_threshold,
+            block_seconds=config.heavy_hitter_block_seconds,
+            storage_errors=STORAGE_ERRORS,
+        )
+    storage = redis_client
+    if config.redis_key_layout == "hash":
+        storage = HashBucketStorage(
+            redis_client,
+            buckets=config.hash_buckets,
+            field_expiry=config.hash_field_expiry,
+        )
+    # Batching coalesces plain increments, used by the fixed window only
+    if (
+        config.redis_batching
+        and config.storage_backend == "redis"
+        and config.rate_limit_algorithm == RateLimitAlgorithm.FIXED_WINDOW
+        and not composite
+    ):
+        storage = BatchingStorage(
+            storage,
+            max_batch_size=config.redis_batch_max_size,
+            max_delay=config.redis_batch_max_delay_ms / 1000,
+        )
     rate_limit_use_case = RateLimitUseCase(
-        redis_client,
+        storage,
         limit=config.rate_limit_count,
         window_duration=config.rate_limit_window_duration,
         window_unit=config.rate_limit_window_unit,
+        near_cache_size=config.near_cache_max_size,
+        algorithm=config.rate_limit_algorithm,
+        lease_max_size=config.lease_max_size,
+        capacity=config.token_bucket_capacity,
+        refill_rate=config.token_bucket_refill_rate,
+        burst=config.gcra_burst,
+        max_wait_ms=config.shaping_max_wait_ms,
+        max_queue=config.shaping_max_queue,
+        max_waiters=config.shaping_max_waiters,
+        rules=config.rate_limit_rules,
+        circuit_breaker=circuit_breaker,
+        instances=config.instance_count,
+        heavy_hitters=heavy_hitters,
+        key_encoding=config.redis_key_encoding,
+        rule_set=rule_set,
+        prefix_aggregator=prefix_aggregator,
+        prefix_limit=prefix_limit,
     )
 
     async def health_handler(request):
@@ -25,33 +298,193 @@ def create_app(config) -> web.Application:
                 for name, check in result.checks.items()
             },
         }
-        status_code = 200 if result.status == HealthStatus.HEALTHY else 503
+        # A degraded service still answers rate limit checks
+        status_code = 503 if result.status == HealthStatus.UNHEALTHY else 200
         return web.json_response(data, status=status_code)
 
+    decisions = metrics.record_decision
+    handler_latency = metrics.handler_latency["/rate-limit"]
+    batch_latency = metrics.handler_latency["/rate-limit/batch"]
+
     async def rate_limit_handler(request):
+        start = time.perf_counter()
         # Extract headers and remote address
         headers = dict(request.headers)
         remote_addr = request.remote or "127.0.0.1"
 
+        # A proxy asking on behalf of a request names its path
+        path = request.headers.get(
+            "X-Original-URI", request.query.get("path", "/")
+        ).split("?", 1)[0]
+
         # Check and increment rate limit
-        result = await rate_limit_use_case.check_and_increment(
-            headers, remote_addr
+        rule, result = await rate_limit_use_case.check_request(
+            headers, remote_addr, path
         )
 
+        if result.delay_ms > 0:
+            # Shaping: the slot is already reserved, so wait for it
+            # without holding a Redis connection and then answer 200
+            await asyncio.sleep(result.delay_ms / 1000)
+
         # Determine HTTP status code
-        status_code = 200 if result.status == RateLimitStatus.ALLOWED else 429
+        allowed = result.status == RateLimitStatus.ALLOWED
+        decisions(rule or DEFAULT_RULE, allowed)
+        status_code = 200 if allowed else 429
 
         # Create response with rate limit headers
-        response = web.Response(status=status_code)
+        response = web.Response(
+            status=status_code, headers=rate_limit_headers(result)
+        )
 
-        # Add rate limit headers
-        response.headers["X-RateLimit-Limit"] = str(result.limit)
-        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
-        response.headers["X-RateLimit-Reset"] = str(result.reset_time)
+        handler_latency.observe(time.perf_counter() - start)
+        return response
 
+    async def rate_limit_batch_handler(request):
+        start = time.perf_counter()
+        try:
+            items = _parse_batch_items(await request.json())
+            # Not every algorithm can count a cost above 1
+            for _, cost, _ in items:
+                rate_limit_use_case.validate_cost(cost)
+        except (TypeError, ValueError) as exc:
+            # json.JSONDecodeError is a ValueError too
+            return web.json_response({"error": str(exc)}, status=400)
+
+        results = await rate_limit_use_case.check_and_increment_many(items)
+
+        delay_ms = max(result.delay_ms for result in results)
+        if delay_ms > 0:
+            # Shaping: every slot is already reserved, wait for the last
+            await asyncio.sleep(delay_ms / 1000)
+
+        data = {
+            "allowed": all(
+                result.status == RateLimitStatus.ALLOWED for result in results
+            ),
+            "results": [
+                {
+                    "identifier": identifier,
+                    "rule": rule,
+                    "cost": cost,
+                    "status": result.status.value,
+                    "limit": result.limit,
+                    "remaining": result.remaining,
+                    "reset": result.reset_time,
+                    "retry_after_ms": result.retry_after_ms,
+                }
+                for (identifier, cost, rule), result in zip(items, results)
+            ],
+        }
+        for (_, _, rule), result in zip(items, results):
+            decisions(
+                rule or DEFAULT_RULE, result.status == RateLimitStatus.ALLOWED
+            )
+        response = web.json_response(data)
+        batch_latency.observe(time.perf_counter() - start)
         return response
 
+    async def metrics_handler(request):
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={"Content-Type": METRICS_CONTENT_TYPE},
+        )
+
+    def authorized(request) -> bool:
+        # Compare bytes: compare_digest rejects non-ASCII str values
+        return hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(
+                errors="surrogateescape"
+            ),
+            f"Bearer {config.admin_token}".encode(errors="surrogateescape"),
+        )
+
+    def blocked_entries() -> list[dict]:
+        entries = heavy_hitters.block_cache.entries()
+        return [
+            {"identifier": identifier, "until": until}
+            for identifier, until in entries.items()
+        ]
+
+    async def heavy_hitters_handler(request):
+        if not authorized(request):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        return web.json_response(
+            {
+                "window_seconds": heavy_hitters.window_seconds,
+                "top": [
+                    {"identifier": identifier, "count": count}
+                    for identifier, count in heavy_hitters.top
+                ],
+                "blocked": blocked_entries(),
+            }
+        )
+
+    async def block_handler(request):
+        if not authorized(request):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        try:
+            identifiers, top, seconds = _parse_block_request(
+                await request.json()
+            )
+        except (TypeError, ValueError) as exc:
+            return web.json_response({"error": str(exc)}, status=400)
+        identifiers += [
+            identifier for identifier, _ in heavy_hitters.top[:top]
+        ]
+        for identifier in identifiers:
+            heavy_hitters.block(identifier, seconds)
+        return web.json_response({"blocked": blocked_entries()})
+
+    async def unblock_handler(request):
+        if not authorized(request):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        if not heavy_hitters.unblock(request.match_info["identifier"]):
+            return web.json_response({"error": "not blocked"}, status=404)
+        return web.json_response({"blocked": blocked_entries()})
+
+    async def sync_heavy_hitters(app):
+        task = asyncio.create_task(
+            heavy_hitters.run(config.heavy_hitter_sync_seconds)
+        )
+        yield
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def serve_binary_protocol(app):
+        server = BinaryCheckServer(
+            rate_limit_use_case,
+            on_result=lambda rule, allowed: decisions(
+                rule or DEFAULT_RULE, allowed
+            ),
+        )
+        await server.start(binary_sockets)
+        yield
+        await server.close()
+
+    async def load_scripts(app):
+        await redis_client.load_scripts()
+
+    async def close_rate_limiter(app):
+        await rate_limit_use_case.close()
+
     app = web.Application()
+    app.on_startup.append(load_scripts)
+    app.on_cleanup.append(close_rate_limiter)
     app.router.add_get("/health", health_handler)
     app.router.add_get("/rate-limit", rate_limit_handler)
+    app.router.add_post("/rate-limit/batch", rate_limit_batch_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    if binary_sockets:
+        app.cleanup_ctx.append(serve_binary_protocol)
+    if heavy_hitters is not None:
+        app.cleanup_ctx.append(sync_heavy_hitters)
+    # The admin endpoints change who gets limited: never serve them open
+    if heavy_hitters is not None and config.admin_token is not None:
+        app.router.add_get("/admin/heavy-hitters", heavy_hitters_handler)
+        app.router.add_post("/admin/heavy-hitters/block", block_handler)
+        app.router.add_delete(
+            "/admin/heavy-hitters/block/{identifier}", unblock_handler
+        )
     return app
@@ -1,13 +1,12 @@
-from aiohttp import web
+import sys
 
 from config import load_config
-from interface.web_app import create_app
+from interface.server import serve
 
 
 def main():
     config = load_config()
-    app = create_app(config)
-    web.run_app(app, port=config.port)
+    sys.exit(serve(config))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import pytest
 
 from application.health_check import HealthCheckUseCase
-from domain import CheckStatus, HealthStatus
+from domain import CheckStatus, CircuitBreaker, HealthStatus
 
 
 @pytest.mark.asyncio
@@ -29,3 +29,24 @@ async def test_execute_ping_failure(mocker):
     assert result.status == HealthStatus.UNHEALTHY
     assert result.checks["redis"].status == CheckStatus.ERROR
     assert result.checks["redis"].message is None
+
+
+@pytest.mark.asyncio
+async def test_execute_reports_circuit_breaker(mocker):
+    mock_redis = mocker.AsyncMock()
+    mock_redis.ping.return_value = True
+    breaker = CircuitBreaker(min_calls=1)
+
+    use_case = HealthCheckUseCase(mock_redis, breaker)
+    result = await use_case.execute()
+
+    assert result.status == HealthStatus.HEALTHY
+    assert result.checks["circuit_breaker"].status == CheckStatus.OK
+    assert result.checks["circuit_breaker"].message == "closed"
+
+    breaker.record_failure()
+    result = await use_case.execute()
+
+    assert result.status == HealthStatus.DEGRADED
+    assert result.checks["circuit_breaker"].status == CheckStatus.ERROR
+    assert result.checks["circuit_breaker"].message == "open"
@@ -2,8 +2,30 @@ import pytest
 from unittest.mock import AsyncMock, Mock
 
 from application.rate_limit import RateLimitUseCase
-from domain import RateLimitResult, RateLimitStatus, TimeUnit
-from infrastructure import RedisClient
+from domain import (
+    CircuitBreaker,
+    CircuitBreakerRateLimiter,
+    CompositeRateLimiter,
+    FixedWindowRateLimiter,
+    GcraRateLimiter,
+    HeavyHitterTracker,
+    LeasingRateLimiter,
+    PrefixAggregator,
+    PrefixRateLimiter,
+    RateLimitAlgorithm,
+    RateLimitConfig,
+    RateLimitResult,
+    RateLimitStatus,
+    Rule,
+    RuleSet,
+    ShapingRateLimiter,
+    SlidingWindowCounterRateLimiter,
+    SlidingWindowLogRateLimiter,
+    TimeUnit,
+    TimeWindow,
+    TokenBucketRateLimiter,
+)
+from infrastructure import MemoryStorage, RedisClient
 
 
 class TestRateLimitUseCase:
@@ -135,4 +157,569 @@ class TestRateLimitUseCase:
         assert result.reset_time == 1234567890
 
         # Verify the rate limiter was called with remote addr
-        use_case.rate_limiter.check_and_increment.assert_called_once_with("192.168.1.100")
\ No newline at end of file
+        use_case.rate_limiter.check_and_increment.assert_called_once_with("192.168.1.100")
+
+
+class TestRateLimitUseCaseNearCache:
+    @pytest.fixture
+    def use_case(self):
+        return RateLimitUseCase(
+            redis_client=AsyncMock(spec=RedisClient),
+            limit=1,
+            near_cache_size=100,
+        )
+
+    def test_near_cache_disabled_by_default(self):
+        use_case = RateLimitUseCase(AsyncMock(spec=RedisClient))
+        assert use_case.rejection_cache is None
+
+    def test_near_cache_enabled(self, use_case):
+        assert use_case.rejection_cache.max_size == 100
+
+    @pytest.mark.asyncio
+    async def test_rejection_short_circuits_storage(self, use_case):
+        """Test a cached rejection is returned without calling the limiter."""
+        rejected = RateLimitResult(
+            status=RateLimitStatus.REJECTED,
+            limit=1,
+            remaining=0,
+            reset_time=4102444800,  # far in the future
+        )
+        use_case.rate_limiter.check_and_increment = AsyncMock(
+            return_value=rejected
+        )
+        headers = {"X-Forwarded-For": "192.168.1.100"}
+
+        first = await use_case.check_and_increment(headers, "127.0.0.1")
+        second = await use_case.check_and_increment(headers, "127.0.0.1")
+
+        assert first == rejected
+        assert second == rejected
+        use_case.rate_limiter.check_and_increment.assert_called_once()
+        assert use_case.rejection_cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_allowed_requests_always_reach_limiter(self, use_case):
+        allowed = RateLimitResult(
+            status=RateLimitStatus.ALLOWED,
+            limit=1,
+            remaining=0,
+            reset_time=4102444800,
+        )
+        use_case.rate_limiter.check_and_increment = AsyncMock(
+            return_value=allowed
+        )
+
+        await use_case.check_and_increment({}, "10.0.0.1")
+        await use_case.check_and_increment({}, "10.0.0.1")
+
+        assert use_case.rate_limiter.check_and_increment.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_retry_reaches_limiter(self, mocker):
+        """Test a rejection is cached only until its retry_after_ms."""
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            limit=1,
+            algorithm=RateLimitAlgorithm.TOKEN_BUCKET,
+            near_cache_size=100,
+        )
+        rejected = RateLimitResult(
+            status=RateLimitStatus.REJECTED,
+            limit=1,
+            remaining=0,
+            reset_time=1060,  # the bucket is full again in a minute
+            retry_after_ms=1000,  # but a token is back in a second
+        )
+        use_case.rate_limiter.check_and_increment = AsyncMock(
+            return_value=rejected
+        )
+        clock = mocker.patch("domain.near_cache.time.time", return_value=1000)
+
+        await use_case.check_and_increment({}, "10.0.0.1")
+        clock.return_value = 1000.5
+        await use_case.check_and_increment({}, "10.0.0.1")
+        assert use_case.rate_limiter.check_and_increment.call_count == 1
+
+        clock.return_value = 1001
+        await use_case.check_and_increment({}, "10.0.0.1")
+        assert use_case.rate_limiter.check_and_increment.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_gcra_retry_reaches_storage(self, mocker):
+        """Test a GCRA rejection is cached only until its retry_after_ms."""
+        redis_client = AsyncMock(spec=RedisClient)
+        # Rejected, one request back in a second, full burst in a minute
+        redis_client.update_tat.return_value = (0, 0, 1000, 1_060_000)
+        use_case = RateLimitUseCase(
+            redis_client,
+            limit=1,
+            algorithm=RateLimitAlgorithm.GCRA,
+            near_cache_size=100,
+        )
+        clock = mocker.patch("domain.near_cache.time.time", return_value=1000)
+
+        await use_case.check_and_increment({}, "10.0.0.1")
+        clock.return_value = 1000.5
+        await use_case.check_and_increment({}, "10.0.0.1")
+        assert redis_client.update_tat.call_count == 1
+
+        clock.return_value = 1001
+        await use_case.check_and_increment({}, "10.0.0.1")
+        assert redis_client.update_tat.call_count == 2
+
+
+class TestRateLimitUseCaseHeavyHitters:
+    @pytest.fixture
+    def use_case(self):
+        return RateLimitUseCase(
+            redis_client=AsyncMock(spec=RedisClient),
+            limit=5,
+            heavy_hitters=HeavyHitterTracker(AsyncMock()),
+        )
+
+    @pytest.mark.asyncio
+    async def test_requests_are_counted(self, use_case):
+        use_case.rate_limiter.check_and_increment = AsyncMock()
+        use_case.rate_limiter.check_and_increment_many = AsyncMock()
+
+        await use_case.check_and_increment({}, "10.0.0.1")
+        await use_case.check_and_increment({}, "10.0.0.1")
+        await use_case.check_and_increment_many([("10.0.0.2", 1, "key")])
+
+        assert use_case.heavy_hitters._sketch.top(2) == [
+            ("10.0.0.1", 2),
+            ("ad-hoc:key:10.0.0.2", 1),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_blocked_identifiers_skip_the_limiter(self, use_case):
+        use_case.rate_limiter.check_and_increment = AsyncMock()
+        use_case.rate_limiter.check_and_increment_many = AsyncMock()
+        use_case.heavy_hitters.block("10.0.0.1", seconds=30)
+
+        result = await use_case.check_and_increment({}, "10.0.0.1")
+        results = await use_case.check_and_increment_many(
+            [("10.0.0.1", 1, None)]
+        )
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.limit == 5
+        assert result.remaining == 0
+        assert 29000 <= result.retry_after_ms <= 30000
+        assert results[0].status == RateLimitStatus.REJECTED
+        use_case.rate_limiter.check_and_increment.assert_not_called()
+        use_case.rate_limiter.check_and_increment_many.assert_not_called()
+
+
+class TestRateLimitUseCaseBatch:
+    @pytest.fixture
+    def use_case(self):
+        return RateLimitUseCase(
+            redis_client=AsyncMock(spec=RedisClient),
+            limit=1,
+            near_cache_size=100,
+        )
+
+    @pytest.mark.asyncio
+    async def test_rules_get_their_own_identifiers(self, use_case):
+        allowed = RateLimitResult(
+            status=RateLimitStatus.ALLOWED,
+            limit=1,
+            remaining=0,
+            reset_time=4102444800,
+        )
+        use_case.rate_limiter.check_and_increment_many = AsyncMock(
+            return_value=[allowed, allowed]
+        )
+
+        results = await use_case.check_and_increment_many(
+            [("10.0.0.1", 1, None), ("10.0.0.1", 2, "api_key")]
+        )
+
+        assert results == [allowed, allowed]
+        use_case.rate_limiter.check_and_increment_many.assert_called_once_with(
+            [("10.0.0.1", 1), ("ad-hoc:api_key:10.0.0.1", 2)]
+        )
+
+    @pytest.mark.asyncio
+    async def test_cached_rejections_skip_the_limiter(self, use_case):
+        rejected = RateLimitResult(
+            status=RateLimitStatus.REJECTED,
+            limit=1,
+            remaining=0,
+            reset_time=4102444800,
+        )
+        allowed = RateLimitResult(
+            status=RateLimitStatus.ALLOWED,
+            limit=1,
+            remaining=0,
+            reset_time=4102444800,
+        )
+        use_case.rejection_cache.put("ad-hoc:tenant:t1", rejected)
+        use_case.rate_limiter.check_and_increment_many = AsyncMock(
+            return_value=[allowed]
+        )
+
+        results = await use_case.check_and_increment_many(
+            [("t1", 1, "tenant"), ("10.0.0.1", 1, None)]
+        )
+
+        assert results == [rejected, allowed]
+        use_case.rate_limiter.check_and_increment_many.assert_called_once_with(
+            [("10.0.0.1", 1)]
+        )
+
+    @pytest.mark.asyncio
+    async def test_check_with_rule_goes_through_the_batch(self, use_case):
+        allowed = RateLimitResult(
+            status=RateLimitStatus.ALLOWED,
+            limit=1,
+            remaining=0,
+            reset_time=4102444800,
+        )
+        use_case.rate_limiter.check_and_increment = AsyncMock()
+        use_case.rate_limiter.check_and_increment_many = AsyncMock(
+            return_value=[allowed]
+        )
+
+        result = await use_case.check("u1", cost=3, rule="login")
+
+        assert result == allowed
+        use_case.rate_limiter.check_and_increment.assert_not_called()
+        use_case.rate_limiter.check_and_increment_many.assert_called_once_with(
+            [("ad-hoc:login:u1", 3)]
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cost", [0, -1, 1001])
+    async def test_check_rejects_cost_out_of_range(self, use_case, cost):
+        use_case.rate_limiter.check_and_increment_many = AsyncMock()
+
+        with pytest.raises(ValueError):
+            await use_case.check("u1", cost=cost)
+
+        use_case.rate_limiter.check_and_increment_many.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unweighted_algorithm_only_counts_cost_one(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.SLIDING_WINDOW_LOG,
+        )
+
+        with pytest.raises(ValueError):
+            await use_case.check_and_increment_many([("u1", 2, None)])
+
+
+class TestRateLimitUseCaseAlgorithm:
+    def test_fixed_window_is_default(self):
+        use_case = RateLimitUseCase(AsyncMock(spec=RedisClient))
+        assert type(use_case.rate_limiter) is FixedWindowRateLimiter
+
+    def test_leasing_algorithm(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            limit=1000,
+            algorithm=RateLimitAlgorithm.LEASING,
+            lease_max_size=25,
+        )
+        assert isinstance(use_case.rate_limiter, LeasingRateLimiter)
+        assert use_case.rate_limiter.max_lease == 25
+
+    @pytest.mark.asyncio
+    async def test_close_delegates_to_rate_limiter(self):
+        use_case = RateLimitUseCase(AsyncMock(spec=RedisClient))
+        use_case.rate_limiter.close = AsyncMock()
+        await use_case.close()
+        use_case.rate_limiter.close.assert_awaited_once()
+
+    def test_sliding_window_log_algorithm(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.SLIDING_WINDOW_LOG,
+        )
+        assert isinstance(use_case.rate_limiter, SlidingWindowLogRateLimiter)
+
+    def test_sliding_window_counter_algorithm(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.SLIDING_WINDOW_COUNTER,
+        )
+        assert isinstance(
+            use_case.rate_limiter, SlidingWindowCounterRateLimiter
+        )
+
+    def test_token_bucket_algorithm(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.TOKEN_BUCKET,
+            capacity=20,
+            refill_rate=0.5,
+        )
+        assert isinstance(use_case.rate_limiter, TokenBucketRateLimiter)
+        assert use_case.rate_limiter.capacity == 20
+        assert use_case.rate_limiter.refill_rate == 0.5
+
+    def test_gcra_algorithm(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.GCRA,
+            burst=7,
+        )
+        assert isinstance(use_case.rate_limiter, GcraRateLimiter)
+        assert use_case.rate_limiter.burst == 7
+
+    def test_shaping_algorithm(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.SHAPING,
+            max_wait_ms=250,
+            max_queue=3,
+            max_waiters=10,
+        )
+        assert isinstance(use_case.rate_limiter, ShapingRateLimiter)
+        assert use_case.rate_limiter.max_wait_ms == 250
+        assert use_case.rate_limiter.max_queue == 3
+        assert use_case.rate_limiter.max_waiters == 10
+
+    def test_shaping_disables_near_cache(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            algorithm=RateLimitAlgorithm.SHAPING,
+            near_cache_size=100,
+        )
+        assert use_case.rejection_cache is None
+
+    def test_rules_create_composite_limiter(self):
+        rules = [
+            RateLimitConfig(limit=10, window=TimeWindow(1, TimeUnit.SECONDS)),
+            RateLimitConfig(limit=1000, window=TimeWindow(1, TimeUnit.HOURS)),
+        ]
+        use_case = RateLimitUseCase(AsyncMock(spec=RedisClient), rules=rules)
+        assert isinstance(use_case.rate_limiter, CompositeRateLimiter)
+        assert use_case.rate_limiter.rules == rules
+
+
+class TestRateLimitUseCaseCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_fallback_enforces_instance_share(self):
+        storage = AsyncMock(spec=RedisClient)
+        storage.increment.side_effect = ConnectionError()
+        use_case = RateLimitUseCase(
+            storage,
+            limit=10,
+            circuit_breaker=CircuitBreaker(),
+            instances=4,
+        )
+
+        results = [
+            await use_case.check_and_increment({}, "1.1.1.1") for _ in range(4)
+        ]
+
+        assert isinstance(use_case.rate_limiter, CircuitBreakerRateLimiter)
+        # Each of the 4 instances allows ceil(10 / 4) requests locally
+        assert [r.status for r in results] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+        ]
+        assert results[0].limit == 3
+
+    def test_fallback_shares_every_rule(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            rules=[
+                RateLimitConfig(10, TimeWindow(1, TimeUnit.SECONDS)),
+                RateLimitConfig(100, TimeWindow(1, TimeUnit.HOURS)),
+            ],
+            circuit_breaker=CircuitBreaker(),
+            instances=2,
+        )
+
+        fallback = use_case.rate_limiter.fallback
+        assert isinstance(fallback, CompositeRateLimiter)
+        assert [rule.limit for rule in fallback.rules] == [5, 50]
+
+
+class TestRateLimitUseCaseRuleSet:
+    @pytest.fixture
+    def use_case(self):
+        per_minute = TimeWindow(1, TimeUnit.MINUTES)
+        rule_set = RuleSet(
+            [
+                Rule(
+                    "login", (RateLimitConfig(2, per_minute),), path="/login"
+                ),
+                Rule(
+                    "search",
+                    (RateLimitConfig(2, per_minute),),
+                    path="/search",
+                    key="api_key",
+                ),
+                Rule(
+                    "pro",
+                    (
+                        RateLimitConfig(3, TimeWindow(1, TimeUnit.SECONDS)),
+                        RateLimitConfig(5, per_minute),
+                    ),
+                    tier="pro",
+                    key="api_key",
+                ),
+            ],
+            allowlist=["10.0.0.0/8"],
+            api_keys={"secret": "pro"},
+        )
+        return RateLimitUseCase(MemoryStorage(), limit=1, rule_set=rule_set)
+
+    @pytest.mark.asyncio
+    async def test_path_rule_has_its_own_limit(self, use_case):
+        results = [
+            await use_case.check_and_increment({}, "1.1.1.1", "/login/")
+            for _ in range(3)
+        ]
+
+        assert [r.limit for r in results] == [2, 2, 2]
+        assert results[-1].status == RateLimitStatus.REJECTED
+        # The default limit counts separately
+        default = await use_case.check_and_increment({}, "1.1.1.1", "/")
+        assert default.status == RateLimitStatus.ALLOWED
+        assert default.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_tier_rule_counts_per_api_key(self, use_case):
+        for address in ("1.1.1.1", "2.2.2.2", "3.3.3.3"):
+            result = await use_case.check_and_increment(
+                {"X-API-Key": "secret"}, address
+            )
+            assert result.status == RateLimitStatus.ALLOWED
+
+        result = await use_case.check_and_increment(
+            {"x-api-key": "secret"}, "4.4.4.4"
+        )
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert isinstance(use_case._rule_limiters["pro"], CompositeRateLimiter)
+
+    @pytest.mark.asyncio
+    async def test_unknown_api_keys_count_per_address(self, use_case):
+        results = [
+            await use_case.check_and_increment(
+                {"X-API-Key": f"made-up-{index}"}, "1.1.1.1", "/search"
+            )
+            for index in range(3)
+        ]
+
+        assert results[-1].status == RateLimitStatus.REJECTED
+        # A known key still gets a counter of its own
+        known = await use_case.check_and_increment(
+            {"X-API-Key": "secret"}, "1.1.1.1", "/search"
+        )
+        assert known.status == RateLimitStatus.ALLOWED
+
+    @pytest.mark.asyncio
+    async def test_check_request_names_the_rule(self, use_case):
+        rule, _ = await use_case.check_request({}, "1.1.1.1", "/login")
+        default, _ = await use_case.check_request({}, "1.1.1.1", "/")
+
+        assert rule == "login"
+        assert default is None
+
+    @pytest.mark.asyncio
+    async def test_named_rule_shares_the_rule_set_counter(self, use_case):
+        await use_case.check_and_increment({}, "1.1.1.1", "/login")
+        await use_case.check("1.1.1.1", rule="login")
+
+        result = await use_case.check("1.1.1.1", rule="login")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.limit == 2
+        # The default limiter never counted the rule's requests
+        default = await use_case.check_and_increment({}, "1.1.1.1", "/")
+        assert default.status == RateLimitStatus.ALLOWED
+
+    @pytest.mark.asyncio
+    async def test_allowlisted_addresses_skip_storage(self, use_case):
+        use_case.rate_limiter = AsyncMock()
+
+        results = [
+            await use_case.check_and_increment(
+                {"X-Forwarded-For": "10.1.2.3"}, "127.0.0.1"
+            )
+            for _ in range(5)
+        ]
+
+        assert all(r.status == RateLimitStatus.ALLOWED for r in results)
+        use_case.rate_limiter.check_and_increment.assert_not_called()
+
+
+class TestRateLimitUseCasePrefixes:
+    @pytest.mark.asyncio
+    async def test_aggregated_addresses_share_a_limit(self):
+        use_case = RateLimitUseCase(
+            MemoryStorage(), limit=2, prefix_aggregator=PrefixAggregator()
+        )
+
+        results = [
+            await use_case.check_and_increment({}, f"2001:db8::{host:x}")
+            for host in range(1, 4)
+        ]
+        batch = await use_case.check_and_increment_many(
+            [("2001:db8::99", 1, None), ("2001:db8::99", 1, "login")]
+        )
+
+        assert [r.status for r in results] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+        ]
+        assert batch[0].status == RateLimitStatus.REJECTED
+        # A rule gives the prefix its own counter
+        assert batch[1].status == RateLimitStatus.ALLOWED
+
+    @pytest.mark.asyncio
+    async def test_prefix_limit_bounds_rotating_addresses(self):
+        storage = MemoryStorage()
+        use_case = RateLimitUseCase(
+            storage,
+            limit=2,
+            prefix_aggregator=PrefixAggregator(),
+            prefix_limit=3,
+        )
+
+        results = [
+            await use_case.check(f"2001:db8::{host:x}") for host in range(1, 6)
+        ]
+        again = [await use_case.check("2001:db8:0:1::1") for _ in range(3)]
+
+        assert isinstance(use_case.rate_limiter, PrefixRateLimiter)
+        assert [r.status for r in results] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+            RateLimitStatus.REJECTED,
+        ]
+        # Another network has its own prefix counter, each host its own
+        assert [r.status for r in again] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+        ]
+        # Rejected addresses got no counter: 4 hosts and 2 prefixes
+        assert len(storage) == 6
+
+    def test_fallback_shares_the_prefix_limit(self):
+        use_case = RateLimitUseCase(
+            AsyncMock(spec=RedisClient),
+            limit=10,
+            prefix_aggregator=PrefixAggregator(),
+            prefix_limit=100,
+            circuit_breaker=CircuitBreaker(),
+            instances=2,
+        )
+
+        fallback = use_case.rate_limiter.fallback
+        assert isinstance(fallback, PrefixRateLimiter)
+        assert [rule.limit for rule in fallback.rules] == [5, 50]
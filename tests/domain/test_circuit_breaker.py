@@ -0,0 +1,242 @@
+import asyncio
+
+import pytest
+
+from domain import (
+    CircuitBreaker,
+    CircuitBreakerRateLimiter,
+    CircuitState,
+    RateLimitResult,
+    RateLimitStatus,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock, **kwargs) -> CircuitBreaker:
+    options = {
+        "failure_rate": 0.5,
+        "slow_call_ms": 100,
+        "window_size": 10,
+        "min_calls": 4,
+        "open_seconds": 5,
+        "half_open_calls": 2,
+    }
+    options.update(kwargs)
+    return CircuitBreaker(clock=clock, **options)
+
+
+class TestCircuitBreaker:
+    def test_invalid_failure_rate(self):
+        with pytest.raises(ValueError):
+            CircuitBreaker(failure_rate=0)
+
+    def test_stays_closed_below_min_calls(self):
+        breaker = make_breaker(FakeClock())
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow() is True
+
+    def test_opens_at_failure_rate(self):
+        breaker = make_breaker(FakeClock())
+        breaker.record_success(1)
+        breaker.record_success(1)
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.allow() is False
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = make_breaker(FakeClock())
+        for _ in range(4):
+            breaker.record_success(150)
+
+        assert breaker.state == CircuitState.OPEN
+
+    def test_old_outcomes_leave_the_window(self):
+        breaker = make_breaker(FakeClock(), window_size=4)
+        breaker.record_failure()
+        for _ in range(4):
+            breaker.record_success(1)
+        breaker.record_failure()
+
+        assert breaker.recent_failure_rate == 0.25
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_after_open_seconds(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock, min_calls=1)
+        breaker.record_failure()
+
+        clock.now += 5
+
+        assert breaker.state == CircuitState.HALF_OPEN
+        # Only half_open_calls probes go through
+        assert [breaker.allow() for _ in range(3)] == [True, True, False]
+
+    def test_closes_after_successful_probes(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock, min_calls=1)
+        breaker.record_failure()
+        clock.now += 5
+        breaker.allow()
+        breaker.allow()
+
+        breaker.record_success(1)
+        breaker.record_success(1)
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.recent_failure_rate == 0.0
+
+    def test_reopens_on_failed_probe(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock, min_calls=1)
+        breaker.record_failure()
+        clock.now += 5
+        breaker.allow()
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        clock.now += 4
+        assert breaker.allow() is False
+
+
+def make_result(limit: int) -> RateLimitResult:
+    return RateLimitResult(
+        status=RateLimitStatus.ALLOWED,
+        limit=limit,
+        remaining=limit - 1,
+        reset_time=1000,
+    )
+
+
+@pytest.mark.asyncio
+class TestCircuitBreakerRateLimiter:
+    async def test_uses_primary_while_closed(self, mocker):
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.return_value = make_result(100)
+        fallback = mocker.AsyncMock()
+        limiter = CircuitBreakerRateLimiter(
+            primary, fallback, make_breaker(FakeClock())
+        )
+
+        result = await limiter.check_and_increment("1.1.1.1")
+
+        assert result.limit == 100
+        fallback.check_and_increment.assert_not_called()
+
+    async def test_falls_back_on_error(self, mocker):
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.side_effect = ConnectionError()
+        fallback = mocker.AsyncMock()
+        fallback.check_and_increment.return_value = make_result(25)
+        breaker = make_breaker(FakeClock())
+        limiter = CircuitBreakerRateLimiter(primary, fallback, breaker)
+
+        result = await limiter.check_and_increment("1.1.1.1")
+
+        assert result.limit == 25
+        assert breaker.recent_failure_rate == 1.0
+
+    async def test_other_errors_propagate(self, mocker):
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.side_effect = ValueError()
+        fallback = mocker.AsyncMock()
+        limiter = CircuitBreakerRateLimiter(
+            primary, fallback, make_breaker(FakeClock())
+        )
+
+        with pytest.raises(ValueError):
+            await limiter.check_and_increment("1.1.1.1")
+        fallback.check_and_increment.assert_not_called()
+
+    async def test_timeout_errors_fall_back(self, mocker):
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.side_effect = TimeoutError()
+        fallback = mocker.AsyncMock()
+        fallback.check_and_increment.return_value = make_result(25)
+        breaker = make_breaker(FakeClock())
+        limiter = CircuitBreakerRateLimiter(primary, fallback, breaker)
+
+        result = await limiter.check_and_increment("1.1.1.1")
+
+        assert result.limit == 25
+        assert breaker.recent_failure_rate == 1.0
+
+    async def test_slow_primary_counts_once_as_failure(self, mocker):
+        async def slow(identifier):
+            await asyncio.sleep(0.02)
+            return make_result(100)
+
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.side_effect = slow
+        fallback = mocker.AsyncMock()
+        breaker = make_breaker(FakeClock(), slow_call_ms=10)
+        limiter = CircuitBreakerRateLimiter(primary, fallback, breaker)
+
+        result = await limiter.check_and_increment("1.1.1.1")
+
+        # The primary's answer stands; the fallback does not count again
+        assert result.limit == 100
+        fallback.check_and_increment.assert_not_called()
+        assert breaker.recent_failure_rate == 1.0
+
+    async def test_slow_probe_reopens_the_breaker(self, mocker):
+        async def slow(identifier):
+            await asyncio.sleep(0.02)
+            return make_result(100)
+
+        clock = FakeClock()
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.side_effect = slow
+        fallback = mocker.AsyncMock()
+        breaker = make_breaker(clock, slow_call_ms=10, min_calls=1)
+        breaker.record_failure()
+        clock.now += 5
+        limiter = CircuitBreakerRateLimiter(primary, fallback, breaker)
+
+        result = await limiter.check_and_increment("1.1.1.1")
+
+        assert result.limit == 100
+        assert breaker.state == CircuitState.OPEN
+
+    async def test_skips_primary_while_open(self, mocker):
+        primary = mocker.AsyncMock()
+        primary.check_and_increment.side_effect = ConnectionError()
+        fallback = mocker.AsyncMock()
+        fallback.check_and_increment_many.return_value = [make_result(25)]
+        breaker = make_breaker(FakeClock())
+        limiter = CircuitBreakerRateLimiter(primary, fallback, breaker)
+        for _ in range(4):
+            await limiter.check_and_increment("1.1.1.1")
+        assert breaker.state == CircuitState.OPEN
+        primary.reset_mock()
+
+        results = await limiter.check_and_increment_many([("1.1.1.1", 1)])
+
+        assert results[0].limit == 25
+        primary.check_and_increment_many.assert_not_called()
+
+    async def test_close_closes_both(self, mocker):
+        primary = mocker.AsyncMock()
+        fallback = mocker.AsyncMock()
+        limiter = CircuitBreakerRateLimiter(
+            primary, fallback, make_breaker(FakeClock())
+        )
+
+        await limiter.close()
+
+        primary.close.assert_awaited_once()
+        fallback.close.assert_awaited_once()
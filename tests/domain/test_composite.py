@@ -0,0 +1,115 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain import (
+    CompositeRateLimiter,
+    MultiWindowStorage,
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+def rule(limit, duration, unit):
+    return RateLimitConfig(
+        limit=limit, window=TimeWindow(duration=duration, unit=unit)
+    )
+
+
+class TestCompositeRateLimiter:
+    @pytest.fixture
+    def mock_storage(self):
+        return AsyncMock(spec=MultiWindowStorage)
+
+    @pytest.fixture
+    def limiter(self, mock_storage):
+        return CompositeRateLimiter(
+            [rule(10, 1, TimeUnit.SECONDS), rule(1000, 1, TimeUnit.HOURS)],
+            mock_storage,
+        )
+
+    def test_requires_rules(self, mock_storage):
+        with pytest.raises(ValueError):
+            CompositeRateLimiter([], mock_storage)
+
+    def test_rejects_rules_sharing_a_window(self, mock_storage):
+        with pytest.raises(ValueError):
+            CompositeRateLimiter(
+                [
+                    rule(10, 60, TimeUnit.SECONDS),
+                    rule(20, 1, TimeUnit.MINUTES),
+                ],
+                mock_storage,
+            )
+
+    def test_keys_include_window_length(self, limiter):
+        # Both windows start at the top of the hour but need own counters
+        keys, limits, ttls, cost = limiter._call(
+            "1.2.3.4", 1, limiter._windows(7200)
+        )
+        assert keys == [
+            "rate_limit:{1.2.3.4}:1:7200",
+            "rate_limit:{1.2.3.4}:3600:7200",
+        ]
+        assert limits == [10, 1000]
+        assert ttls == [1, 3600]
+        assert cost == 1
+
+    @pytest.mark.asyncio
+    async def test_allowed_reports_most_restrictive_rule(
+        self, limiter, mock_storage
+    ):
+        mock_storage.increment_all.return_value = (True, [3, 995])
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.limit == 1000
+        assert result.remaining == 5
+        mock_storage.increment_all.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_rejected_reports_failing_rule(
+        self, limiter, mock_storage, mocker
+    ):
+        mocker.patch("domain.composite.time.time", return_value=7210.5)
+        mock_storage.increment_all.return_value = (False, [10, 500])
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.limit == 10
+        assert result.remaining == 0
+        assert result.reset_time == 7211
+
+    @pytest.mark.asyncio
+    async def test_tie_reports_latest_reset(self, limiter, mock_storage):
+        mock_storage.increment_all.return_value = (False, [10, 1000])
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        # Both rules are exhausted; the request waits for the hour
+        assert result.limit == 1000
+        assert result.reset_time % 3600 == 0
+
+    @pytest.mark.asyncio
+    async def test_check_and_increment_many_uses_one_call(
+        self, limiter, mock_storage
+    ):
+        mock_storage.increment_all_many.return_value = [
+            (True, [2, 2]),
+            (False, [8, 8]),
+        ]
+
+        results = await limiter.check_and_increment_many([("a", 2), ("b", 3)])
+
+        calls = mock_storage.increment_all_many.call_args.args[0]
+        assert [cost for *_, cost in calls] == [2, 3]
+        assert [r.status for r in results] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+        ]
+        # 8 + 3 exceeds only the per-second rule
+        assert (results[1].limit, results[1].remaining) == (10, 2)
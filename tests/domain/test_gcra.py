@@ -0,0 +1,77 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain import (
+    GcraRateLimiter,
+    GcraStorage,
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+class TestGcraRateLimiter:
+    @pytest.fixture
+    def mock_storage(self):
+        return AsyncMock(spec=GcraStorage)
+
+    def make_limiter(self, storage, **kwargs):
+        config = RateLimitConfig(
+            limit=100,
+            window=TimeWindow(duration=1, unit=TimeUnit.SECONDS),
+            **kwargs,
+        )
+        return GcraRateLimiter(config, storage)
+
+    def test_emission_interval_and_tolerance(self, mock_storage):
+        limiter = self.make_limiter(mock_storage, burst=5)
+        assert limiter.emission_interval_us == 10_000  # 100 per second
+        assert limiter.tolerance_us == 50_000
+        assert limiter.burst == 5
+
+    def test_burst_defaults_to_limit(self, mock_storage):
+        limiter = self.make_limiter(mock_storage)
+        assert limiter.burst == 100
+
+    def test_key_generation(self, mock_storage):
+        limiter = self.make_limiter(mock_storage)
+        assert limiter._get_key("1.2.3.4") == "rate_limit_gcra:{1.2.3.4}"
+
+    @pytest.mark.asyncio
+    async def test_allowed(self, mock_storage):
+        mock_storage.update_tat.return_value = (True, 4, 0, 1_000_000_010)
+        limiter = self.make_limiter(mock_storage, burst=5)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.limit == 5
+        assert result.remaining == 4
+        assert result.reset_time == 1_000_001
+        mock_storage.update_tat.assert_called_once_with(
+            "rate_limit_gcra:{1.2.3.4}", 10_000, 50_000, 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_batch_counts_each_cost_at_once(self, mock_storage):
+        mock_storage.update_tat.return_value = (True, 1, 0, 1_000_000_040)
+        limiter = self.make_limiter(mock_storage, burst=5)
+
+        await limiter.check_and_increment_many([("1.2.3.4", 3)])
+
+        mock_storage.update_tat.assert_called_once_with(
+            "rate_limit_gcra:{1.2.3.4}", 10_000, 50_000, 3
+        )
+
+    @pytest.mark.asyncio
+    async def test_rejected(self, mock_storage):
+        mock_storage.update_tat.return_value = (False, 0, 7, 1_000_000_050)
+        limiter = self.make_limiter(mock_storage, burst=5)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.remaining == 0
+        assert result.retry_after_ms == 7
@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+from domain import BlockCache, HeavyHitterTracker, SpaceSaving
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSpaceSaving:
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            SpaceSaving(0)
+
+    def test_counts_exactly_below_capacity(self):
+        sketch = SpaceSaving(3)
+        for item in "abacab":
+            sketch.add(item)
+
+        assert sketch.top(3) == [("a", 3), ("b", 2), ("c", 1)]
+
+    def test_new_item_replaces_the_minimum(self):
+        sketch = SpaceSaving(2)
+        sketch.add("a", 5)
+        sketch.add("b", 2)
+
+        sketch.add("c")
+
+        # "c" inherits the count of the evicted "b"
+        assert sketch.top(2) == [("a", 5), ("c", 3)]
+        assert len(sketch) == 2
+
+    def test_keeps_frequent_items_in_a_long_stream(self):
+        rng = random.Random(1)
+        sketch = SpaceSaving(50)
+        heavy = {f"heavy-{i}": 0 for i in range(5)}
+        for _ in range(20000):
+            if rng.random() < 0.3:
+                item = rng.choice(list(heavy))
+                heavy[item] += 1
+            else:
+                item = f"noise-{rng.randrange(100000)}"
+            sketch.add(item)
+
+        top = dict(sketch.top(5))
+        assert set(top) == set(heavy)
+        for item, count in heavy.items():
+            # Counts never underestimate
+            assert count <= top[item]
+
+    def test_drain_starts_over(self):
+        sketch = SpaceSaving(2)
+        sketch.add("a")
+
+        assert sketch.drain() == {"a": 1}
+        assert len(sketch) == 0
+        assert sketch.top(1) == []
+
+
+class TestBlockCache:
+    def test_blocks_until_expiry(self):
+        cache = BlockCache()
+        cache.block("1.1.1.1", until=1010)
+
+        assert cache.get("1.1.1.1", now=1005) == 1010
+        assert cache.get("1.1.1.1", now=1010) is None
+        assert len(cache) == 0
+
+    def test_evicts_the_soonest_to_end(self):
+        cache = BlockCache(max_size=2)
+        cache.block("a", until=1030)
+        cache.block("b", until=1010)
+        cache.block("c", until=1020)
+
+        assert cache.entries(now=1000) == {"a": 1030, "c": 1020}
+
+    def test_unblock(self):
+        cache = BlockCache()
+        cache.block("a", until=1030)
+
+        assert cache.unblock("a") is True
+        assert cache.unblock("a") is False
+
+
+@pytest.mark.asyncio
+class TestHeavyHitterTracker:
+    async def test_sync_merges_counts_of_the_window(self, mocker):
+        storage = mocker.AsyncMock()
+        storage.merge_top.return_value = [("a", 7)]
+        tracker = HeavyHitterTracker(
+            storage, capacity=10, top=2, window_seconds=60, clock=FakeClock()
+        )
+        tracker.record("a")
+        tracker.record("a")
+
+        assert await tracker.sync() == [("a", 7)]
+        assert tracker.top == [("a", 7)]
+        # 1000 s is window 16; both windows share one hash tag
+        storage.merge_top.assert_awaited_once_with(
+            "rate_limit:heavy_hitters:{top}:16",
+            "rate_limit:heavy_hitters:{top}:15",
+            {"a": 2},
+            ttl=120,
+            capacity=10,
+            top=2,
+        )
+
+    async def test_sync_sends_only_new_counts(self, mocker):
+        storage = mocker.AsyncMock()
+        storage.merge_top.return_value = []
+        tracker = HeavyHitterTracker(storage, clock=FakeClock())
+        tracker.record("a")
+        await tracker.sync()
+
+        await tracker.sync()
+
+        assert storage.merge_top.await_args.args[2] == {}
+
+    async def test_ranks_local_counts_when_storage_fails(self, mocker):
+        storage = mocker.AsyncMock()
+        storage.merge_top.side_effect = ConnectionError()
+        tracker = HeavyHitterTracker(storage, top=1, clock=FakeClock())
+        tracker.record("a")
+        tracker.record("b")
+        tracker.record("b")
+
+        assert await tracker.sync() == [("b", 2)]
+
+    async def test_promotes_heavy_hitters_into_block_cache(self, mocker):
+        clock = FakeClock()
+        storage = mocker.AsyncMock()
+        storage.merge_top.return_value = [("a", 3), ("b", 1)]
+        tracker = HeavyHitterTracker(
+            storage, block_threshold=3, block_seconds=30, clock=clock
+        )
+
+        await tracker.sync()
+
+        assert tracker.block_cache.entries(now=clock.now) == {"a": 1030}
+
+    async def test_block_by_hand(self, mocker):
+        clock = FakeClock()
+        tracker = HeavyHitterTracker(
+            mocker.AsyncMock(), block_seconds=30, clock=clock
+        )
+
+        assert tracker.block("a") == 1030
+        assert tracker.block("b", seconds=5) == 1005
+        assert tracker.unblock("a") is True
+        assert tracker.block_cache.entries(now=clock.now) == {"b": 1005}
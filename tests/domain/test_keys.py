@@ -0,0 +1,100 @@
+import struct
+from unittest.mock import AsyncMock
+
+import pytest
+from redis.crc import key_slot
+
+from domain import (
+    BinaryKeyEncoder,
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+def tag(key: bytes) -> bytes:
+    """Return the part of a key Redis Cluster hashes."""
+    start = key.index(b"{")
+    return key[start + 1 : key.index(b"}", start + 1)]
+
+
+class TestBinaryKeyEncoder:
+    def test_packs_ipv4(self):
+        key = BinaryKeyEncoder()("192.168.1.7", 1700000040)
+
+        assert key == (
+            b"rl\x02{\x04\xc0\xa8\x01\x07}" + struct.pack(">I", 1700000040)
+        )
+
+    def test_packs_ipv6_to_16_bytes(self):
+        address = "2001:0db8:85a3:0000:0000:8a2e:0370:7334"
+
+        key = BinaryKeyEncoder()(address, 1700000040)
+
+        assert len(key) == 26
+        assert len(f"rate_limit:{{{address}}}:1700000040") == 63
+        # Every spelling of an address shares its counter
+        assert key == BinaryKeyEncoder()(
+            "2001:db8:85a3::8a2e:370:7334", 1700000040
+        )
+
+    def test_other_identifiers_stay_utf8(self):
+        encoder = BinaryKeyEncoder()
+
+        key = encoder("api-key-é", 0)
+
+        assert key == b"rl\x02{\x00" + "api-key-é".encode() + b"}\0\0\0\0"
+        # The kind byte keeps text apart from packed addresses
+        assert encoder("\x7f\x00\x00\x01", 0) != encoder("127.0.0.1", 0)
+
+    def test_version_byte_follows_the_prefix(self):
+        key = BinaryKeyEncoder(prefix=b"app")("10.0.0.1", 0)
+
+        assert key.startswith(b"app" + bytes((BinaryKeyEncoder.VERSION,)))
+
+    def test_keys_of_an_identifier_share_a_cluster_slot(self):
+        encoder = BinaryKeyEncoder()
+        # 125 is "}", which is escaped so it cannot end the hash tag
+        address = "10.125.0.1"
+
+        current = encoder(address, 1700000040)
+        previous = encoder(address, 1699999980)
+
+        assert current != previous
+        assert tag(current) == tag(previous) == b"\x04\x0a\\]\x00\x01"
+
+    def test_addresses_starting_with_125_spread_over_slots(self):
+        encoder = BinaryKeyEncoder()
+
+        slots = {key_slot(encoder(f"125.0.0.{host}", 0)) for host in range(16)}
+
+        assert len(slots) == 16
+
+    def test_escaping_keeps_keys_distinct(self):
+        encoder = BinaryKeyEncoder()
+
+        keys = {encoder(text, 0) for text in ["a}", "a\\]", "a\\}", "a]"]}
+
+        assert len(keys) == 4
+        # The tag spans the whole identifier, up to the window start
+        assert all(tag(key) == key[4:-5] for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_fixed_window_rate_limiter_uses_key_encoder():
+    storage = AsyncMock()
+    storage.increment.return_value = 1
+    limiter = FixedWindowRateLimiter(
+        RateLimitConfig(limit=10, window=TimeWindow(1, TimeUnit.MINUTES)),
+        storage,
+        BinaryKeyEncoder(),
+    )
+
+    await limiter.check_and_increment("10.0.0.1")
+
+    key, ttl = storage.increment.await_args.args
+    assert key.startswith(b"rl\x02{\x04\x0a\x00\x00\x01}")
+    # The window start follows as a 4-byte integer
+    assert int.from_bytes(key[-4:]) % 60 == 0
+    assert ttl == 60
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from domain import (
+    LeasingRateLimiter,
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+class SharedQuotaStorage:
+    """In-memory QuotaLeaseStorage shared by several limiter instances."""
+
+    def __init__(self):
+        self.used: dict[str, int] = {}
+        self.reserve_calls = 0
+
+    async def reserve(self, key, amount, limit, ttl):
+        self.reserve_calls += 1
+        await asyncio.sleep(0)  # let other instances interleave
+        used = self.used.get(key, 0)
+        granted = max(0, min(amount, limit - used))
+        self.used[key] = used + granted
+        return granted, self.used[key]
+
+    async def release(self, key, amount):
+        self.used[key] = max(0, self.used.get(key, 0) - amount)
+
+
+@pytest.fixture
+def frozen_time(mocker):
+    clock = mocker.patch("domain.leasing.time.time")
+    clock.return_value = 1_000_020.0
+    return clock
+
+
+def make_limiter(storage, limit=100, **kwargs):
+    config = RateLimitConfig(
+        limit=limit, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+    )
+    return LeasingRateLimiter(config, storage, **kwargs)
+
+
+class TestLeasingRateLimiter:
+    def test_default_max_lease(self):
+        limiter = make_limiter(SharedQuotaStorage(), limit=10000)
+        assert limiter.max_lease == 500
+
+    @pytest.mark.asyncio
+    async def test_allows_up_to_limit(self, frozen_time):
+        storage = SharedQuotaStorage()
+        limiter = make_limiter(storage, limit=10)
+
+        results = [await limiter.check_and_increment("k") for _ in range(12)]
+
+        statuses = [r.status for r in results]
+        assert statuses.count(RateLimitStatus.ALLOWED) == 10
+        assert statuses[-2:] == [RateLimitStatus.REJECTED] * 2
+        assert results[-1].remaining == 0
+
+    @pytest.mark.asyncio
+    async def test_leases_reduce_storage_calls(self, frozen_time):
+        storage = SharedQuotaStorage()
+        limiter = make_limiter(storage, limit=10000, max_lease=100)
+
+        for _ in range(1000):
+            await limiter.check_and_increment("k")
+
+        assert storage.reserve_calls < 100
+
+    @pytest.mark.asyncio
+    async def test_lease_size_adapts_to_rate(self, frozen_time):
+        storage = SharedQuotaStorage()
+        limiter = make_limiter(storage, limit=10000, max_lease=200)
+
+        for _ in range(50):
+            await limiter.check_and_increment("hot")
+        await limiter.check_and_increment("cold")
+
+        assert limiter._leases["hot"].lease_size > 1
+        assert limiter._leases["cold"].lease_size == 1
+
+    @pytest.mark.asyncio
+    async def test_cluster_never_overshoots_limit(self, frozen_time):
+        storage = SharedQuotaStorage()
+        instances = [
+            make_limiter(storage, limit=1000, max_lease=50) for _ in range(5)
+        ]
+
+        results = await asyncio.gather(
+            *(
+                instances[i % len(instances)].check_and_increment("k")
+                for i in range(3000)
+            )
+        )
+
+        allowed = sum(r.status == RateLimitStatus.ALLOWED for r in results)
+        # Storage never grants beyond the limit, so the cluster cannot
+        # overshoot; at most one lease per instance can be stranded
+        assert allowed <= 1000
+        assert allowed >= 1000 - len(instances) * 50
+
+    @pytest.mark.asyncio
+    async def test_close_returns_unused_quota(self, frozen_time):
+        storage = SharedQuotaStorage()
+        limiter = make_limiter(storage, limit=1000, min_lease=20)
+
+        await limiter.check_and_increment("k")
+        key = limiter._get_key("k", limiter._get_window_start(1_000_020))
+        assert storage.used[key] >= 20
+
+        await limiter.close()
+
+        assert storage.used[key] == 1
+
+    @pytest.mark.asyncio
+    async def test_window_rollover_starts_fresh_lease(self, frozen_time):
+        storage = SharedQuotaStorage()
+        limiter = make_limiter(storage, limit=2)
+
+        for _ in range(3):
+            await limiter.check_and_increment("k")
+        frozen_time.return_value += 60
+
+        result = await limiter.check_and_increment("k")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert (
+            result.reset_time
+            == limiter._get_window_start(int(frozen_time.return_value)) + 60
+        )
@@ -0,0 +1,79 @@
+import pytest
+
+from domain import RateLimitResult, RateLimitStatus, RejectionCache
+
+
+def make_result(status=RateLimitStatus.REJECTED, reset_time=2000):
+    return RateLimitResult(
+        status=status, limit=10, remaining=0, reset_time=reset_time
+    )
+
+
+class TestRejectionCache:
+    def test_invalid_max_size(self):
+        with pytest.raises(ValueError):
+            RejectionCache(max_size=0)
+
+    def test_miss_on_empty_cache(self):
+        cache = RejectionCache()
+        assert cache.get("1.1.1.1", now=1000) is None
+        assert cache.misses == 1
+        assert cache.hits == 0
+
+    def test_hit_before_reset_time(self):
+        cache = RejectionCache()
+        result = make_result(reset_time=2000)
+        cache.put("1.1.1.1", result)
+
+        assert cache.get("1.1.1.1", now=1999) is result
+        assert cache.hits == 1
+        assert cache.misses == 0
+
+    def test_expires_at_reset_time(self):
+        cache = RejectionCache()
+        cache.put("1.1.1.1", make_result(reset_time=2000))
+
+        assert cache.get("1.1.1.1", now=2000) is None
+        assert cache.misses == 1
+        assert len(cache) == 0
+
+    def test_expires_after_retry_after_ms(self):
+        cache = RejectionCache()
+        result = RateLimitResult(
+            status=RateLimitStatus.REJECTED,
+            limit=10,
+            remaining=0,
+            reset_time=2000,
+            retry_after_ms=500,
+        )
+        cache.put("1.1.1.1", result, now=1000)
+
+        assert cache.get("1.1.1.1", now=1000.4) is result
+        assert cache.get("1.1.1.1", now=1000.5) is None
+        assert len(cache) == 0
+
+    def test_allowed_results_are_not_cached(self):
+        cache = RejectionCache()
+        cache.put("1.1.1.1", make_result(status=RateLimitStatus.ALLOWED))
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = RejectionCache(max_size=2)
+        cache.put("a", make_result())
+        cache.put("b", make_result())
+        cache.get("a", now=1000)  # "a" becomes most recently used
+        cache.put("c", make_result())
+
+        assert len(cache) == 2
+        assert cache.get("b", now=1000) is None
+        assert cache.get("a", now=1000) is not None
+        assert cache.get("c", now=1000) is not None
+
+    def test_clear(self):
+        cache = RejectionCache()
+        cache.put("a", make_result())
+        cache.get("a", now=1000)
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 0
+        assert cache.misses == 0
@@ -0,0 +1,118 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain import (
+    MultiWindowStorage,
+    PrefixAggregator,
+    PrefixRateLimiter,
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+class TestPrefixAggregator:
+    def test_cuts_addresses_to_their_prefix(self):
+        aggregate = PrefixAggregator()
+
+        assert aggregate("203.0.113.7") == "203.0.113.0/24"
+        assert aggregate("2001:db8:1:2:aaaa::5") == "2001:db8:1:2::/64"
+        # Every spelling of an address maps to the same prefix
+        assert aggregate("2001:0db8:0001:0002::1") == "2001:db8:1:2::/64"
+
+    def test_full_length_keeps_addresses(self):
+        aggregate = PrefixAggregator(ipv4_prefix=32, ipv6_prefix=48)
+
+        assert aggregate("203.0.113.7") == "203.0.113.7"
+        assert aggregate("2001:db8:1:2::5") == "2001:db8:1::/48"
+
+    def test_keeps_identifiers_that_are_not_addresses(self):
+        aggregate = PrefixAggregator()
+
+        assert aggregate("api-key-1") == "api-key-1"
+        assert aggregate("login:203.0.113.7") == "login:203.0.113.7"
+
+    @pytest.mark.parametrize("lengths", [(33, 64), (24, 129), (-1, 64)])
+    def test_rejects_invalid_lengths(self, lengths):
+        with pytest.raises(ValueError):
+            PrefixAggregator(*lengths)
+
+
+class TestPrefixRateLimiter:
+    @pytest.fixture
+    def mock_storage(self):
+        return AsyncMock(spec=MultiWindowStorage)
+
+    @pytest.fixture
+    def limiter(self, mock_storage):
+        return PrefixRateLimiter(
+            RateLimitConfig(
+                limit=2, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+            ),
+            prefix_limit=3,
+            storage=mock_storage,
+            aggregator=PrefixAggregator(),
+        )
+
+    def test_counters_share_the_prefix_hash_tag(self, limiter):
+        keys, limits, ttls, _ = limiter._call(
+            "203.0.113.7", 1, limiter._windows(1700000040)
+        )
+
+        assert keys == [
+            "rate_limit:{203.0.113.0/24}:203.0.113.7:1700000040",
+            "rate_limit:{203.0.113.0/24}:1700000040",
+        ]
+        assert limits == [2, 3]
+        assert ttls == [60, 60]
+
+    def test_other_identifiers_get_the_host_counter_only(self, limiter):
+        keys, limits, _, _ = limiter._call(
+            "api-key-1", 1, limiter._windows(1700000040)
+        )
+
+        # The key a FixedWindowRateLimiter would use
+        assert keys == ["rate_limit:{api-key-1}:1700000040"]
+        assert limits == [2]
+
+    def test_prefix_identifiers_do_not_reach_the_network_counter(
+        self, limiter
+    ):
+        network_keys, _, _, _ = limiter._call(
+            "203.0.113.7", 1, limiter._windows(1700000040)
+        )
+
+        keys, limits, _, _ = limiter._call(
+            "203.0.113.0/24", 1, limiter._windows(1700000040)
+        )
+
+        assert keys == [
+            "rate_limit:{203.0.113.0/24}:203.0.113.0/24:1700000040"
+        ]
+        assert keys[0] not in network_keys
+        assert limits == [2]
+
+    @pytest.mark.asyncio
+    async def test_reports_the_prefix_limit_when_it_rejects(
+        self, limiter, mock_storage
+    ):
+        mock_storage.increment_all.return_value = (False, [1, 3])
+
+        result = await limiter.check_and_increment("203.0.113.7")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.limit == 3
+        assert result.remaining == 0
+
+    @pytest.mark.asyncio
+    async def test_allowed_result_uses_the_tighter_counter(
+        self, limiter, mock_storage
+    ):
+        mock_storage.increment_all.return_value = (True, [1, 3])
+
+        result = await limiter.check_and_increment("203.0.113.7")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.remaining == 0
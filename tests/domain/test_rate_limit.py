@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, Mock
 from domain import (
     FixedWindowRateLimiter,
     RateLimitConfig,
+    RateLimiter,
     RateLimitResult,
     RateLimitStatus,
     RateLimitStorage,
@@ -48,6 +49,11 @@ class TestTimeWindow:
         assert window1 == window2
         assert window1 != window3
 
+    def test_seconds(self):
+        assert TimeWindow(duration=30, unit=TimeUnit.SECONDS).seconds == 30
+        assert TimeWindow(duration=5, unit=TimeUnit.MINUTES).seconds == 300
+        assert TimeWindow(duration=2, unit=TimeUnit.HOURS).seconds == 7200
+
 
 class TestRateLimitResult:
     def test_creation_allowed(self):
@@ -166,7 +172,7 @@ class TestFixedWindowRateLimiter:
 
     def test_key_generation(self, limiter):
         key = limiter._get_key("192.168.1.1", 900)
-        assert key == "rate_limit:192.168.1.1:900"
+        assert key == "rate_limit:{192.168.1.1}:900"
 
     @pytest.mark.asyncio
     async def test_check_and_increment_allowed(self, limiter, mock_storage):
@@ -212,4 +218,59 @@ class TestFixedWindowRateLimiter:
 
         assert result.status == RateLimitStatus.REJECTED
         assert result.limit == 100
-        assert result.remaining == 0  # max(0, 100 - 150) = 0
\ No newline at end of file
+        assert result.remaining == 0  # max(0, 100 - 150) = 0
+
+    @pytest.mark.asyncio
+    async def test_check_and_increment_many_uses_one_call(
+        self, limiter, mock_storage
+    ):
+        mock_storage.increment_many.return_value = [1, 100, 103]
+
+        results = await limiter.check_and_increment_many(
+            [("192.168.1.1", 1), ("api-key", 1), ("tenant", 5)]
+        )
+
+        mock_storage.increment_many.assert_called_once()
+        mock_storage.increment.assert_not_called()
+        items = mock_storage.increment_many.call_args.args[0]
+        assert [(ttl, cost) for _, ttl, cost in items] == [
+            (300, 1),
+            (300, 1),
+            (300, 5),
+        ]
+        assert items[0][0].startswith("rate_limit:{192.168.1.1}:")
+        assert [r.status for r in results] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+        ]
+        assert [r.remaining for r in results] == [99, 0, 0]
+
+
+class TestRateLimiterDefaultBatch:
+    @pytest.mark.asyncio
+    async def test_items_are_checked_one_by_one(self):
+        class CountingLimiter(RateLimiter):
+            def __init__(self):
+                self.calls = []
+
+            async def check_and_increment(self, identifier):
+                self.calls.append(identifier)
+                return RateLimitResult(
+                    status=RateLimitStatus.ALLOWED,
+                    limit=10,
+                    remaining=10 - len(self.calls),
+                    reset_time=0,
+                )
+
+        limiter = CountingLimiter()
+
+        results = await limiter.check_and_increment_many([("a", 1), ("b", 1)])
+
+        assert limiter.calls == ["a", "b"]
+        assert [r.remaining for r in results] == [9, 8]
+        # Without a weighted storage operation, a cost is refused
+        # before any item is checked
+        with pytest.raises(ValueError):
+            await limiter.check_and_increment_many([("c", 1), ("d", 3)])
+        assert limiter.calls == ["a", "b"]
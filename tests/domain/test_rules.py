@@ -0,0 +1,125 @@
+import pytest
+
+from domain import (
+    CidrTree,
+    PathTrie,
+    RateLimitConfig,
+    Rule,
+    RuleSet,
+    TimeUnit,
+    TimeWindow,
+)
+
+PER_MINUTE = (
+    RateLimitConfig(
+        limit=10, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+    ),
+)
+
+
+class TestPathTrie:
+    def test_matches_longest_prefix_by_segment(self):
+        trie = PathTrie()
+        trie.insert("/api", "api")
+        trie.insert("/api/users/", "users")
+
+        assert trie.match("/api") == "api"
+        assert trie.match("/api/orders/7") == "api"
+        assert trie.match("/api/users/7") == "users"
+        assert trie.match("/apiary") is None
+        assert trie.match("/") is None
+
+    def test_root_prefix_matches_every_path(self):
+        trie = PathTrie()
+        trie.insert("/", "root")
+
+        assert trie.match("/anything/else") == "root"
+
+
+class TestCidrTree:
+    def test_matches_most_specific_network(self):
+        tree = CidrTree()
+        tree.insert("10.0.0.0/8", "wide")
+        tree.insert("10.1.0.0/16", "narrow")
+        tree.insert("2001:db8::/32", "v6")
+
+        assert tree.match("10.1.2.3") == "narrow"
+        assert tree.match("10.2.0.1") == "wide"
+        assert tree.match("11.0.0.1") is None
+        assert tree.match("2001:db8::1") == "v6"
+        assert tree.match("2001:db9::1") is None
+
+    def test_host_route_and_default_route(self):
+        tree = CidrTree()
+        tree.insert("0.0.0.0/0", "any")
+        tree.insert("192.0.2.1/32", "host")
+
+        assert tree.match("192.0.2.1") == "host"
+        assert tree.match("192.0.2.2") == "any"
+        # The IPv4 default route does not cover IPv6
+        assert tree.match("::1") is None
+
+    def test_ignores_identifiers_that_are_not_addresses(self):
+        tree = CidrTree()
+        tree.insert("0.0.0.0/0", "any")
+
+        assert tree.match("client-42") is None
+
+    def test_rejects_invalid_network(self):
+        with pytest.raises(ValueError):
+            CidrTree().insert("10.0.0.0/33", "bad")
+
+
+class TestRuleSet:
+    @pytest.fixture
+    def rule_set(self):
+        return RuleSet(
+            [
+                Rule("login", PER_MINUTE, path="/login"),
+                Rule("pro", PER_MINUTE, tier="pro", key="api_key"),
+                Rule("office", PER_MINUTE, network="10.0.0.0/8"),
+            ],
+            allowlist=["192.0.2.0/24"],
+            api_keys={"secret": "pro"},
+        )
+
+    def test_path_takes_precedence_over_tier_and_network(self, rule_set):
+        rule = rule_set.match("/login", "10.0.0.1", "secret")
+
+        assert rule.name == "login"
+
+    def test_tier_takes_precedence_over_network(self, rule_set):
+        assert rule_set.match("/", "10.0.0.1", "secret").name == "pro"
+        assert rule_set.match("/", "10.0.0.1", "unknown").name == "office"
+
+    def test_no_rule_matches(self, rule_set):
+        assert rule_set.match("/home", "198.51.100.1") is None
+
+    def test_allowlist(self, rule_set):
+        assert rule_set.is_allowlisted("192.0.2.200")
+        assert not rule_set.is_allowlisted("10.0.0.1")
+
+    @pytest.mark.parametrize(
+        "rules",
+        [
+            [Rule("both", PER_MINUTE, path="/a", tier="pro")],
+            [Rule("neither", PER_MINUTE)],
+            [Rule("empty", (), path="/a")],
+            [Rule("user", PER_MINUTE, path="/a", key="user")],
+            [
+                Rule("twice", PER_MINUTE, path="/a"),
+                Rule("twice", PER_MINUTE, path="/b"),
+            ],
+            [
+                Rule("a", PER_MINUTE, path="/a/"),
+                Rule("b", PER_MINUTE, path="/a"),
+            ],
+            [
+                Rule("a", PER_MINUTE, network="10.0.0.1/8"),
+                Rule("b", PER_MINUTE, network="10.0.0.0/8"),
+            ],
+        ],
+    )
+    def test_rejects_invalid_rules(self, rules):
+        with pytest.raises(ValueError):
+            RuleSet(rules)
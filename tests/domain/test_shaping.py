@@ -0,0 +1,129 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain import (
+    RateLimitConfig,
+    RateLimitStatus,
+    ShapingRateLimiter,
+    ShapingStorage,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+class TestShapingRateLimiter:
+    @pytest.fixture
+    def mock_storage(self):
+        return AsyncMock(spec=ShapingStorage)
+
+    def make_limiter(self, storage, **kwargs):
+        config = RateLimitConfig(
+            limit=100,
+            window=TimeWindow(duration=1, unit=TimeUnit.SECONDS),
+            burst=5,
+        )
+        return ShapingRateLimiter(config, storage, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_allowed_without_delay(self, mock_storage):
+        mock_storage.schedule.return_value = (True, 4, 0, 1_000_000_010, 0)
+        limiter = self.make_limiter(mock_storage, max_wait_ms=500)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.delay_ms == 0
+        assert result.limit == 5
+        assert limiter.waiters == 0
+        mock_storage.schedule.assert_called_once_with(
+            "rate_limit_gcra:{1.2.3.4}", 10_000, 50_000, 500_000
+        )
+
+    @pytest.mark.asyncio
+    async def test_delayed_request_waits_in_queue(self, mock_storage):
+        mock_storage.schedule.return_value = (True, 0, 0, 1_000_000_060, 20)
+        limiter = self.make_limiter(mock_storage)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.delay_ms == 20
+        assert limiter.waiters == 1
+        # The waiter leaves the queue once its slot arrives
+        await asyncio.sleep(0.05)
+        assert limiter.waiters == 0
+        assert limiter._queued == {}
+
+    @pytest.mark.asyncio
+    async def test_rejected_beyond_max_wait(self, mock_storage):
+        mock_storage.schedule.return_value = (False, 0, 30, 1_000_000_060, 0)
+        limiter = self.make_limiter(mock_storage)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.retry_after_ms == 30
+        assert result.delay_ms == 0
+        assert limiter.waiters == 0
+
+    @pytest.mark.asyncio
+    async def test_identifier_queue_is_bounded(self, mock_storage):
+        mock_storage.schedule.return_value = (True, 0, 0, 1_000_000_060, 50)
+        limiter = self.make_limiter(mock_storage, max_queue=2)
+
+        results = [
+            await limiter.check_and_increment("1.2.3.4") for _ in range(3)
+        ]
+        other = await limiter.check_and_increment("5.6.7.8")
+
+        assert [r.status for r in results] == [
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.ALLOWED,
+            RateLimitStatus.REJECTED,
+        ]
+        assert results[2].retry_after_ms == 10
+        assert other.status == RateLimitStatus.ALLOWED
+        # The full queue is answered without a storage call
+        assert mock_storage.schedule.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_total_waiters_are_bounded(self, mock_storage):
+        mock_storage.schedule.return_value = (True, 0, 0, 1_000_000_060, 50)
+        limiter = self.make_limiter(mock_storage, max_waiters=3)
+
+        results = [
+            await limiter.check_and_increment(f"10.0.0.{i}") for i in range(4)
+        ]
+
+        assert results[-1].status == RateLimitStatus.REJECTED
+        assert limiter.waiters == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_cannot_overfill_queue(
+        self, mock_storage
+    ):
+        async def schedule(*args):
+            await asyncio.sleep(0)
+            return True, 0, 0, 1_000_000_060, 50
+
+        mock_storage.schedule.side_effect = schedule
+        limiter = self.make_limiter(mock_storage, max_queue=2)
+
+        results = await asyncio.gather(
+            *(limiter.check_and_increment("1.2.3.4") for _ in range(5))
+        )
+
+        allowed = [r for r in results if r.status == RateLimitStatus.ALLOWED]
+        assert len(allowed) == 2
+
+    @pytest.mark.asyncio
+    async def test_storage_error_frees_queue_place(self, mock_storage):
+        mock_storage.schedule.side_effect = RuntimeError("boom")
+        limiter = self.make_limiter(mock_storage)
+
+        with pytest.raises(RuntimeError):
+            await limiter.check_and_increment("1.2.3.4")
+
+        assert limiter.waiters == 0
@@ -0,0 +1,199 @@
+import random
+from collections import deque
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain import (
+    RateLimitConfig,
+    RateLimitStatus,
+    SlidingWindowCounterRateLimiter,
+    SlidingWindowCounterStorage,
+    SlidingWindowLogRateLimiter,
+    SlidingWindowLogStorage,
+    TimeUnit,
+    TimeWindow,
+)
+
+
+class TestSlidingWindowLogRateLimiter:
+    @pytest.fixture
+    def mock_storage(self):
+        return AsyncMock(spec=SlidingWindowLogStorage)
+
+    @pytest.fixture
+    def limiter(self, mock_storage):
+        config = RateLimitConfig(
+            limit=10, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+        )
+        return SlidingWindowLogRateLimiter(config, mock_storage)
+
+    def test_key_generation(self, limiter):
+        assert (
+            limiter._get_key("192.168.1.1") == "rate_limit_log:{192.168.1.1}"
+        )
+
+    @pytest.mark.asyncio
+    async def test_allowed(self, limiter, mock_storage, mocker):
+        mocker.patch("domain.sliding_window.time.time", return_value=1000.5)
+        mock_storage.log_request.return_value = (True, 3, 990_000)
+
+        result = await limiter.check_and_increment("192.168.1.1")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.limit == 10
+        assert result.remaining == 7
+        # Oldest entry (990s) leaves the 60s window at 1050s
+        assert result.reset_time == 1050
+        key, now_ms, window_ms, limit, member = (
+            mock_storage.log_request.call_args.args
+        )
+        assert key == "rate_limit_log:{192.168.1.1}"
+        assert now_ms == 1_000_500
+        assert window_ms == 60_000
+        assert limit == 10
+        assert len(member) == 8
+
+    @pytest.mark.asyncio
+    async def test_rejected(self, limiter, mock_storage):
+        mock_storage.log_request.return_value = (False, 10, 990_000)
+
+        result = await limiter.check_and_increment("192.168.1.1")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.remaining == 0
+
+
+class CounterStorage:
+    """In-memory SlidingWindowCounterStorage mirroring the Lua script."""
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+
+    async def weighted_increment(
+        self, current_key, previous_key, limit, weight, ttl
+    ):
+        current = self.counters.get(current_key, 0)
+        previous = self.counters.get(previous_key, 0)
+        if previous * weight + current + 1 > limit:
+            return False, current, previous
+        self.counters[current_key] = current + 1
+        return True, current + 1, previous
+
+
+class ExactSlidingLog:
+    """Reference sliding window log over allowed request times."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.log = deque()
+
+    def check(self, now):
+        while self.log and self.log[0] <= now - self.window:
+            self.log.popleft()
+        if len(self.log) < self.limit:
+            self.log.append(now)
+            return True
+        return False
+
+
+def make_counter_limiter(limit=100):
+    config = RateLimitConfig(
+        limit=limit, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+    )
+    return SlidingWindowCounterRateLimiter(config, CounterStorage())
+
+
+async def replay(limiter, arrivals, clock):
+    exact = ExactSlidingLog(limiter.config.limit, 60)
+    counter_allowed = exact_allowed = 0
+    for arrival in arrivals:
+        clock.return_value = arrival
+        result = await limiter.check_and_increment("client")
+        counter_allowed += result.status == RateLimitStatus.ALLOWED
+        exact_allowed += exact.check(arrival)
+    return counter_allowed, exact_allowed
+
+
+class TestSlidingWindowCounterRateLimiter:
+    @pytest.fixture
+    def clock(self, mocker):
+        return mocker.patch("domain.sliding_window.time.time")
+
+    def test_reuses_fixed_window_keys(self):
+        limiter = make_counter_limiter()
+        assert limiter._get_key("1.2.3.4", 900) == "rate_limit:{1.2.3.4}:900"
+
+    @pytest.mark.asyncio
+    async def test_weights_previous_window(self, clock):
+        storage = AsyncMock(spec=SlidingWindowCounterStorage)
+        storage.weighted_increment.return_value = (True, 10, 80)
+        config = RateLimitConfig(
+            limit=100, window=TimeWindow(duration=1, unit=TimeUnit.MINUTES)
+        )
+        limiter = SlidingWindowCounterRateLimiter(config, storage)
+        clock.return_value = 6015.0  # a quarter into the 6000s window
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        current_key, previous_key, limit, weight, ttl = (
+            storage.weighted_increment.call_args.args
+        )
+        assert current_key == "rate_limit:{1.2.3.4}:6000"
+        assert previous_key == "rate_limit:{1.2.3.4}:5940"
+        assert limit == 100
+        assert weight == pytest.approx(0.75)
+        assert ttl == 120
+        # 80 * 0.75 + 10 = 70 requests in the sliding window
+        assert result.remaining == 30
+        assert result.reset_time == 6060
+
+    @pytest.mark.asyncio
+    async def test_rejects_without_incrementing(self, clock):
+        limiter = make_counter_limiter(limit=2)
+        clock.return_value = 6000.0
+
+        statuses = [
+            (await limiter.check_and_increment("c")).status for _ in range(4)
+        ]
+
+        assert statuses.count(RateLimitStatus.ALLOWED) == 2
+        assert limiter.storage.counters["rate_limit:{c}:6000"] == 2
+
+    @pytest.mark.asyncio
+    async def test_accuracy_uniform_traffic(self, clock):
+        """Evenly spaced traffic at twice the limit matches the exact log."""
+        limiter = make_counter_limiter(limit=100)
+        arrivals = [6000 + i * 0.3 for i in range(2000)]  # 10 windows
+
+        counter_allowed, exact_allowed = await replay(limiter, arrivals, clock)
+
+        assert abs(counter_allowed - exact_allowed) <= exact_allowed * 0.02
+
+    @pytest.mark.asyncio
+    async def test_accuracy_random_traffic(self, clock):
+        """Poisson traffic stays within a few percent of the exact log."""
+        rng = random.Random(42)
+        limiter = make_counter_limiter(limit=100)
+        arrivals, now = [], 6000.0
+        while now < 6000 + 60 * 20:
+            now += rng.expovariate(150 / 60)  # 1.5x the limit on average
+            arrivals.append(now)
+
+        counter_allowed, exact_allowed = await replay(limiter, arrivals, clock)
+
+        assert abs(counter_allowed - exact_allowed) <= exact_allowed * 0.05
+
+    @pytest.mark.asyncio
+    async def test_boundary_burst_is_smoothed(self, clock):
+        """A burst at a window end is not followed by a full new burst."""
+        limiter = make_counter_limiter(limit=100)
+        burst_end = [6059.0] * 100
+        burst_start = [6061.0] * 100
+
+        await replay(limiter, burst_end, clock)
+        allowed, _ = await replay(limiter, burst_start, clock)
+
+        # A fixed window would allow all 100; 1/60 of the window elapsed
+        assert allowed <= 2
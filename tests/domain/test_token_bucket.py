@@ -0,0 +1,80 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain import (
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+    TokenBucketRateLimiter,
+    TokenBucketStorage,
+)
+
+
+class TestTokenBucketRateLimiter:
+    @pytest.fixture
+    def mock_storage(self):
+        return AsyncMock(spec=TokenBucketStorage)
+
+    def make_limiter(self, storage, **kwargs):
+        config = RateLimitConfig(
+            limit=60,
+            window=TimeWindow(duration=1, unit=TimeUnit.MINUTES),
+            **kwargs,
+        )
+        return TokenBucketRateLimiter(config, storage)
+
+    def test_defaults_to_limit_per_window(self, mock_storage):
+        limiter = self.make_limiter(mock_storage)
+        assert limiter.capacity == 60
+        assert limiter.refill_rate == 1.0
+
+    def test_explicit_capacity_and_refill_rate(self, mock_storage):
+        limiter = self.make_limiter(
+            mock_storage, capacity=200, refill_rate=2.5
+        )
+        assert limiter.capacity == 200
+        assert limiter.refill_rate == 2.5
+
+    def test_key_generation(self, mock_storage):
+        limiter = self.make_limiter(mock_storage)
+        assert limiter._get_key("1.2.3.4") == "rate_limit_bucket:{1.2.3.4}"
+
+    @pytest.mark.asyncio
+    async def test_allowed(self, mock_storage):
+        mock_storage.take_token.return_value = (True, 59, 0, 1_000_001_500)
+        limiter = self.make_limiter(mock_storage)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.ALLOWED
+        assert result.limit == 60
+        assert result.remaining == 59
+        assert result.reset_time == 1_000_002  # rounded up to the second
+        assert result.retry_after_ms == 0
+        mock_storage.take_token.assert_called_once_with(
+            "rate_limit_bucket:{1.2.3.4}", 60, 1.0, 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_batch_takes_each_cost_at_once(self, mock_storage):
+        mock_storage.take_token.return_value = (True, 55, 0, 1_000_001_500)
+        limiter = self.make_limiter(mock_storage)
+
+        await limiter.check_and_increment_many([("1.2.3.4", 5)])
+
+        mock_storage.take_token.assert_called_once_with(
+            "rate_limit_bucket:{1.2.3.4}", 60, 1.0, 5
+        )
+
+    @pytest.mark.asyncio
+    async def test_rejected_reports_retry_after(self, mock_storage):
+        mock_storage.take_token.return_value = (False, 0, 250, 1_000_060_000)
+        limiter = self.make_limiter(mock_storage)
+
+        result = await limiter.check_and_increment("1.2.3.4")
+
+        assert result.status == RateLimitStatus.REJECTED
+        assert result.remaining == 0
+        assert result.retry_after_ms == 250
@@ -0,0 +1,233 @@
+import select
+import threading
+from dataclasses import dataclass, field
+
+import pytest
+from fakeredis import FakeServer, FakeStrictRedis, TcpFakeServer
+from fakeredis._clients._tcp_server import TCPFakeRequestHandler
+from fakeredis._helpers import SimpleError
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS, key_slot
+from redis.exceptions import RedisError
+
+# Commands whose arguments hold no keys, so any node may serve them
+KEYLESS_COMMANDS = {
+    b"AUTH",
+    b"CLIENT",
+    b"COMMAND",
+    b"CONFIG",
+    b"DBSIZE",
+    b"ECHO",
+    b"FLUSHALL",
+    b"FLUSHDB",
+    b"HELLO",
+    b"INFO",
+    b"KEYS",
+    b"PING",
+    b"SCAN",
+    b"SCRIPT",
+    b"SELECT",
+    b"TIME",
+}
+
+
+@dataclass
+class StandInCluster:
+    """Nodes and slot ownership of the stand-in cluster."""
+
+    nodes: list[tuple[str, int]] = field(default_factory=list)
+    # Each node's data and script cache
+    stores: list[FakeServer] = field(default_factory=list)
+    owners: list[int] = field(default_factory=list)
+    # slot -> index of the node the slot is being migrated to
+    migrating: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.address(0)}"
+
+    def node(self, index: int) -> FakeStrictRedis:
+        """Client reading one node's data directly, bypassing routing."""
+        return FakeStrictRedis(server=self.stores[index])
+
+    def assign_slots(self) -> None:
+        """Split the slots evenly between the nodes."""
+        per_node = REDIS_CLUSTER_HASH_SLOTS // len(self.nodes) + 1
+        self.owners = [
+            slot // per_node for slot in range(REDIS_CLUSTER_HASH_SLOTS)
+        ]
+
+    def address(self, index: int) -> str:
+        host, port = self.nodes[index]
+        return f"{host}:{port}"
+
+    def move_slot(self, slot: int, index: int) -> None:
+        """Hand a slot over to another node, as after a resharding."""
+        self.owners[slot] = index
+        self.migrating.pop(slot, None)
+
+    def cluster_slots(self) -> list:
+        ranges = []
+        start = 0
+        for slot in range(1, REDIS_CLUSTER_HASH_SLOTS + 1):
+            if (
+                slot == REDIS_CLUSTER_HASH_SLOTS
+                or self.owners[slot] != self.owners[start]
+            ):
+                host, port = self.nodes[self.owners[start]]
+                node_id = f"node{self.owners[start]}".ljust(40, "0")
+                ranges.append([start, slot - 1, [host, port, node_id]])
+                start = slot
+        return ranges
+
+
+def command_keys(args: list[bytes]) -> list[bytes]:
+    name = args[0].upper()
+    if name in KEYLESS_COMMANDS or len(args) < 2:
+        return []
+    if name in (b"EVAL", b"EVALSHA", b"EVAL_RO", b"EVALSHA_RO"):
+        return args[3 : 3 + int(args[2])]
+    return [args[1]]
+
+
+def parse_command(buffer: bytes) -> tuple[list[bytes], int] | None:
+    """Parse one RESP array command, returning it and its length."""
+    end = buffer.find(b"\r\n")
+    if end < 0:
+        return None
+    count = int(buffer[1:end])
+    position = end + 2
+    args = []
+    for _ in range(count):
+        end = buffer.find(b"\r\n", position)
+        if end < 0:
+            return None
+        length = int(buffer[position + 1 : end])
+        start = end + 2
+        if len(buffer) < start + length + 2:
+            return None
+        args.append(buffer[start : start + length])
+        position = start + length + 2
+    return args, position
+
+
+class ClusterNodeHandler(TCPFakeRequestHandler):
+    """Serves one node's slots and redirects the others like Redis."""
+
+    def handle(self) -> None:
+        self.asking = False
+        buffer = b""
+        while not self.server._shutdown_event.is_set():
+            self.flush_replies()
+            readable, _, _ = select.select([self.connection], [], [], 0.01)
+            if not readable:
+                continue
+            try:
+                chunk = self.connection.recv(65536)
+            except BlockingIOError:
+                continue
+            except ConnectionError:
+                break
+            if not chunk:
+                break
+            buffer += chunk
+            while buffer and (parsed := parse_command(buffer)) is not None:
+                args, length = parsed
+                self.dispatch(args, buffer[:length])
+                buffer = buffer[length:]
+
+    def flush_replies(self) -> None:
+        while self.current_client.can_read():
+            try:
+                response = self.current_client.read_response()
+            except RedisError as exc:
+                # Error replies are raised by the connection
+                response = exc
+            self.writer.dump(response)
+
+    def reply(self, value) -> None:
+        # Replies to earlier pipelined commands must go out first
+        self.flush_replies()
+        self.writer.dump(value)
+
+    def dispatch(self, args: list[bytes], raw: bytes) -> None:
+        cluster = self.server.cluster
+        index = self.server.index
+        name = args[0].upper()
+        asking, self.asking = self.asking, False
+
+        if name == b"CLUSTER":
+            if args[1].upper() == b"SLOTS":
+                return self.reply(cluster.cluster_slots())
+            return self.reply(SimpleError("ERR unsupported in stand-in"))
+        if name == b"ASKING":
+            self.asking = True
+            return self.reply("OK")
+        if name in (b"READONLY", b"READWRITE"):
+            return self.reply("OK")
+
+        keys = command_keys(args)
+        if keys:
+            slots = {key_slot(key) for key in keys}
+            if len(slots) > 1:
+                return self.reply(
+                    SimpleError(
+                        "CROSSSLOT Keys in request don't hash to the same slot"
+                    )
+                )
+            slot = slots.pop()
+            owner = cluster.owners[slot]
+            importing = cluster.migrating.get(slot) == index
+            if owner != index and not (importing and asking):
+                return self.reply(
+                    SimpleError(f"MOVED {slot} {cluster.address(owner)}")
+                )
+            target = cluster.migrating.get(slot)
+            if owner == index and target is not None:
+                local = FakeStrictRedis(server=self.server.fake_server)
+                if not local.exists(*keys):
+                    return self.reply(
+                        SimpleError(f"ASK {slot} {cluster.address(target)}")
+                    )
+
+        self.flush_replies()
+        self.current_client.get_socket().sendall(raw)
+
+
+class ClusterNode(TcpFakeServer):
+    def __init__(self, address, cluster: StandInCluster, index: int):
+        super().__init__(address)
+        self.RequestHandlerClass = ClusterNodeHandler
+        self.fake_server = FakeServer()
+        self.cluster = cluster
+        self.index = index
+
+
+@pytest.fixture
+def redis_cluster():
+    """
+    Three-node Redis Cluster stand-in on localhost.
+
+    Each node keeps its own data and script cache, serves only its own
+    slots and answers other keys with MOVED (or ASK while a slot is
+    migrating), so clients must route by slot.
+    """
+    cluster = StandInCluster()
+    servers = [
+        ClusterNode(("127.0.0.1", 0), cluster, index) for index in range(3)
+    ]
+    cluster.nodes = [server.server_address for server in servers]
+    cluster.stores = [server.fake_server for server in servers]
+    cluster.assign_slots()
+
+    threads = [
+        threading.Thread(target=server.serve_forever, daemon=True)
+        for server in servers
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        yield cluster
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+from infrastructure.batching import BatchingStorage
+from infrastructure.redis_client import RedisClient
+
+
+class CountingStorage:
+    """In-memory increment_many backend recording every batch."""
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self.batches: list[list[tuple[str, int, int]]] = []
+
+    async def increment_many(self, items):
+        self.batches.append(items)
+        results = []
+        for key, _, amount in items:
+            self.counts[key] = self.counts.get(key, 0) + amount
+            results.append(self.counts[key])
+        return results
+
+
+@pytest.mark.asyncio
+async def test_concurrent_increments_share_one_batch():
+    backend = CountingStorage()
+    storage = BatchingStorage(backend)
+
+    counts = await asyncio.gather(
+        *(storage.increment(f"key{i % 3}", 60) for i in range(9))
+    )
+
+    assert len(backend.batches) == 1
+    # Same-key increments are coalesced into one INCRBY per key
+    assert sorted(backend.batches[0]) == [
+        ("key0", 60, 3),
+        ("key1", 60, 3),
+        ("key2", 60, 3),
+    ]
+    assert sorted(counts) == [1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_each_caller_gets_its_own_count():
+    backend = CountingStorage()
+    backend.counts["hot"] = 10
+    storage = BatchingStorage(backend)
+
+    counts = await asyncio.gather(
+        *(storage.increment("hot", 60) for _ in range(5))
+    )
+
+    assert counts == [11, 12, 13, 14, 15]
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches():
+    backend = CountingStorage()
+    storage = BatchingStorage(backend, max_batch_size=4)
+
+    await asyncio.gather(*(storage.increment("k", 60) for _ in range(10)))
+
+    assert [sum(a for _, _, a in b) for b in backend.batches] == [4, 4, 2]
+    assert backend.counts["k"] == 10
+
+
+@pytest.mark.asyncio
+async def test_max_delay_collects_across_ticks():
+    backend = CountingStorage()
+    storage = BatchingStorage(backend, max_delay=0.05)
+
+    async def late_increment():
+        await asyncio.sleep(0.01)
+        return await storage.increment("k", 60)
+
+    await asyncio.gather(storage.increment("k", 60), late_increment())
+
+    assert len(backend.batches) == 1
+    assert backend.batches[0] == [("k", 60, 2)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [ConnectionError, RuntimeError])
+async def test_backend_error_propagates_to_callers(error):
+    class FailingStorage:
+        async def increment_many(self, items):
+            raise error("boom")
+
+    storage = BatchingStorage(FailingStorage())
+
+    with pytest.raises(error):
+        await storage.increment("k", 60)
+
+
+@pytest.mark.asyncio
+async def test_drain_flushes_pending_increments():
+    backend = CountingStorage()
+    storage = BatchingStorage(backend, max_delay=10)
+
+    task = asyncio.ensure_future(storage.increment("k", 60))
+    await asyncio.sleep(0)
+    await storage.drain()
+
+    assert await task == 1
+
+
+@pytest.mark.asyncio
+async def test_increment_many_goes_straight_to_backend():
+    backend = CountingStorage()
+    storage = BatchingStorage(backend)
+
+    counts = await storage.increment_many([("a", 60, 2), ("b", 60, 1)])
+
+    assert counts == [2, 1]
+    assert backend.batches == [[("a", 60, 2), ("b", 60, 1)]]
+
+
+@pytest.mark.asyncio
+async def test_batching_against_redis_pipeline():
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    storage = BatchingStorage(client)
+
+    counts = await asyncio.gather(
+        *(storage.increment("batched", 60) for _ in range(20))
+    )
+
+    assert sorted(counts) == list(range(1, 21))
+    assert int(await client._client.get("batched")) == 20
+    assert await client._client.ttl("batched") > 0
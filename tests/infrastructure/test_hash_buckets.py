@@ -0,0 +1,102 @@
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+from domain import (
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure import HashBucketStorage, RedisClient
+
+
+@pytest.fixture
+def client():
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    return client
+
+
+def test_invalid_buckets(client):
+    with pytest.raises(ValueError):
+        HashBucketStorage(client, buckets=0)
+
+
+def test_locate_buckets_by_identifier_window_and_ttl(client):
+    storage = HashBucketStorage(client, buckets=8)
+
+    bucket, field = storage.locate("rate_limit:{1.2.3.4}:1700000040", 60)
+    later, _ = storage.locate("rate_limit:{1.2.3.4}:1700000100", 60)
+    other_ttl, _ = storage.locate("rate_limit:{1.2.3.4}:1700000040", 3600)
+
+    assert field == "{1.2.3.4}"
+    assert bucket.startswith("rate_limit_hash:{")
+    assert bucket.endswith("}:60:1700000040")
+    assert len({bucket, later, other_ttl}) == 3
+
+
+def test_locate_with_field_expiry_keeps_window_in_field(client):
+    storage = HashBucketStorage(client, buckets=8, field_expiry=True)
+
+    bucket, field = storage.locate("rate_limit:{1.2.3.4}:1700000040", 60)
+
+    assert field == "{1.2.3.4}:1700000040"
+    assert bucket == storage.locate("rate_limit:{1.2.3.4}:0", 60)[0]
+
+
+@pytest.mark.asyncio
+async def test_counters_share_few_bucket_keys(client):
+    storage = HashBucketStorage(client, buckets=4)
+
+    counts = await storage.increment_many(
+        [(f"rate_limit:{{10.0.0.{i}}}:60", 60, 1) for i in range(100)]
+    )
+    again = await storage.increment("rate_limit:{10.0.0.7}:60", 60)
+
+    assert counts == [1] * 100
+    assert again == 2
+    keys = await client._client.keys("*")
+    assert 1 <= len(keys) <= 4
+    for key in keys:
+        # The whole bucket expires with its window
+        assert 0 < await client._client.ttl(key) <= 60
+
+
+@pytest.mark.asyncio
+async def test_field_expiry_sets_ttl_per_field(client):
+    storage = HashBucketStorage(client, buckets=1, field_expiry=True)
+
+    await storage.increment("rate_limit:{10.0.0.1}:60", 60)
+    await storage.increment("rate_limit:{10.0.0.1}:60", 60)
+
+    ttls = await client._client.execute_command(
+        "HTTL", "rate_limit_hash:{0}", "FIELDS", 1, "{10.0.0.1}:60"
+    )
+    assert 0 < ttls[0] <= 60
+    assert await client._client.ttl("rate_limit_hash:{0}") == -1
+
+
+@pytest.mark.asyncio
+async def test_fixed_window_rate_limiter_on_hash_buckets(client):
+    limiter = FixedWindowRateLimiter(
+        RateLimitConfig(limit=2, window=TimeWindow(1, TimeUnit.MINUTES)),
+        HashBucketStorage(client),
+    )
+
+    results = [await limiter.check_and_increment("10.0.0.1") for _ in range(3)]
+
+    assert [result.status for result in results] == [
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.REJECTED,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fails_open_when_redis_unavailable():
+    storage = HashBucketStorage(RedisClient("redis://invalid:6379"))
+
+    assert await storage.increment_many(
+        [("rate_limit:{a}:0", 60, 3), ("rate_limit:{b}:0", 60, 1)]
+    ) == [3, 1]
@@ -0,0 +1,236 @@
+import random
+
+import pytest
+
+from domain import (
+    CompositeRateLimiter,
+    FixedWindowRateLimiter,
+    LeasingRateLimiter,
+    RateLimitConfig,
+    RateLimitStatus,
+    SlidingWindowCounterRateLimiter,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure import MemoryStorage, TimingWheel
+from infrastructure.memory_storage import _Counter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def storage(clock):
+    return MemoryStorage(clock=clock)
+
+
+def test_counter_uses_slots():
+    counter = _Counter("key", 1, 10)
+    assert not hasattr(counter, "__dict__")
+
+
+@pytest.mark.parametrize("ttl", [1, 5, 63, 64, 65, 4095, 4096, 300_000])
+def test_timing_wheel_expires_at_ttl(ttl):
+    wheel = TimingWheel(now=123)
+    wheel.schedule(_Counter("key", 1, 123 + ttl))
+
+    assert list(wheel.advance(123 + ttl - 1)) == []
+    expired = list(wheel.advance(123 + ttl))
+
+    assert [counter.key for counter in expired] == ["key"]
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_expires_every_counter_on_time():
+    wheel = TimingWheel(now=0)
+    rng = random.Random(7)
+    deadlines = {f"key{i}": rng.randrange(1, 20_000) for i in range(2000)}
+    for key, expires_at in deadlines.items():
+        wheel.schedule(_Counter(key, 1, expires_at))
+
+    for now in range(0, 20_000 + 37, 37):
+        for counter in wheel.advance(now):
+            assert counter.expires_at <= now < counter.expires_at + 37
+            del deadlines[counter.key]
+
+    assert deadlines == {}
+
+
+def test_timing_wheel_spans_beyond_its_levels():
+    wheel = TimingWheel(now=0)
+    expires_at = (TimingWheel.SLOTS**TimingWheel.LEVELS) * 2 + 5
+    wheel.schedule(_Counter("far", 1, expires_at))
+
+    assert list(wheel.advance(expires_at - 1)) == []
+    assert [c.key for c in wheel.advance(expires_at)] == ["far"]
+
+
+@pytest.mark.asyncio
+async def test_increment_sets_ttl_only_for_new_keys(storage, clock):
+    assert await storage.increment("key", 10) == 1
+    clock.now += 5
+    assert await storage.increment("key", 10) == 2
+
+    clock.now += 5
+    assert await storage.increment("key", 10) == 1
+    assert len(storage) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_keys_are_dropped(storage, clock):
+    for i in range(100):
+        await storage.increment(f"key{i}", 60)
+    clock.now += 60
+
+    assert await storage.ping() is True
+    await storage.increment("other", 60)
+
+    assert len(storage) == 1
+
+
+@pytest.mark.asyncio
+async def test_keys_without_ttl_never_expire(storage, clock):
+    await storage.increment("key", 0)
+    clock.now += 10**9
+
+    assert await storage.increment("key", 0) == 2
+
+
+@pytest.mark.asyncio
+async def test_increment_many(storage):
+    assert await storage.increment_many(
+        [("a", 60, 1), ("b", 60, 3), ("a", 60, 2)]
+    ) == [1, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_fixed_window_rate_limiter(storage):
+    limiter = FixedWindowRateLimiter(
+        RateLimitConfig(limit=2, window=TimeWindow(1, TimeUnit.MINUTES)),
+        storage,
+    )
+
+    results = [await limiter.check_and_increment("10.0.0.1") for _ in range(3)]
+
+    assert [r.status for r in results] == [
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.REJECTED,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_increment_all_checks_every_rule(storage):
+    keys, limits, ttls = ["s", "h"], [2, 3], [1, 3600]
+
+    assert await storage.increment_all(keys, limits, ttls) == (True, [1, 1])
+    assert await storage.increment_all(keys, limits, ttls) == (True, [2, 2])
+    # The first rule is full, so neither counter moves
+    assert await storage.increment_all(keys, limits, ttls) == (False, [2, 2])
+
+
+@pytest.mark.asyncio
+async def test_composite_rate_limiter(storage, clock):
+    limiter = CompositeRateLimiter(
+        [
+            RateLimitConfig(limit=1, window=TimeWindow(1, TimeUnit.SECONDS)),
+            RateLimitConfig(limit=5, window=TimeWindow(1, TimeUnit.HOURS)),
+        ],
+        storage,
+    )
+
+    results = await limiter.check_and_increment_many(
+        [("10.0.0.1", 1), ("10.0.0.1", 1)]
+    )
+
+    assert [r.status for r in results] == [
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.REJECTED,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reserve_and_release(storage):
+    assert await storage.reserve("window", 5, 8, 60) == (5, 5)
+    assert await storage.reserve("window", 5, 8, 60) == (3, 8)
+    assert await storage.reserve("window", 5, 8, 60) == (0, 8)
+
+    await storage.release("window", 10)
+    assert await storage.reserve("window", 1, 8, 60) == (1, 1)
+
+    # Releasing into a missing window does not recreate it
+    await storage.release("missing", 3)
+    assert len(storage) == 1
+
+
+@pytest.mark.asyncio
+async def test_leasing_rate_limiter(storage):
+    limiter = LeasingRateLimiter(
+        RateLimitConfig(limit=4, window=TimeWindow(1, TimeUnit.MINUTES)),
+        storage,
+        max_lease=2,
+    )
+
+    results = [await limiter.check_and_increment("10.0.0.1") for _ in range(5)]
+
+    assert [r.status for r in results].count(RateLimitStatus.ALLOWED) == 4
+    assert results[-1].status == RateLimitStatus.REJECTED
+
+
+@pytest.mark.asyncio
+async def test_weighted_increment(storage):
+    await storage.increment_many([("previous", 120, 4)])
+
+    assert await storage.weighted_increment(
+        "current", "previous", 4, 0.5, 120
+    ) == (True, 1, 4)
+    assert await storage.weighted_increment(
+        "current", "previous", 4, 0.5, 120
+    ) == (True, 2, 4)
+    assert await storage.weighted_increment(
+        "current", "previous", 4, 0.5, 120
+    ) == (False, 2, 4)
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_counter_rate_limiter(storage):
+    limiter = SlidingWindowCounterRateLimiter(
+        RateLimitConfig(limit=2, window=TimeWindow(1, TimeUnit.HOURS)),
+        storage,
+    )
+
+    results = [await limiter.check_and_increment("10.0.0.1") for _ in range(3)]
+
+    assert results[-1].status == RateLimitStatus.REJECTED
+
+
+@pytest.mark.asyncio
+async def test_merge_top_sums_instances_and_windows(storage, clock):
+    await storage.merge_top("prev", "older", {"a": 2, "c": 5}, 120, 10, 5)
+
+    await storage.merge_top("cur", "prev", {"a": 3, "b": 1}, 120, 10, 5)
+    top = await storage.merge_top("cur", "prev", {"b": 1}, 120, 10, 2)
+
+    assert top == [("a", 5), ("c", 5)]
+    clock.now += 120
+    assert await storage.merge_top("next", "cur", {}, 120, 10, 5) == []
+
+
+@pytest.mark.asyncio
+async def test_merge_top_keeps_capacity_highest(storage):
+    await storage.merge_top("cur", "prev", {"a": 3, "b": 1, "c": 2}, 60, 2, 5)
+
+    assert await storage.merge_top("cur", "prev", {}, 60, 2, 5) == [
+        ("a", 3),
+        ("c", 2),
+    ]
@@ -0,0 +1,103 @@
+import fakeredis
+import pytest
+
+from infrastructure import Counter, Histogram, Metrics, RedisClient
+
+
+def test_counter_increments():
+    counter = Counter()
+    counter.inc()
+    counter.inc(4)
+    assert counter.value == 5
+
+
+def test_histogram_buckets_are_preallocated():
+    histogram = Histogram((0.1, 1.0))
+    assert histogram.counts == [0, 0, 0]
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    # Bounds are inclusive upper limits, the last slot is +Inf
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(3.65)
+
+
+def test_render_prometheus_text():
+    metrics = Metrics(routes=("/rate-limit",))
+    metrics.record_decision("default", True)
+    metrics.record_decision("default", True)
+    metrics.record_decision("api_key", False)
+    metrics.handler_latency["/rate-limit"].observe(0.0003)
+    metrics.redis_latency.observe(0.002)
+    metrics.record_storage_error(ConnectionError())
+    metrics.pool_usage = lambda: (2, 3, 10)
+
+    text = metrics.render()
+
+    assert (
+        'rate_limiter_requests_total{rule="default",decision="allowed"} 2'
+        in text
+    )
+    assert (
+        'rate_limiter_requests_total{rule="api_key",decision="rejected"} 1'
+        in text
+    )
+    assert (
+        'rate_limiter_handler_duration_seconds_bucket{route="/rate-limit",'
+        'le="0.00025"} 0' in text
+    )
+    assert (
+        'rate_limiter_handler_duration_seconds_bucket{route="/rate-limit",'
+        'le="0.0005"} 1' in text
+    )
+    assert 'rate_limiter_redis_duration_seconds_bucket{le="+Inf"} 1' in text
+    assert "rate_limiter_redis_duration_seconds_count 1" in text
+    assert (
+        'rate_limiter_storage_errors_total{error="ConnectionError"} 1' in text
+    )
+    assert 'rate_limiter_redis_connections{state="in_use"} 2' in text
+    assert "rate_limiter_redis_connections_max 10" in text
+    assert text.endswith("\n")
+
+
+def test_rule_labels_are_capped():
+    metrics = Metrics(max_rules=2)
+    for rule in ("a", "b", "c", "d"):
+        metrics.record_decision(rule, True)
+
+    assert set(metrics.decisions) == {"a", "b", "other"}
+    assert metrics.decisions["other"][0].value == 2
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.record_decision('a"b\\c', True)
+
+    assert 'rule="a\\"b\\\\c"' in metrics.render()
+
+
+@pytest.mark.asyncio
+async def test_redis_client_records_round_trips():
+    metrics = Metrics()
+    client = RedisClient("redis://localhost:6379", metrics=metrics)
+    client._client = fakeredis.FakeAsyncRedis()
+
+    await client.increment("key", 60)
+    await client.increment_many([("a", 60, 1), ("b", 60, 1)])
+
+    assert metrics.redis_latency.count == 2
+    assert metrics.storage_errors == {}
+    assert client.pool_usage()[2] > 0
+
+
+@pytest.mark.asyncio
+async def test_redis_client_records_errors():
+    metrics = Metrics()
+    client = RedisClient("redis://invalid:6379", metrics=metrics)
+
+    assert await client.increment("key", 60) == 1
+
+    assert sum(c.value for c in metrics.storage_errors.values()) == 1
+    assert metrics.redis_latency.count == 1
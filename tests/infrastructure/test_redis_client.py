@@ -1,4 +1,5 @@
 import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from infrastructure.redis_client import RedisClient
 
@@ -28,6 +29,24 @@ async def test_increment_invalid_url():
     assert result == 1
 
 
+@pytest.mark.asyncio
+async def test_increment_raises_when_not_failing_open():
+    """Test errors reach the caller, e.g. a circuit breaker."""
+    client = RedisClient("redis://invalid:6379", fail_open=False)
+    with pytest.raises(RedisConnectionError):
+        await client.increment("test_key", 60)
+
+
+@pytest.mark.asyncio
+async def test_release_logs_when_redis_unavailable(caplog):
+    """Test returning leased units stays best effort."""
+    client = RedisClient("redis://invalid:6379", fail_open=False)
+
+    await client.release("test_key", 5)
+
+    assert "could not return 5 units to 'test_key'" in caplog.text
+
+
 @pytest.mark.asyncio
 async def test_increment_local_redis():
     """Test increment works with local Redis (integration test)."""
@@ -74,3 +93,377 @@ async def test_increment_with_ttl():
     except Exception:
         # If Redis commands fail, skip TTL check
         pass
+
+
+@pytest.mark.asyncio
+async def test_load_scripts_invalid_url():
+    """Test script preloading fails gracefully when Redis is unavailable."""
+    client = RedisClient("redis://invalid:6379")
+    result = await client.load_scripts()
+    assert result is False
+
+
+@pytest.mark.asyncio
+async def test_increment_recovers_from_script_flush():
+    """Test increment reloads its script after the cache is flushed."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    assert await client.load_scripts() is True
+
+    assert await client.increment("flush_key", 60) == 1
+    await client._client.script_flush()
+    assert await client.increment("flush_key", 60) == 2
+    assert await client._client.ttl("flush_key") > 0
+
+
+@pytest.mark.asyncio
+async def test_increment_many_with_amounts():
+    """Test increment_many applies each amount in one pipeline."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    counts = await client.increment_many([("a", 60, 3), ("b", 60, 1)])
+    assert counts == [3, 1]
+
+    counts = await client.increment_many([("a", 60, 2)])
+    assert counts == [5]
+    assert await client._client.ttl("a") > 0
+
+
+@pytest.mark.asyncio
+async def test_increment_many_invalid_url():
+    """Test increment_many fails open when Redis is unavailable."""
+    client = RedisClient("redis://invalid:6379")
+    counts = await client.increment_many([("a", 60, 3), ("b", 60, 1)])
+    assert counts == [3, 1]
+
+
+@pytest.mark.asyncio
+async def test_reserve_and_release():
+    """Test quota leases never exceed the limit and can be returned."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    assert await client.reserve("lease", 60, 100, 60) == (60, 60)
+    assert await client.reserve("lease", 60, 100, 60) == (40, 100)
+    assert await client.reserve("lease", 60, 100, 60) == (0, 100)
+
+    await client.release("lease", 30)
+    assert int(await client._client.get("lease")) == 70
+    assert await client._client.ttl("lease") > 0
+
+
+@pytest.mark.asyncio
+async def test_release_missing_key_does_not_create_it():
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    await client.release("gone", 10)
+    assert await client._client.exists("gone") == 0
+
+
+@pytest.mark.asyncio
+async def test_log_request_slides_and_caps_entries():
+    """Test the sliding log trims old entries and never exceeds the limit."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    results = [
+        await client.log_request("log", 1000 + i, 1000, 3, f"m{i}".encode())
+        for i in range(5)
+    ]
+    assert [allowed for allowed, _, _ in results] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    # Rejected requests are not logged, so memory is capped at the limit
+    assert await client._client.zcard("log") == 3
+    assert results[-1] == (False, 3, 1000)
+
+    # Once the first entry leaves the window a slot frees up
+    allowed, count, oldest = await client.log_request(
+        "log", 2000, 1000, 3, b"late"
+    )
+    assert (allowed, count, oldest) == (True, 3, 1001)
+    assert 0 < await client._client.pttl("log") <= 1000
+
+
+@pytest.mark.asyncio
+async def test_log_request_invalid_url():
+    client = RedisClient("redis://invalid:6379")
+    assert await client.log_request("log", 5, 1000, 3, b"m") == (True, 1, 5)
+
+
+@pytest.mark.asyncio
+async def test_weighted_increment_reads_both_windows():
+    """Test the sliding counter weighs the previous window in one script."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    await client._client.set("prev", 8)
+
+    # 8 * 0.5 + 0 = 4 already in the window, limit 6 leaves two slots
+    results = [
+        await client.weighted_increment("cur", "prev", 6, 0.5, 120)
+        for _ in range(3)
+    ]
+
+    assert results == [(True, 1, 8), (True, 2, 8), (False, 2, 8)]
+    assert 0 < await client._client.ttl("cur") <= 120
+
+
+@pytest.mark.asyncio
+async def test_take_token_allows_burst_then_refills():
+    """Test the token bucket allows a burst and reports retry-after."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    burst = [await client.take_token("bucket", 3, 1.0) for _ in range(4)]
+
+    assert [allowed for allowed, _, _, _ in burst] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert [tokens for _, tokens, _, _ in burst[:3]] == [2, 1, 0]
+    _, _, retry_after_ms, full_at_ms = burst[-1]
+    # One token per second: the next one is at most a second away
+    assert 0 < retry_after_ms <= 1000
+    assert full_at_ms > time_ms()
+    assert 0 < await client._client.pttl("bucket") <= 3000
+    assert await client._client.hget("bucket", "ts") is not None
+
+
+@pytest.mark.asyncio
+async def test_take_token_takes_cost_at_once():
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    first = await client.take_token("bucket", 5, 1.0, 4)
+    second = await client.take_token("bucket", 5, 1.0, 4)
+
+    assert first[:2] == (True, 1)
+    # Rejected without taking the token that is left
+    assert second[:2] == (False, 1)
+    assert 2000 <= second[2] <= 3000
+
+
+@pytest.mark.asyncio
+async def test_take_token_invalid_url():
+    client = RedisClient("redis://invalid:6379")
+    allowed, tokens, retry_after_ms, _ = await client.take_token("b", 5, 1.0)
+    assert (allowed, tokens, retry_after_ms) == (True, 4, 0)
+
+
+def time_ms():
+    import time
+
+    return int(time.time() * 1000)
+
+
+@pytest.mark.asyncio
+async def test_update_tat_allows_burst_and_stores_one_integer():
+    """Test GCRA allows the burst, then rejects, keeping one integer."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    interval_us = 1_000_000  # one request per second
+
+    results = [
+        await client.update_tat("tat", interval_us, 3 * interval_us)
+        for _ in range(4)
+    ]
+
+    assert [allowed for allowed, _, _, _ in results] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert [left for _, left, _, _ in results[:3]] == [2, 1, 0]
+    assert 0 < results[-1][2] <= 1000
+    # The whole state is a single integer TAT, expiring with the burst
+    assert int(await client._client.get("tat")) > time_ms() * 1000
+    assert 0 < await client._client.pttl("tat") <= 3000
+
+
+@pytest.mark.asyncio
+async def test_update_tat_counts_cost_at_once():
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    interval_us = 1_000_000
+
+    first = await client.update_tat("tat", interval_us, 3 * interval_us, 2)
+    second = await client.update_tat("tat", interval_us, 3 * interval_us, 2)
+
+    assert first[:2] == (True, 1)
+    assert second[:2] == (False, 1)
+
+
+@pytest.mark.asyncio
+async def test_update_tat_invalid_url():
+    client = RedisClient("redis://invalid:6379")
+    allowed, left, retry_after_ms, _ = await client.update_tat("t", 10, 50)
+    assert (allowed, left, retry_after_ms) == (True, 4, 0)
+
+
+@pytest.mark.asyncio
+async def test_schedule_delays_requests_up_to_max_delay():
+    """Test shaping schedules requests past the burst, then rejects."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    interval_us = 100_000  # ten requests per second
+
+    results = [
+        await client.schedule("tat", interval_us, interval_us, 250_000)
+        for _ in range(4)
+    ]
+
+    assert [scheduled for scheduled, *_ in results] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    # The burst goes at once, then one slot per emission interval
+    delays = [delay_ms for *_, delay_ms in results]
+    assert delays[0] == 0
+    assert [round(delay, -2) for delay in delays[1:3]] == [100, 200]
+    assert delays[3] == 0
+    assert results[-1][2] > 0
+    # A rejected request does not reserve a slot
+    assert 0 < await client._client.pttl("tat") <= 300
+
+
+@pytest.mark.asyncio
+async def test_schedule_invalid_url():
+    client = RedisClient("redis://invalid:6379")
+    scheduled, left, retry_after_ms, _, delay_ms = await client.schedule(
+        "t", 10, 50, 1000
+    )
+    assert (scheduled, left, retry_after_ms, delay_ms) == (True, 4, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_increment_all_only_increments_when_every_rule_passes():
+    """Test a request rejected by one rule leaves every counter alone."""
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    keys = ["second", "hour"]
+
+    first = await client.increment_all(keys, [2, 1000], [1, 3600])
+    second = await client.increment_all(keys, [2, 1000], [1, 3600])
+    third = await client.increment_all(keys, [2, 1000], [1, 3600])
+
+    assert first == (True, [1, 1])
+    assert second == (True, [2, 2])
+    assert third == (False, [2, 2])
+    assert int(await client._client.get("hour")) == 2
+    assert 0 < await client._client.ttl("hour") <= 3600
+    assert await client._client.ttl("second") == 1
+
+
+@pytest.mark.asyncio
+async def test_increment_all_many_runs_one_pipeline():
+    from fakeredis import aioredis as fake_aioredis
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+
+    results = await client.increment_all_many(
+        [
+            (["a:1", "a:60"], [5, 10], [1, 60], 3),
+            (["a:1", "a:60"], [5, 10], [1, 60], 3),
+            (["b:1", "b:60"], [5, 10], [1, 60], 1),
+        ]
+    )
+
+    assert results == [(True, [3, 3]), (False, [3, 3]), (True, [1, 1])]
+
+
+@pytest.mark.asyncio
+async def test_increment_all_invalid_url():
+    client = RedisClient("redis://invalid:6379")
+    assert await client.increment_all(["a", "b"], [1, 1], [1, 1], 2) == (
+        True,
+        [2, 2],
+    )
+
+
+@pytest.mark.asyncio
+async def test_merge_top_sums_instances_and_windows():
+    """Test the heavy hitter summaries merge in one script."""
+    from fakeredis import aioredis as fake_aioredis
+
+    first = RedisClient("redis://localhost:6379")
+    first._client = fake_aioredis.FakeRedis()
+    second = RedisClient("redis://localhost:6379")
+    second._client = first._client
+    await first.merge_top("prev", "older", {"a": 2, "c": 1}, 120, 10, 5)
+
+    await first.merge_top("cur", "prev", {"a": 3, "b": 1}, 120, 10, 5)
+    top = await second.merge_top("cur", "prev", {"b": 5, "d": 1}, 120, 3, 3)
+
+    assert top == [("b", 6), ("a", 5), ("c", 1)]
+    # The current window keeps only its capacity highest counts
+    assert await first._client.zcard("cur") == 3
+    assert 0 < await first._client.ttl("cur") <= 120
+
+
+@pytest.mark.asyncio
+async def test_merge_top_raises_when_redis_unavailable():
+    client = RedisClient("redis://invalid:6379")
+    with pytest.raises(RedisConnectionError):
+        await client.merge_top("cur", "prev", {"a": 1}, 120, 10, 5)
+
+
+@pytest.mark.asyncio
+async def test_binary_keys_count_and_expire():
+    """Test counters work the same under packed binary keys."""
+    from fakeredis import aioredis as fake_aioredis
+
+    from domain import BinaryKeyEncoder
+
+    client = RedisClient("redis://localhost:6379")
+    client._client = fake_aioredis.FakeRedis()
+    key = BinaryKeyEncoder()("2001:db8::1", 1700000040)
+
+    assert await client.increment(key, 60) == 1
+    assert await client.increment_many([(key, 60, 2)]) == [3]
+    assert await client.reserve(key, 5, 10, 60) == (5, 8)
+    assert await client._client.keys("*") == [key]
+    assert 0 < await client._client.ttl(key) <= 60
+
+
+def test_timeout_bounds_connects_and_replies():
+    client = RedisClient("redis://invalid:6379", timeout=0.5)
+
+    options = client._client.connection_pool.connection_kwargs
+    assert options["socket_timeout"] == 0.5
+    assert options["socket_connect_timeout"] == 0.5
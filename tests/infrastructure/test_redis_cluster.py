@@ -0,0 +1,169 @@
+import time
+
+import pytest
+from redis.crc import key_slot
+from redis.exceptions import ClusterCrossSlotError
+
+from domain import (
+    CompositeRateLimiter,
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    RateLimitStatus,
+    SlidingWindowCounterRateLimiter,
+    TimeUnit,
+    TimeWindow,
+    hash_tag,
+)
+from infrastructure import LIMITER_SCRIPTS, RedisClusterClient
+
+
+@pytest.fixture
+async def client(redis_cluster):
+    client = RedisClusterClient(redis_cluster.url)
+    yield client
+    await client._client.aclose()
+
+
+def owner(redis_cluster, key: str) -> int:
+    return redis_cluster.owners[key_slot(key.encode())]
+
+
+def test_hash_tag_keeps_identifier_keys_in_one_slot():
+    keys = [
+        f"rate_limit:{hash_tag('10.0.0.1')}:{window}" for window in (0, 60)
+    ]
+    assert key_slot(keys[0].encode()) == key_slot(keys[1].encode())
+
+
+def test_hash_tag_escapes_braces():
+    assert hash_tag("a}b{c") == "{a%7Db%7Bc}"
+
+
+@pytest.mark.asyncio
+async def test_load_scripts_reaches_every_primary(client, redis_cluster):
+    assert await client.load_scripts() is True
+
+    sha = LIMITER_SCRIPTS["increment"].sha
+    for index in range(3):
+        assert redis_cluster.node(index).script_exists(sha) == [True]
+
+
+@pytest.mark.asyncio
+async def test_keys_are_stored_on_the_owning_node(client, redis_cluster):
+    for i in range(30):
+        assert await client.increment(f"counter:{i}", 60) == 1
+
+    used = set()
+    for i in range(30):
+        index = owner(redis_cluster, f"counter:{i}")
+        assert redis_cluster.node(index).get(f"counter:{i}") == b"1"
+        used.add(index)
+    assert used == {0, 1, 2}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_is_routed_by_slot(client, redis_cluster):
+    items = [(f"batch:{i}", 60, i + 1) for i in range(20)]
+
+    assert await client.increment_many(items) == [i + 1 for i in range(20)]
+    assert await client.increment_many(items) == [
+        2 * (i + 1) for i in range(20)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_multi_key_scripts_need_one_slot(client):
+    # Keys without a shared hash tag land in different slots
+    with pytest.raises(ClusterCrossSlotError):
+        await LIMITER_SCRIPTS.execute(
+            client._client, "multi_window", ["a", "b"], [1, 5, 60, 5, 60]
+        )
+
+
+@pytest.mark.asyncio
+async def test_composite_rules_run_on_one_node(client, redis_cluster):
+    limiter = CompositeRateLimiter(
+        [
+            RateLimitConfig(limit=2, window=TimeWindow(1, TimeUnit.MINUTES)),
+            RateLimitConfig(limit=5, window=TimeWindow(1, TimeUnit.HOURS)),
+        ],
+        client,
+    )
+
+    results = [
+        await limiter.check_and_increment(f"10.0.0.{i % 10}")
+        for i in range(30)
+    ]
+
+    statuses = [result.status for result in results]
+    assert statuses[:20] == [RateLimitStatus.ALLOWED] * 20
+    assert statuses[20:] == [RateLimitStatus.REJECTED] * 10
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_counter_in_cluster(client):
+    limiter = SlidingWindowCounterRateLimiter(
+        RateLimitConfig(limit=3, window=TimeWindow(1, TimeUnit.HOURS)),
+        client,
+    )
+
+    results = [await limiter.check_and_increment("10.0.0.1") for _ in range(4)]
+
+    assert [r.status for r in results] == [
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.REJECTED,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_moved_refreshes_slot_map(client, redis_cluster):
+    limiter = FixedWindowRateLimiter(
+        RateLimitConfig(limit=10, window=TimeWindow(1, TimeUnit.HOURS)),
+        client,
+    )
+    await limiter.check_and_increment("10.0.0.1")
+    window_start = limiter._get_window_start(int(time.time()))
+    key = limiter._get_key("10.0.0.1", window_start)
+    slot = key_slot(key.encode())
+    source = redis_cluster.owners[slot]
+    target = (source + 1) % 3
+
+    # Reshard: the counter moves with its slot to another node
+    redis_cluster.node(target).set(key, redis_cluster.node(source).get(key))
+    redis_cluster.node(source).delete(key)
+    redis_cluster.move_slot(slot, target)
+
+    result = await limiter.check_and_increment("10.0.0.1")
+
+    assert result.remaining == 8
+    assert redis_cluster.node(target).get(key) == b"2"
+    node = client._client.nodes_manager.get_node_from_slot(slot)
+    assert node.port == redis_cluster.nodes[target][1]
+
+
+@pytest.mark.asyncio
+async def test_ask_redirects_new_keys_during_migration(client, redis_cluster):
+    key = "rate_limit:{10.0.0.9}:0"
+    slot = key_slot(key.encode())
+    source = redis_cluster.owners[slot]
+    target = (source + 1) % 3
+    await client.increment("warm-up", 60)
+    redis_cluster.migrating[slot] = target
+
+    count = await client.increment(key, 60)
+
+    # The key is created on the importing node, the slot map is kept
+    assert count == 1
+    assert redis_cluster.node(target).get(key) == b"1"
+    assert redis_cluster.node(source).get(key) is None
+    node = client._client.nodes_manager.get_node_from_slot(slot)
+    assert node.port == redis_cluster.nodes[source][1]
+
+
+@pytest.mark.asyncio
+async def test_unreachable_cluster_fails_open():
+    client = RedisClusterClient("redis://127.0.0.1:1")
+    assert await client.ping() is False
+    assert await client.increment("key", 60) == 1
@@ -0,0 +1,95 @@
+import hashlib
+
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+from infrastructure.scripts import LIMITER_SCRIPTS, LuaScript, ScriptRegistry
+
+
+@pytest.fixture
+def fake_redis():
+    return fake_aioredis.FakeRedis()
+
+
+@pytest.fixture
+def registry():
+    registry = ScriptRegistry()
+    registry.register("echo", "return ARGV[1]")
+    return registry
+
+
+def test_script_sha_matches_source():
+    script = LuaScript(name="echo", source="return ARGV[1]")
+    expected = hashlib.sha1(b"return ARGV[1]").hexdigest()
+    assert script.sha == expected
+
+
+def test_register_duplicate_name_raises(registry):
+    with pytest.raises(ValueError):
+        registry.register("echo", "return 1")
+
+
+def test_limiter_scripts_contains_increment():
+    assert "increment" in LIMITER_SCRIPTS
+
+
+@pytest.mark.asyncio
+async def test_load_all_caches_scripts(registry, fake_redis):
+    await registry.load_all(fake_redis)
+    exists = await fake_redis.script_exists(registry["echo"].sha)
+    assert exists == [True]
+
+
+@pytest.mark.asyncio
+async def test_execute_uses_evalsha(registry, fake_redis, mocker):
+    await registry.load_all(fake_redis)
+    script_load = mocker.spy(fake_redis, "script_load")
+
+    result = await registry.execute(fake_redis, "echo", [], ["hello"])
+
+    assert result == b"hello"
+    script_load.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_execute_reloads_after_noscript(registry, fake_redis):
+    await registry.load_all(fake_redis)
+    await fake_redis.script_flush()
+
+    result = await registry.execute(fake_redis, "echo", [], ["again"])
+
+    assert result == b"again"
+    exists = await fake_redis.script_exists(registry["echo"].sha)
+    assert exists == [True]
+
+
+@pytest.mark.asyncio
+async def test_execute_without_preload(registry, fake_redis):
+    result = await registry.execute(fake_redis, "echo", [], ["cold"])
+    assert result == b"cold"
+
+
+@pytest.mark.asyncio
+async def test_execute_many_runs_pipeline(registry, fake_redis):
+    results = await registry.execute_many(
+        fake_redis,
+        [("echo", [], ["a"]), ("echo", [], ["b"])],
+    )
+    assert results == [b"a", b"b"]
+
+
+@pytest.mark.asyncio
+async def test_execute_many_reloads_after_noscript(fake_redis):
+    registry = ScriptRegistry()
+    registry.register("incr", "return redis.call('INCR', KEYS[1])")
+    await registry.load_all(fake_redis)
+    await fake_redis.script_flush()
+
+    results = await registry.execute_many(
+        fake_redis,
+        [("incr", ["n"], []), ("incr", ["n"], [])],
+    )
+
+    # Each call is applied exactly once despite the retry
+    assert results == [1, 2]
+    assert int(await fake_redis.get("n")) == 2
@@ -0,0 +1,152 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+from domain import (
+    FixedWindowRateLimiter,
+    RateLimitConfig,
+    RateLimitStatus,
+    TimeUnit,
+    TimeWindow,
+)
+from infrastructure import SharedMemoryStorage
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "counters")
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def storage(path, clock):
+    storage = SharedMemoryStorage(path, slots=1024, segments=16, clock=clock)
+    yield storage
+    storage.close()
+
+
+def _increment_in_worker(path: str, key: str, times: int) -> None:
+    storage = SharedMemoryStorage(path, slots=1024, segments=16)
+
+    async def run() -> None:
+        for _ in range(times):
+            await storage.increment(key, 60)
+
+    asyncio.run(run())
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_increment_counts_per_key(storage):
+    assert await storage.increment("a", 60) == 1
+    assert await storage.increment("a", 60) == 2
+    assert await storage.increment("b", 60) == 1
+    assert await storage.ping() is True
+
+
+@pytest.mark.asyncio
+async def test_counter_expires_after_ttl(storage, clock):
+    await storage.increment("a", 60)
+    clock.now += 59
+    assert await storage.increment("a", 60) == 2
+
+    clock.now += 1
+    assert await storage.increment("a", 60) == 1
+
+
+@pytest.mark.asyncio
+async def test_increment_many(storage):
+    assert await storage.increment_many(
+        [("a", 60, 2), ("b", 60, 1), ("a", 60, 3)]
+    ) == [2, 1, 5]
+
+
+@pytest.mark.asyncio
+async def test_instances_share_the_table(storage, path, clock):
+    other = SharedMemoryStorage(path, slots=1024, segments=16, clock=clock)
+    try:
+        await storage.increment("a", 60)
+        assert await other.increment("a", 60) == 2
+    finally:
+        other.close()
+
+
+@pytest.mark.asyncio
+async def test_processes_count_atomically(storage, path):
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_increment_in_worker, args=(path, "k", 500))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert await storage.increment("k", 60) == 2001
+
+
+@pytest.mark.asyncio
+async def test_full_table_evicts_soonest_to_expire(path, clock):
+    storage = SharedMemoryStorage(path, slots=4, segments=1, clock=clock)
+    try:
+        for index, ttl in enumerate([60, 30, 90, 120]):
+            await storage.increment_many([(f"key{index}", ttl, 5)])
+
+        assert await storage.increment("new", 60) == 1
+        # key1 had the shortest TTL and lost its slot
+        assert await storage.increment("key1", 60) == 1
+        assert await storage.increment("key3", 120) == 6
+    finally:
+        storage.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_slots_are_reused(path, clock):
+    storage = SharedMemoryStorage(path, slots=4, segments=1, clock=clock)
+    try:
+        for index in range(4):
+            await storage.increment(f"old{index}", 10)
+        clock.now += 10
+
+        for index in range(4):
+            assert await storage.increment(f"new{index}", 60) == 1
+        for index in range(4):
+            assert await storage.increment(f"new{index}", 60) == 2
+    finally:
+        storage.close()
+
+
+def test_rejects_table_with_other_layout(storage, path):
+    with pytest.raises(ValueError, match="different"):
+        SharedMemoryStorage(path, slots=2048, segments=16)
+
+
+@pytest.mark.asyncio
+async def test_fixed_window_rate_limiter(storage):
+    limiter = FixedWindowRateLimiter(
+        RateLimitConfig(limit=2, window=TimeWindow(1, TimeUnit.MINUTES)),
+        storage,
+    )
+
+    results = [await limiter.check_and_increment("10.0.0.1") for _ in range(3)]
+
+    assert [r.status for r in results] == [
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.REJECTED,
+    ]
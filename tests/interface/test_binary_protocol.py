@@ -0,0 +1,170 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from application.rate_limit import MAX_COST, RateLimitUseCase
+from config import Config
+from domain import RateLimitStatus, TimeUnit
+from infrastructure import MemoryStorage
+from interface.binary_client import BinaryCheckClient, BinaryCheckError
+from interface.binary_protocol import (
+    LENGTH,
+    MAX_FRAME_SIZE,
+    REQUEST,
+    BinaryCheckServer,
+    encode_request,
+    unix_socket,
+)
+from interface.web_app import create_app
+
+
+@pytest.fixture
+async def serve(tmp_path):
+    servers = []
+
+    async def serve(use_case):
+        path = str(tmp_path / "check.sock")
+        server = BinaryCheckServer(use_case)
+        await server.start([unix_socket(path)])
+        servers.append(server)
+        return await BinaryCheckClient.connect(path)
+
+    yield serve
+    for server in servers:
+        await server.close()
+
+
+def test_request_frame_layout():
+    frame = encode_request(7, "10.0.0.1", cost=2, rule="login")
+
+    (size,) = LENGTH.unpack_from(frame)
+    assert size == len(frame) - LENGTH.size
+    assert REQUEST.unpack_from(frame, LENGTH.size) == (7, 2, 5)
+    assert frame.endswith(b"login10.0.0.1")
+
+
+@pytest.mark.asyncio
+async def test_check_and_increment(serve):
+    client = await serve(RateLimitUseCase(MemoryStorage(), limit=2))
+
+    results = [await client.check("10.0.0.1") for _ in range(3)]
+
+    assert [result.status for result in results] == [
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.ALLOWED,
+        RateLimitStatus.REJECTED,
+    ]
+    assert [result.remaining for result in results] == [1, 0, 0]
+    assert results[0].limit == 2
+    assert results[0].retry_after_ms is None
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_rules_and_costs(serve):
+    client = await serve(RateLimitUseCase(MemoryStorage(), limit=5))
+
+    login = await client.check("u1", cost=4, rule="login")
+    plain = await client.check("u1", cost=2)
+
+    assert login.remaining == 1
+    assert plain.remaining == 3
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_pipelined_requests_are_checked_in_batches(serve):
+    use_case = RateLimitUseCase(MemoryStorage(), limit=1000)
+    batch = use_case.check_and_increment_many
+    use_case.check_and_increment_many = AsyncMock(side_effect=batch)
+    client = await serve(use_case)
+
+    results = await asyncio.gather(
+        *(client.check(f"10.0.0.{i % 10}") for i in range(100))
+    )
+
+    # Every identifier was counted ten times, and each check got its own
+    assert sorted(result.remaining for result in results) == sorted(
+        1000 - n for n in range(1, 11) for _ in range(10)
+    )
+    assert use_case.check_and_increment_many.await_count < 100
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_malformed_request_gets_an_error(serve):
+    client = await serve(RateLimitUseCase(MemoryStorage()))
+
+    with pytest.raises(BinaryCheckError):
+        await client.check("")
+    # The connection stays usable
+    assert (await client.check("10.0.0.1")).status == RateLimitStatus.ALLOWED
+    await client.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cost", [0, MAX_COST + 1])
+async def test_cost_out_of_range_gets_an_error(serve, cost):
+    use_case = RateLimitUseCase(MemoryStorage())
+    batch = use_case.check_and_increment_many
+    use_case.check_and_increment_many = AsyncMock(side_effect=batch)
+    client = await serve(use_case)
+
+    with pytest.raises(BinaryCheckError):
+        await client.check("10.0.0.1", cost=cost)
+    use_case.check_and_increment_many.assert_not_called()
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_oversized_frame_closes_the_connection(serve):
+    client = await serve(RateLimitUseCase(MemoryStorage()))
+
+    with pytest.raises(ConnectionError):
+        await client.check("x" * MAX_FRAME_SIZE)
+    with pytest.raises(ConnectionError):
+        await client.check("10.0.0.1")
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_checks_get_errors(serve):
+    use_case = RateLimitUseCase(MemoryStorage())
+    use_case.check_and_increment_many = AsyncMock(
+        side_effect=ConnectionError()
+    )
+    client = await serve(use_case)
+
+    with pytest.raises(BinaryCheckError):
+        await client.check("10.0.0.1")
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_app_serves_binary_protocol_and_counts_decisions(
+    aiohttp_client, tmp_path
+):
+    path = str(tmp_path / "app.sock")
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=1,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+    )
+    http = await aiohttp_client(create_app(config, [unix_socket(path)]))
+    client = await BinaryCheckClient.connect(path)
+
+    first = await client.check("10.0.0.1")
+    second = await client.check("10.0.0.1")
+    metrics = await (await http.get("/metrics")).text()
+
+    assert first.status == RateLimitStatus.ALLOWED
+    assert second.status == RateLimitStatus.REJECTED
+    assert (
+        'rate_limiter_requests_total{rule="default",decision="rejected"} 1'
+        in metrics
+    )
+    await client.close()
@@ -0,0 +1,101 @@
+import pytest
+from aiohttp import web
+
+from application.rate_limit import RateLimitUseCase
+from infrastructure import MemoryStorage
+from interface.middleware import rate_limit, rate_limit_middleware
+
+
+async def ok(request):
+    return web.Response(text="ok")
+
+
+@pytest.fixture
+def use_case():
+    return RateLimitUseCase(MemoryStorage(), limit=2)
+
+
+@pytest.mark.asyncio
+async def test_middleware_limits_every_route(aiohttp_client, use_case):
+    app = web.Application(middlewares=[rate_limit_middleware(use_case)])
+    app.router.add_get("/a", ok)
+    app.router.add_get("/b", ok)
+    client = await aiohttp_client(app)
+
+    first = await client.get("/a")
+    second = await client.get("/b", headers={"X-Forwarded-For": "10.0.0.9"})
+    third = await client.get("/b")
+    fourth = await client.get("/a")
+
+    assert first.status == 200
+    assert await first.text() == "ok"
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    # Another client IP has its own counter
+    assert second.headers["X-RateLimit-Remaining"] == "1"
+    assert third.status == 200
+    assert fourth.status == 429
+    assert fourth.headers["X-RateLimit-Remaining"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_decorator_uses_its_own_limit_and_key(aiohttp_client, use_case):
+    strict = RateLimitUseCase(MemoryStorage(), limit=1)
+
+    @rate_limit(strict, key=lambda request: request.headers.get("X-Api-Key"))
+    async def login(request):
+        return web.Response(text="welcome")
+
+    app = web.Application(middlewares=[rate_limit_middleware(use_case)])
+    app.router.add_post("/login", login)
+    client = await aiohttp_client(app)
+
+    first = await client.post("/login", headers={"X-Api-Key": "k1"})
+    other = await client.post("/login", headers={"X-Api-Key": "k2"})
+    again = await client.post("/login", headers={"X-Api-Key": "k1"})
+    # Without a key the request is not limited at all
+    anonymous = await client.post("/login")
+
+    assert first.status == 200
+    assert first.headers["X-RateLimit-Limit"] == "1"
+    assert other.status == 200
+    assert again.status == 429
+    assert anonymous.status == 200
+    assert "X-RateLimit-Limit" not in anonymous.headers
+
+
+@pytest.mark.asyncio
+async def test_rules_keep_routes_apart(aiohttp_client, use_case):
+    app = web.Application()
+    app.router.add_get("/a", rate_limit(use_case, rule="a")(ok))
+    app.router.add_get("/b", rate_limit(use_case, rule="b", cost=2)(ok))
+    client = await aiohttp_client(app)
+
+    a = await client.get("/a")
+    b = await client.get("/b")
+    b_again = await client.get("/b")
+
+    assert a.headers["X-RateLimit-Remaining"] == "1"
+    assert b.headers["X-RateLimit-Remaining"] == "0"
+    assert b_again.status == 429
+
+
+@pytest.mark.asyncio
+async def test_headers_are_added_to_http_exceptions(aiohttp_client, use_case):
+    async def missing(request):
+        raise web.HTTPNotFound()
+
+    app = web.Application(middlewares=[rate_limit_middleware(use_case)])
+    app.router.add_get("/missing", missing)
+    client = await aiohttp_client(app)
+
+    response = await client.get("/missing")
+
+    assert response.status == 404
+    assert response.headers["X-RateLimit-Remaining"] == "1"
+
+
+@pytest.mark.parametrize("limit", [rate_limit, rate_limit_middleware])
+def test_cost_out_of_range_is_refused_up_front(use_case, limit):
+    with pytest.raises(ValueError):
+        limit(use_case, cost=0)
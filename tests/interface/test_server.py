@@ -0,0 +1,123 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from config import Config
+from domain import TimeUnit
+from interface.server import Supervisor, reuseport_socket, serve
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int) -> set[int]:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    return {int(child) for child in path.read_text().split()}
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = condition()
+        if result:
+            return result
+        time.sleep(0.05)
+    raise AssertionError("condition not met in time")
+
+
+def get_status(port: int) -> int | None:
+    try:
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/rate-limit", timeout=1
+        ) as response:
+            return response.status
+    except OSError:
+        return None
+
+
+def test_reuseport_sockets_share_a_port():
+    first = reuseport_socket("127.0.0.1", 0)
+    try:
+        port = first.getsockname()[1]
+        second = reuseport_socket("127.0.0.1", port)
+        second.close()
+    finally:
+        first.close()
+
+
+def test_supervisor_needs_a_worker():
+    with pytest.raises(ValueError):
+        Supervisor(lambda: None, workers=0)
+
+
+def test_memory_storage_needs_a_single_worker():
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=free_port(),
+        rate_limit_count=10,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        workers=2,
+        storage_backend="memory",
+    )
+
+    with pytest.raises(ValueError, match="per process"):
+        serve(config)
+
+
+@pytest.mark.skipif(
+    not Path("/proc/self/task").exists(), reason="needs Linux /proc"
+)
+def test_workers_restart_and_stop_gracefully(tmp_path):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WORKERS="2",
+        STORAGE_BACKEND="shared",
+        SHARED_MEMORY_PATH=str(tmp_path / "rate_limiter"),
+        SHARED_MEMORY_SLOTS="1024",
+        RATE_LIMIT_COUNT="1000",
+    )
+    process = subprocess.Popen(
+        [sys.executable, str(SRC_DIR / "main.py")],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        workers = wait_for(
+            lambda: len(children(process.pid)) == 2 and children(process.pid)
+        )
+        assert wait_for(lambda: get_status(port)) == 200
+
+        # A crashed worker is replaced
+        crashed = next(iter(workers))
+        os.kill(crashed, signal.SIGKILL)
+        restarted = wait_for(
+            lambda: (
+                len(children(process.pid) - {crashed}) == 2
+                and children(process.pid)
+            )
+        )
+        assert crashed not in restarted
+        assert wait_for(lambda: get_status(port)) == 200
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=15) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
@@ -1,7 +1,16 @@
+import asyncio
+import json
+import time
+
 import pytest
 
-from config import Config
-from domain import TimeUnit
+from config import Config, load_rule_set
+from domain import (
+    RateLimitAlgorithm,
+    RateLimitResult,
+    RateLimitStatus,
+    TimeUnit,
+)
 from interface.web_app import create_app
 
 
@@ -113,3 +122,576 @@ async def test_rate_limit_endpoint_fails_open_when_redis_unavailable(client_unhe
     assert "X-RateLimit-Limit" in resp.headers
     assert "X-RateLimit-Remaining" in resp.headers
     assert "X-RateLimit-Reset" in resp.headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_endpoint_sets_retry_after(client_unhealthy, mocker):
+    """Test rejected responses carry Retry-After rounded up to seconds."""
+    mocker.patch(
+        "application.rate_limit.RateLimitUseCase.check_request",
+        return_value=(
+            None,
+            RateLimitResult(
+                status=RateLimitStatus.REJECTED,
+                limit=10,
+                remaining=0,
+                reset_time=1234567890,
+                retry_after_ms=1500,
+            ),
+        ),
+    )
+
+    resp = await client_unhealthy.get("/rate-limit")
+
+    assert resp.status == 429
+    assert resp.headers["Retry-After"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_endpoint_waits_for_shaping_delay(
+    client_unhealthy, mocker
+):
+    """Test delayed requests are answered 200 once their slot arrives."""
+    mocker.patch(
+        "application.rate_limit.RateLimitUseCase.check_request",
+        return_value=(
+            None,
+            RateLimitResult(
+                status=RateLimitStatus.ALLOWED,
+                limit=10,
+                remaining=0,
+                reset_time=1234567890,
+                delay_ms=100,
+            ),
+        ),
+    )
+
+    started = time.monotonic()
+    resp = await client_unhealthy.get("/rate-limit")
+
+    assert resp.status == 200
+    assert time.monotonic() - started >= 0.1
+    assert "Retry-After" not in resp.headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_batch_endpoint(client_unhealthy):
+    """Test the batch endpoint returns one result per item (fail-open)."""
+    resp = await client_unhealthy.post(
+        "/rate-limit/batch",
+        json={
+            "items": [
+                "10.0.0.1",
+                {"identifier": "key-123", "cost": 5, "rule": "api_key"},
+            ]
+        },
+    )
+
+    assert resp.status == 200
+    data = await resp.json()
+    assert data["allowed"] is True
+    assert [
+        (item["identifier"], item["rule"], item["cost"], item["status"])
+        for item in data["results"]
+    ] == [
+        ("10.0.0.1", None, 1, "allowed"),
+        ("key-123", "api_key", 5, "allowed"),
+    ]
+    assert data["results"][0]["limit"] == 100
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    [
+        [],
+        {"items": []},
+        {"items": [{"cost": 1}]},
+        {"items": [{"identifier": "a", "cost": 0}]},
+        {"items": [{"identifier": "a", "cost": 1001}]},
+        {"items": [{"identifier": "a", "rule": 5}]},
+        {"items": ["a"] * 101},
+    ],
+)
+async def test_rate_limit_batch_endpoint_rejects_invalid_body(
+    client_unhealthy, body
+):
+    resp = await client_unhealthy.post("/rate-limit/batch", json=body)
+
+    assert resp.status == 400
+    assert "error" in await resp.json()
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_batch_endpoint_rejects_unweighted_cost(
+    aiohttp_client,
+):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        rate_limit_algorithm=RateLimitAlgorithm.SLIDING_WINDOW_COUNTER,
+    )
+    client = await aiohttp_client(create_app(config))
+
+    resp = await client.post(
+        "/rate-limit/batch",
+        json={"items": [{"identifier": "a", "cost": 2}]},
+    )
+
+    assert resp.status == 400
+    assert "from 1 to 1" in (await resp.json())["error"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_batch_endpoint_rejects_invalid_json(
+    client_unhealthy,
+):
+    resp = await client_unhealthy.post("/rate-limit/batch", data=b"{")
+    assert resp.status == 400
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_endpoint_with_memory_storage(aiohttp_client):
+    """Test the memory backend counts requests without Redis."""
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=2,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+    )
+    client = await aiohttp_client(create_app(config))
+
+    statuses = [(await client.get("/rate-limit")).status for _ in range(3)]
+    health = await client.get("/health")
+
+    assert statuses == [200, 200, 429]
+    assert health.status == 200
+
+
+def test_memory_storage_rejects_unsupported_algorithm():
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=2,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        rate_limit_algorithm=RateLimitAlgorithm.GCRA,
+    )
+
+    with pytest.raises(ValueError, match="memory"):
+        create_app(config)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_endpoint_with_shared_memory(
+    aiohttp_client, tmp_path
+):
+    """Test the shared-memory backend counts requests without Redis."""
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=1,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="shared",
+        shared_memory_path=str(tmp_path / "counters"),
+        shared_memory_slots=1024,
+    )
+    client = await aiohttp_client(create_app(config))
+
+    statuses = [(await client.get("/rate-limit")).status for _ in range(2)]
+
+    assert statuses == [200, 429]
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_limits_locally_when_redis_fails(
+    aiohttp_client,
+):
+    """Test a failing Redis opens the breaker and limits requests locally."""
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=6,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        near_cache_max_size=0,
+        instance_count=2,
+        circuit_breaker=True,
+    )
+    client = await aiohttp_client(create_app(config))
+
+    statuses = [(await client.get("/rate-limit")).status for _ in range(5)]
+    health = await (await client.get("/health")).json()
+
+    # Each of the 2 instances allows half of the 6 requests locally
+    assert statuses == [200, 200, 200, 429, 429]
+    assert health["checks"]["circuit_breaker"] == {
+        "status": "error",
+        "message": "open",
+    }
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_is_opt_in(client_unhealthy):
+    """Test Redis failures fail open unless the breaker is enabled."""
+    statuses = [
+        (await client_unhealthy.get("/rate-limit")).status for _ in range(3)
+    ]
+    health = await (await client_unhealthy.get("/health")).json()
+
+    assert statuses == [200, 200, 200]
+    assert "circuit_breaker" not in health["checks"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client_unhealthy):
+    await client_unhealthy.get("/rate-limit")
+    await client_unhealthy.post(
+        "/rate-limit/batch",
+        json={"items": [{"identifier": "key-1", "rule": "api_key"}]},
+    )
+
+    resp = await client_unhealthy.get("/metrics")
+
+    assert resp.status == 200
+    assert resp.headers["Content-Type"].startswith("text/plain")
+    text = await resp.text()
+    assert (
+        'rate_limiter_requests_total{rule="default",decision="allowed"} 1'
+        in text
+    )
+    assert (
+        'rate_limiter_requests_total{rule="api_key",decision="allowed"} 1'
+        in text
+    )
+    assert (
+        'rate_limiter_handler_duration_seconds_count{route="/rate-limit"} 1'
+        in text
+    )
+    assert "rate_limiter_storage_errors_total{error=" in text
+    assert "rate_limiter_redis_connections_max" in text
+
+
+@pytest.mark.asyncio
+async def test_heavy_hitters_admin_endpoints(aiohttp_client):
+    """Test the top-K view and blocking through the admin endpoints."""
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        heavy_hitter_sync_seconds=0.01,
+        admin_token="secret",
+    )
+    client = await aiohttp_client(create_app(config))
+    auth = {"Authorization": "Bearer secret"}
+    for ip in ["10.0.0.1"] * 3 + ["10.0.0.2"]:
+        await client.get("/rate-limit", headers={"X-Forwarded-For": ip})
+
+    unauthorized = await client.get("/admin/heavy-hitters")
+    for _ in range(100):
+        view = await (
+            await client.get("/admin/heavy-hitters", headers=auth)
+        ).json()
+        if view["top"]:
+            break
+        await asyncio.sleep(0.01)
+    block = await client.post(
+        "/admin/heavy-hitters/block", json={"top": 1}, headers=auth
+    )
+    blocked = await client.get(
+        "/rate-limit", headers={"X-Forwarded-For": "10.0.0.1"}
+    )
+    unblock = await client.delete(
+        "/admin/heavy-hitters/block/10.0.0.1", headers=auth
+    )
+    after = await client.get(
+        "/rate-limit", headers={"X-Forwarded-For": "10.0.0.1"}
+    )
+
+    assert unauthorized.status == 401
+    assert view["top"] == [
+        {"identifier": "10.0.0.1", "count": 3},
+        {"identifier": "10.0.0.2", "count": 1},
+    ]
+    blocked_ids = [
+        entry["identifier"] for entry in (await block.json())["blocked"]
+    ]
+    assert blocked_ids == ["10.0.0.1"]
+    assert blocked.status == 429
+    assert unblock.status == 200
+    assert after.status == 200
+
+
+@pytest.mark.asyncio
+async def test_heavy_hitters_block_rejects_invalid_body(aiohttp_client):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        admin_token="secret",
+    )
+    client = await aiohttp_client(create_app(config))
+
+    response = await client.post(
+        "/admin/heavy-hitters/block",
+        json={"seconds": 10},
+        headers={"Authorization": "Bearer secret"},
+    )
+
+    assert response.status == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "authorization", ["Bearer sécret", "Bearer \u79d8\u5bc6"]
+)
+async def test_admin_endpoints_refuse_non_ascii_tokens(
+    aiohttp_client, authorization
+):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        admin_token="secret",
+    )
+    client = await aiohttp_client(create_app(config))
+
+    response = await client.get(
+        "/admin/heavy-hitters", headers={"Authorization": authorization}
+    )
+
+    assert response.status == 401
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_need_a_token(client_unhealthy):
+    view = await client_unhealthy.get("/admin/heavy-hitters")
+    block = await client_unhealthy.post(
+        "/admin/heavy-hitters/block", json={"top": 1}
+    )
+
+    assert view.status == 404
+    assert block.status == 404
+
+
+def test_hash_key_layout_needs_fixed_window():
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        rate_limit_algorithm=RateLimitAlgorithm.GCRA,
+        redis_key_layout="hash",
+    )
+
+    with pytest.raises(ValueError):
+        create_app(config)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"storage_backend": "memory"},
+        {"redis_key_layout": "hash"},
+        {"rate_limit_algorithm": RateLimitAlgorithm.GCRA},
+    ],
+)
+def test_binary_keys_need_redis_fixed_window(changes):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        redis_key_encoding="binary",
+        **changes,
+    )
+
+    with pytest.raises(ValueError):
+        create_app(config)
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps(
+            {
+                "rules": [
+                    {"name": "login", "path": "/login", "limit": "1/m"},
+                    {
+                        "name": "burst",
+                        "network": "198.51.100.0/24",
+                        "limit": "1/s,10/h",
+                    },
+                ],
+                "allowlist": ["10.0.0.0/8"],
+            }
+        )
+    )
+    return str(path)
+
+
+def test_load_rule_set(rules_file):
+    rule_set = load_rule_set(rules_file)
+
+    assert [rule.name for rule in rule_set.rules] == ["login", "burst"]
+    assert [r.limit for r in rule_set.rules[1].limits] == [1, 10]
+    assert rule_set.is_allowlisted("10.9.8.7")
+
+
+def test_load_rule_set_rejects_malformed_rule(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [{"name": "no-limit"}]}))
+
+    with pytest.raises(ValueError):
+        load_rule_set(str(path))
+
+
+def test_load_rule_set_from_yaml(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "rules.yaml"
+    path.write_text(
+        "rules:\n  - name: login\n    path: /login\n    limit: 5/m\n"
+    )
+
+    assert load_rule_set(str(path)).match("/login", "1.1.1.1").name == (
+        "login"
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_endpoint_applies_route_rules(
+    aiohttp_client, rules_file
+):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        rule_set=load_rule_set(rules_file),
+    )
+    client = await aiohttp_client(create_app(config))
+    headers = {"X-Forwarded-For": "1.2.3.4", "X-Original-URI": "/login?a=1"}
+
+    first = await client.get("/rate-limit", headers=headers)
+    second = await client.get("/rate-limit", headers=headers)
+    by_query = await client.get(
+        "/rate-limit",
+        params={"path": "/login"},
+        headers={"X-Forwarded-For": "1.2.3.4"},
+    )
+    other = await client.get(
+        "/rate-limit", headers={"X-Forwarded-For": "1.2.3.4"}
+    )
+    allowlisted = [
+        await client.get(
+            "/rate-limit",
+            headers={
+                "X-Forwarded-For": "10.0.0.1",
+                "X-Original-URI": "/login",
+            },
+        )
+        for _ in range(3)
+    ]
+
+    assert first.status == 200
+    assert first.headers["X-RateLimit-Limit"] == "1"
+    assert second.status == 429
+    assert by_query.status == 429
+    assert other.status == 200
+    assert other.headers["X-RateLimit-Limit"] == "100"
+    assert [r.status for r in allowlisted] == [200, 200, 200]
+    metrics = await (await client.get("/metrics")).text()
+    assert (
+        'rate_limiter_requests_total{rule="login",decision="rejected"} 2'
+        in metrics
+    )
+
+
+def test_several_limits_per_rule_need_fixed_window(rules_file):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        rate_limit_algorithm=RateLimitAlgorithm.TOKEN_BUCKET,
+        rule_set=load_rule_set(rules_file),
+    )
+
+    with pytest.raises(ValueError):
+        create_app(config)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_endpoint_limits_by_prefix(aiohttp_client):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=2,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        storage_backend="memory",
+        ipv6_prefix_length=64,
+        prefix_rate_limit_count=3,
+    )
+    client = await aiohttp_client(create_app(config))
+
+    statuses = [
+        (
+            await client.get(
+                "/rate-limit",
+                headers={"X-Forwarded-For": f"2001:db8::{host:x}"},
+            )
+        ).status
+        for host in range(1, 5)
+    ]
+
+    assert statuses == [200, 200, 200, 429]
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"prefix_rate_limit_count": 10},
+        {
+            "ipv6_prefix_length": 64,
+            "prefix_rate_limit_count": 10,
+            "rate_limit_algorithm": RateLimitAlgorithm.GCRA,
+        },
+        {"ipv4_prefix_length": 33},
+    ],
+)
+def test_prefix_limit_needs_a_prefix_and_fixed_window(changes):
+    config = Config(
+        redis_url="redis://invalid:6379",
+        port=8000,
+        rate_limit_count=100,
+        rate_limit_window_duration=1,
+        rate_limit_window_unit=TimeUnit.MINUTES,
+        **changes,
+    )
+
+    with pytest.raises(ValueError):
+        create_app(config)